@@ -11,7 +11,8 @@ namespace Minotaur.Pipeline
     #region Declarations
 
     private bool _disposed;
-    private const byte _version = 1;
+    // version 2 has the current record layouts, see Minotaur.Content.ContentReader
+    private const byte _version = 2;
     private Stream _outStream;
     private static Encoding _encoding = Encoding.UTF8;
     private bool _compressContent;
@@ -88,8 +89,9 @@ namespace Minotaur.Pipeline
 
     public override void Write(string value)
     {
-      Write((uint)value.Length);
+      // the length is of the UTF-8 bytes, as ContentReader.ReadString reads it
       int byteCount = _encoding.GetByteCount(value);
+      Write((uint)byteCount);
       byte[] buffer = new byte[256];
       int maxChars = 256 / _encoding.GetMaxByteCount(1);
       if (byteCount <= 256)
@@ -114,6 +116,13 @@ namespace Minotaur.Pipeline
       Write(value.ToByteArray());
     }
 
+    public void WriteBlob(byte[] data)
+    {
+      // bulk data read with ContentReader.ReadBlob, the pipeline always writes it inline after its length
+      Write(data.Length);
+      Write(data);
+    }
+
     public void Write(Enum e)
     {
       Write(Convert.ToInt32(e));
@@ -9,6 +9,7 @@ namespace Minotaur.Pipeline.Graphics
     public List<ModelMeshPartContent> MeshParts { get; private set; }
     public string Name { get; set; }
     public BoundingSphere BoundingSphere { get; set; }
+    public BoundingBox BoundingBox { get; set; }
     public BoneContent ParentBone { get; set; }
     public object Tag { get; set; }
 
@@ -2,6 +2,7 @@
 using System.Collections.Generic;
 using System.Linq;
 using System.Text;
+using Minotaur.Core;
 
 namespace Minotaur.Pipeline.Graphics
 {
@@ -27,6 +28,10 @@ namespace Minotaur.Pipeline.Graphics
 
     public uint StartVertex { get; set; }
 
+    public BoundingSphere BoundingSphere { get; set; }
+
+    public BoundingBox BoundingBox { get; set; }
+
     public ModelMeshPartContent(VertexBufferContent vb, IndexCollection ic, uint startVertex, uint numVerticies, uint startIndex, uint numIndicies, uint primitiveCount)
     {
       VertexBuffer = vb;
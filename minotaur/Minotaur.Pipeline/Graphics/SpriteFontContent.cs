@@ -40,6 +40,7 @@ namespace Minotaur.Pipeline.Graphics
       public int PaddingRight;
       public int PaddingDowm;
       public int PaddingLeft;
+      public float DistanceFieldSpread;
       public List<Character> Characters = new List<Character>();
     }
 
@@ -107,10 +107,17 @@ namespace Minotaur.Pipeline.Processors
         indecies.AddRange(mesh.GetIndices().Select(k => k + (uint)baseVertex));
 
         ModelMeshPartContent part = new ModelMeshPartContent(vertexBuffer, indecies, baseVertex, partNumVertices, baseIndex, partNumIndices, primitiveCount);
-        Minotaur.Core.BoundingSphere boundingSphere = Minotaur.Core.BoundingSphere.CreateFromPoints(
-          ((PositionAttribute)vertexBuffer[Minotaur.Graphics.VertexUsage.Position]).Values.Select(
-          p => new OpenTK.Vector3(p.X, p.Y, p.Z)));
+        IEnumerable<OpenTK.Vector3> positions = ((PositionAttribute)vertexBuffer[Minotaur.Graphics.VertexUsage.Position]).Values.Select(
+          p => new OpenTK.Vector3(p.X, p.Y, p.Z));
+        Minotaur.Core.BoundingSphere boundingSphere = Minotaur.Core.BoundingSphere.CreateFromPoints(positions);
         ModelMeshContent modelmesh = new ModelMeshContent(mesh.Name, GetMeshParentBone(input.Scene.RootNode, i), new[] {part}, boundingSphere);
+        if (partNumVertices > 0)
+        {
+          IEnumerable<OpenTK.Vector3> partPositions = positions.Skip((int)baseVertex).Take((int)partNumVertices);
+          part.BoundingSphere = Minotaur.Core.BoundingSphere.CreateFromPoints(partPositions);
+          part.BoundingBox = Minotaur.Core.BoundingBox.CreateFromPoints(partPositions);
+          modelmesh.BoundingBox = Minotaur.Core.BoundingBox.CreateFromPoints(positions);
+        }
         meshes.Add(modelmesh);
 
         part.Material = materials[mesh.MaterialIndex];
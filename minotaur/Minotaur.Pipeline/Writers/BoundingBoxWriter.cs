@@ -0,0 +1,23 @@
+using System;
+using Minotaur.Core;
+using OpenTK;
+
+namespace Minotaur.Pipeline.Writers
+{
+  public class BoundingBoxWriter : ContentTypeWriter<BoundingBox>
+  {
+    public BoundingBoxWriter()
+      : base(new Guid("ed1fe179-a7c9-47ff-a281-52d387d83360")) { }
+
+    public override void Initialize(ContentTypeWriterManager manager)
+    {
+      manager.RegisterTypeWriter<Vector3>(new Vector3Writer());
+    }
+
+    public override void Write(ContentWriter writer, BoundingBox value)
+    {
+      writer.WriteRawObject<Vector3>(value.Min);
+      writer.WriteRawObject<Vector3>(value.Max);
+    }
+  }
+}
@@ -3,6 +3,7 @@ using Minotaur.Graphics;
 using Minotaur.Pipeline.Graphics;
 using System.Runtime.InteropServices;
 using System.Collections.Generic;
+using System.Linq;
 
 namespace Minotaur.Pipeline.Writers
 {
@@ -13,13 +14,25 @@ namespace Minotaur.Pipeline.Writers
 
     public override void Write(ContentWriter writer, IndexCollection value)
     {
-      List<byte> data = new List<byte>();
-      foreach (int i in value)
+      // use 16 bit indices whenever every index fits
+      if (value.All(i => i <= UInt16.MaxValue))
       {
-        data.AddRange(BitConverter.GetBytes(i));
+        writer.Write((uint)2);
+        writer.Write((uint)value.Count * 2);
+        foreach (uint i in value)
+        {
+          writer.Write((UInt16)i);
+        }
+      }
+      else
+      {
+        writer.Write((uint)4);
+        writer.Write((uint)value.Count * 4);
+        foreach (uint i in value)
+        {
+          writer.Write(i);
+        }
       }
-      writer.Write(data.Count);
-      writer.Write(data.ToArray());
     }
   }
 }
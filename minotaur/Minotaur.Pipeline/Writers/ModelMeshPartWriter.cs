@@ -27,6 +27,8 @@ namespace Minotaur.Pipeline.Writers
       writer.WriteSharedResource(value.VertexBuffer);
       writer.WriteSharedResource(value.IndexBuffer);
       writer.WriteSharedResource(value.Material);
+      writer.WriteRawObject(value.BoundingSphere);
+      writer.WriteRawObject(value.BoundingBox);
     }
   }
 }
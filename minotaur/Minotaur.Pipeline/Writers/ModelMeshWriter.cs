@@ -13,6 +13,7 @@ namespace Minotaur.Pipeline.Writers
     public override void Initialize(ContentTypeWriterManager manager)
     {
       manager.RegisterTypeWriter<Minotaur.Core.BoundingSphere>(new BoundingSphereWriter());
+      manager.RegisterTypeWriter<Minotaur.Core.BoundingBox>(new BoundingBoxWriter());
       //manager.RegisterTypeWriter<ModelMeshPartContent>(new ModelMeshPartWriter());
     }
 
@@ -21,6 +22,7 @@ namespace Minotaur.Pipeline.Writers
       writer.Write(value.Name);
       writer.Write((uint)(value.ParentBone == null ? 0 : value.ParentBone.Index + 1));
       writer.WriteRawObject(value.BoundingSphere);
+      writer.WriteRawObject(value.BoundingBox);
       writer.WriteSharedResource(value.Tag);
       writer.Write((uint)value.MeshParts.Count);
       ModelMeshPartWriter partWriter = new ModelMeshPartWriter();
@@ -17,6 +17,7 @@ namespace Minotaur.Pipeline.Writers
       manager.RegisterTypeWriter<VertexBufferContent>(new VertexBufferWriter());
       manager.RegisterTypeWriter<IndexCollection>(new IndexBufferWriter());
       manager.RegisterTypeWriter<Minotaur.Core.BoundingSphere>(new BoundingSphereWriter());
+      manager.RegisterTypeWriter<Minotaur.Core.BoundingBox>(new BoundingBoxWriter());
       manager.RegisterTypeWriter<MaterialContent>(new MaterialWriter());
       manager.RegisterTypeWriter<BoneAnimationsContent>(new BoneAnimationWriter());
     }
@@ -1,5 +1,6 @@
 using System;
 using System.Collections.Generic;
+using System.Linq;
 using Minotaur.Pipeline.Graphics;
 
 namespace Minotaur.Pipeline.Writers
@@ -24,8 +25,15 @@ namespace Minotaur.Pipeline.Writers
       writer.Write(value.CharacterSet.PaddingRight);
       writer.Write(value.CharacterSet.PaddingDowm);
       writer.Write(value.CharacterSet.PaddingLeft);
-      writer.Write(value.CharacterSet.Characters.Count);
-      foreach (SpriteFontContent.Character character in value.CharacterSet.Characters)
+      writer.Write(value.Texture.Faces[0][0].Width);
+      writer.Write(value.Texture.Faces[0][0].Height);
+      writer.Write(value.CharacterSet.DistanceFieldSpread);
+      // characters in codepoint order so the kerning table is sorted by (first, second)
+      List<SpriteFontContent.Character> characters = value.CharacterSet.Characters.OrderBy(c => c.ID).ToList();
+      List<int> seconds = new List<int>();
+      List<short> amounts = new List<short>();
+      writer.Write(characters.Count);
+      foreach (SpriteFontContent.Character character in characters)
       {
         writer.Write(character.ID);
         writer.Write(character.X);
@@ -35,13 +43,38 @@ namespace Minotaur.Pipeline.Writers
         writer.Write(character.XOffset);
         writer.Write(character.YOffset);
         writer.Write(character.XAdvance);
-        writer.Write(character.Kerning.Count);
-        foreach (KeyValuePair<int, int> pair in character.Kerning)
+        writer.Write(seconds.Count);
+        foreach (KeyValuePair<int, int> pair in character.Kerning.OrderBy(p => p.Key))
         {
-          writer.Write(pair.Key);
-          writer.Write(pair.Value);
+          if (pair.Value < short.MinValue || pair.Value > short.MaxValue)
+            throw new ContentException(string.Format("Kerning amount {0} between characters {1} and {2} does not fit in 16 bits", pair.Value, character.ID, pair.Key));
+          seconds.Add(pair.Key);
+          amounts.Add((short)pair.Value);
         }
       }
+      writer.Write(seconds.Count);
+      foreach (int second in seconds)
+        writer.Write(second);
+      foreach (short amount in amounts)
+        writer.Write(amount);
+
+      // dense codepoint to glyph index table, ushort.MaxValue where there is no glyph
+      if (characters.Count == 0)
+      {
+        writer.Write(0);
+        writer.Write(0);
+        return;
+      }
+      int first = characters.Min(c => c.ID);
+      ushort[] indices = new ushort[characters.Max(c => c.ID) - first + 1];
+      for (int i = 0; i < indices.Length; i++)
+        indices[i] = ushort.MaxValue;
+      for (int i = 0; i < characters.Count; i++)
+        indices[characters[i].ID - first] = (ushort)i;
+      writer.Write(first);
+      writer.Write(indices.Length);
+      foreach (ushort index in indices)
+        writer.Write(index);
     }
   }
 }
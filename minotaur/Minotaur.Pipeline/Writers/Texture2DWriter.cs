@@ -17,8 +17,7 @@ namespace Minotaur.Pipeline.Writers
       for (int i = 0; i < value.Faces[0].Count; i++)
       {
         byte[] data = value.Faces[0][i].Data();
-        writer.Write((uint)data.Length);
-        writer.Write(data);
+        writer.WriteBlob(data);
       }
     }
   }
@@ -24,8 +24,8 @@ namespace Minotaur.Pipeline.Writers
       }
       // vertex data
       byte[] data = value.GetBytes();
-      writer.Write(data.Length / value.Stride);     
-      writer.Write(data);
+      writer.Write(data.Length / value.Stride);
+      writer.WriteBlob(data);
     }
   }
 }
@@ -0,0 +1,49 @@
+﻿using System;
+
+namespace Minotaur.Content
+{
+  public struct ContentEntry
+  {
+    private long _offset;
+    private long _length;
+    private int _typeIndex;
+    private int _sharedResourceIndex;
+
+    public ContentEntry(long offset, long length, int typeIndex, int sharedResourceIndex)
+    {
+      _offset = offset;
+      _length = length;
+      _typeIndex = typeIndex;
+      _sharedResourceIndex = sharedResourceIndex;
+    }
+
+    /// <summary>
+    /// Offset of the object from the start of the file.
+    /// </summary>
+    public long Offset
+    {
+      get { return _offset; }
+    }
+
+    public long Length
+    {
+      get { return _length; }
+    }
+
+    /// <summary>
+    /// Index of the object's type in the file header, starting at 1.
+    /// </summary>
+    public int TypeIndex
+    {
+      get { return _typeIndex; }
+    }
+
+    /// <summary>
+    /// Index of the shared resource the object is, or -1 for the root object.
+    /// </summary>
+    public int SharedResourceIndex
+    {
+      get { return _sharedResourceIndex; }
+    }
+  }
+}
@@ -11,13 +11,29 @@ namespace Minotaur.Content
     #region Declarations
 
     private bool _disposed;
-    private static Byte _version = 1;
+    // version 2 files have the current record layouts, readers fall back to the version 1 layouts for older files
+    private static Byte _version = 2;
+    private const byte CompressedFlag = 0x1;
+    private const byte BlobSectionFlag = 0x2;
+    private const byte TableOfContentsFlag = 0x4;
+    private const byte StringPoolFlag = 0x8;
+    private const byte UncompressedHeaderFlag = 0x10;
     private BinaryReader _input;
     private static Encoding _encoding = Encoding.UTF8;
     private List<ContentTypeReader> _contentReaderList;
     private List<Action<object>>[] _sharedResourceCallbacks;
+    private object[] _sharedResources;
     private ContentTypeReaderManager _manager;
     private ContentManager _contentManager;
+    private byte _formatVersion;
+    private byte _flags;
+    private long _fileStart;
+    private long[] _blobOffsets;
+    private int[] _blobLengths;
+    private ContentEntry[] _entries;
+    private string[] _strings;
+    private bool _headerRead;
+    private int _sharedResourceCount;
 
     #endregion
 
@@ -27,15 +43,20 @@ namespace Minotaur.Content
 
     public ContentTypeReaderManager TypeReaderManager { get { return _manager; } }
 
+    public int Version { get { return _formatVersion; } }
+
     #endregion
 
     #region Constructor and Destructor
 
-    private ContentReader(ContentTypeReaderManager manager, ContentManager contentManager, Stream input)
+    private ContentReader(ContentTypeReaderManager manager, ContentManager contentManager, Stream input, byte version, byte flags, long fileStart)
     {
       _manager = manager;
       _contentManager = contentManager;
       _input = new BinaryReader(input);
+      _formatVersion = version;
+      _flags = flags;
+      _fileStart = fileStart;
       _contentReaderList = new List<ContentTypeReader>();
     }
 
@@ -121,13 +142,55 @@ namespace Minotaur.Content
       return _input.ReadBytes(count);
     }
 
+    public int ReadVarInt()
+    {
+      // 7 bits a byte, low bits first, with the top bit set on every byte but the last
+      int result = 0;
+      int shift = 0;
+      byte b;
+      do
+      {
+        if (shift > 28)
+          throw new ContentLoadException("Variable length integer is longer than 32 bits");
+        b = _input.ReadByte();
+        result |= (b & 0x7f) << shift;
+        shift += 7;
+      } while ((b & 0x80) != 0);
+      return result;
+    }
+
     public string ReadString()
     {
+      if ((_flags & StringPoolFlag) != 0)
+      {
+        // each distinct string is created once, when the pool is read with the header
+        int index = ReadVarInt();
+        if (index >= _strings.Length)
+          throw new ContentLoadException(string.Format("String index {0} is outside the {1} pooled strings", index, _strings.Length));
+        return _strings[index];
+      }
       int length = _input.ReadInt32();
       byte[] bytes = _input.ReadBytes(length);
       return _encoding.GetString(bytes);
     }
 
+    public byte[] ReadBlob()
+    {
+      // bulk data is inline after its length, or in files with a blob section read from its aligned offset there
+      if ((_flags & BlobSectionFlag) == 0)
+        return _input.ReadBytes(_input.ReadInt32());
+
+      int index = _input.ReadInt32();
+      if (index < 0 || index >= _blobOffsets.Length)
+        throw new ContentLoadException(string.Format("Blob index {0} is outside the {1} blobs in the file", index, _blobOffsets.Length));
+      Stream stream = _input.BaseStream;
+      long position = stream.Position;
+      stream.Seek(_fileStart + _blobOffsets[index], SeekOrigin.Begin);
+      byte[] data = _input.ReadBytes(_blobLengths[index]);
+      stream.Seek(position, SeekOrigin.Begin);
+      return data;
+    }
+
     public Guid ReadGuid()
     {
       return new Guid(_input.ReadBytes(16));
@@ -203,12 +266,50 @@ namespace Minotaur.Content
       index--;
       if (index >= _sharedResourceCallbacks.Length)
         throw new ContentLoadException(string.Format("Shared resource index {0} is greater than number of shared resources {1}", index, _sharedResourceCallbacks.Length));
-      _sharedResourceCallbacks[index].Add(obj =>
+      Action<object> resolve = obj =>
       {
         if (!(obj is T))
           throw new ContentLoadException(string.Format("Shared resource at {0} is not of Type {1}", index, typeof(T)));
         callback((T)obj);
-      });
+      };
+      // a resource read ahead of the object referring to it, by ReadEntry, resolves straight away
+      if (_sharedResources[index] != null)
+        resolve(_sharedResources[index]);
+      else
+        _sharedResourceCallbacks[index].Add(resolve);
+    }
+
+    /// <summary>
+    /// The root object then each shared resource in the file, empty if it was written without a table of contents.
+    /// </summary>
+    public ContentEntry[] ReadTableOfContents()
+    {
+      ReadHeader();
+      return _entries;
+    }
+
+    /// <summary>
+    /// Reads one object listed in the table of contents without reading the rest of the file. Reading a shared resource
+    /// completes the references to it from objects already read.
+    /// </summary>
+    public T ReadEntry<T>(ContentEntry entry)
+    {
+      ReadHeader();
+      if (!_input.BaseStream.CanSeek)
+        throw new ContentLoadException("Content entries can only be read from a seekable stream");
+      T result;
+      try
+      {
+        _input.BaseStream.Seek(_fileStart + entry.Offset, SeekOrigin.Begin);
+        result = ReadObject<T>();
+      }
+      catch (IOException inner)
+      {
+        throw new ContentLoadException(string.Format("Error Reading content entry at {0}", entry.Offset), inner);
+      }
+      if (entry.SharedResourceIndex >= 0)
+        ResolveSharedResource(entry.SharedResourceIndex, result);
+      return result;
     }
 
     public T ReadExternalReference<T>()
@@ -230,8 +331,11 @@ namespace Minotaur.Content
 
     public static ContentReader Create(ContentTypeReaderManager manager, ContentManager contentManager, Stream input, string identifier)
     {
-      input = PrepareStream(input, identifier);
-      return new ContentReader(manager, contentManager, input);
+      long fileStart = input.CanSeek ? input.Position : 0;
+      byte version;
+      byte flags;
+      input = PrepareStream(input, identifier, out version, out flags);
+      return new ContentReader(manager, contentManager, input, version, flags, fileStart);
     }
 
     public static Stream PrepareStream(Stream input)
@@ -240,6 +344,13 @@ namespace Minotaur.Content
     }
 
     public static Stream PrepareStream(Stream input, string identifier)
+    {
+      byte version;
+      byte flags;
+      return PrepareStream(input, identifier, out version, out flags);
+    }
+
+    public static Stream PrepareStream(Stream input, string identifier, out byte version, out byte flags)
     {
       Stream result;
       try
@@ -250,15 +361,17 @@ namespace Minotaur.Content
           if (binaryReader.ReadByte() != (Byte)c)
             throw new ContentLoadException(string.Format("File identifier bytes do not match: {0}", identifier));
         }
-        if (binaryReader.ReadByte() != _version)
-          throw new ContentLoadException(string.Format("Format version does not match: {0}", _version));
-        byte flags = binaryReader.ReadByte();
+        version = binaryReader.ReadByte();
+        if (version < 1 || version > _version)
+          throw new ContentLoadException(string.Format("Format version {0} is not supported, the latest is {1}", version, _version));
+        flags = binaryReader.ReadByte();
 
         long fileSize = binaryReader.ReadInt64();
         long headerLength = (long)(identifier.Length + 10);
         if (input.CanSeek && (fileSize - headerLength) != input.Length - input.Position)
           throw new ContentLoadException("File size does not match header size");
-        if ((flags & 0x1) != 0)
+        // a compressed file written in place has its header uncompressed, the reader inflates what follows it
+        if ((flags & CompressedFlag) != 0 && (flags & UncompressedHeaderFlag) == 0)
         {
           result = new DeflateStream(input, CompressionMode.Decompress);
         }
@@ -286,6 +399,8 @@ namespace Minotaur.Content
 
     private int ReadHeader()
     {
+      if (_headerRead)
+        return _sharedResourceCount;
       int typeCount = _input.ReadInt32();
       for (int i = 0; i < typeCount; i++)
       {
@@ -296,24 +411,104 @@ namespace Minotaur.Content
       int resourceCount = _input.ReadInt32();
 
       _sharedResourceCallbacks = new List<Action<object>>[resourceCount];
+      _sharedResources = new object[resourceCount];
       for (int i = 0; i < resourceCount; i++)
       {
         _sharedResourceCallbacks[i] = new List<Action<object>>();
       }
 
+      if ((_flags & BlobSectionFlag) != 0)
+        ReadBlobTable(_input.ReadInt64());
+      if ((_flags & TableOfContentsFlag) != 0)
+        ReadTableOfContents(_input.ReadInt64(), resourceCount);
+      else
+        _entries = new ContentEntry[0];
+      if ((_flags & StringPoolFlag) != 0)
+        ReadStringPool(_input.ReadInt64());
+
+      if ((_flags & CompressedFlag) != 0 && (_flags & UncompressedHeaderFlag) != 0)
+        _input = new BinaryReader(new DeflateStream(_input.BaseStream, CompressionMode.Decompress));
+
+      _headerRead = true;
+      _sharedResourceCount = resourceCount;
       return resourceCount;
     }
 
+    private void ReadTableOfContents(long offset, int resourceCount)
+    {
+      // like the blob table it is at the end of the file
+      Stream stream = _input.BaseStream;
+      if (!stream.CanSeek)
+        throw new ContentLoadException("Content with a table of contents must be read from a seekable stream");
+      long position = stream.Position;
+      stream.Seek(_fileStart + offset, SeekOrigin.Begin);
+      int count = _input.ReadInt32();
+      if (count > resourceCount + 1)
+        throw new ContentLoadException(string.Format("Table of contents lists {0} objects, the file has {1} shared resources", count, resourceCount));
+      _entries = new ContentEntry[count];
+      for (int i = 0; i < count; i++)
+      {
+        long entryOffset = _input.ReadInt64();
+        long length = _input.ReadInt64();
+        int typeIndex = _input.ReadInt32();
+        _entries[i] = new ContentEntry(entryOffset, length, typeIndex, i - 1);
+      }
+      stream.Seek(position, SeekOrigin.Begin);
+    }
+
+    private void ReadBlobTable(long offset)
+    {
+      // the table follows the blobs at the end of the file, so it is read before the content refers to them
+      Stream stream = _input.BaseStream;
+      if (!stream.CanSeek)
+        throw new ContentLoadException("Content with a blob section must be read from a seekable stream");
+      long position = stream.Position;
+      stream.Seek(_fileStart + offset, SeekOrigin.Begin);
+      int count = _input.ReadInt32();
+      _input.ReadInt32();  // alignment
+      _blobOffsets = new long[count];
+      _blobLengths = new int[count];
+      for (int i = 0; i < count; i++)
+      {
+        _blobOffsets[i] = _input.ReadInt64();
+        _blobLengths[i] = (int)_input.ReadInt64();
+      }
+      stream.Seek(position, SeekOrigin.Begin);
+    }
+
+    private void ReadStringPool(long offset)
+    {
+      Stream stream = _input.BaseStream;
+      if (!stream.CanSeek)
+        throw new ContentLoadException("Content with a string pool must be read from a seekable stream");
+      long position = stream.Position;
+      stream.Seek(_fileStart + offset, SeekOrigin.Begin);
+      int count = _input.ReadInt32();
+      _strings = new string[count];
+      for (int i = 0; i < count; i++)
+      {
+        int length = ReadVarInt();
+        _strings[i] = _encoding.GetString(_input.ReadBytes(length));
+      }
+      stream.Seek(position, SeekOrigin.Begin);
+    }
+
     internal void ReadSharedResources(int count)
     {
       for (int i = 0; i < count; i++)
       {
-        object obj = ReadObject<object>();
-        foreach (Action<object> callback in _sharedResourceCallbacks[i])
-        {
-          callback(obj);
-        }
+        ResolveSharedResource(i, ReadObject<object>());
+      }
+    }
+
+    private void ResolveSharedResource(int index, object obj)
+    {
+      _sharedResources[index] = obj;
+      foreach (Action<object> callback in _sharedResourceCallbacks[index])
+      {
+        callback(obj);
       }
+      _sharedResourceCallbacks[index].Clear();
     }
 
     private void Pump(Stream input, Stream output)
@@ -11,14 +11,28 @@ namespace Minotaur.Content
 
     public override object Read(ContentReader reader)
     {
-      uint length = reader.ReadUInt32();
-      byte[] data = reader.ReadBytes((int)length);
-      UInt32[] indexes = new UInt32[length / 4];
-      for (int i = 0; i < length / 4; i++)
+      uint elementSize = reader.ReadUInt32();
+      byte[] data;
+      // older files start with the byte length of 32 bit triangle indices,
+      // which is a multiple of 12 and so never a valid element size.
+      if (elementSize == 2 || elementSize == 4)
+        data = reader.ReadBlob();
+      else
       {
-        indexes[i] = BitConverter.ToUInt32(data, i * 4);
+        data = reader.ReadBytes((int)elementSize);
+        elementSize = 4;
       }
+      int length = data.Length;
 
+      if (elementSize == 2)
+      {
+        UInt16[] shortIndexes = new UInt16[length / 2];
+        Buffer.BlockCopy(data, 0, shortIndexes, 0, shortIndexes.Length * 2);
+        return IndexBuffer.Create(shortIndexes);
+      }
+
+      UInt32[] indexes = new UInt32[length / 4];
+      Buffer.BlockCopy(data, 0, indexes, 0, indexes.Length * 4);
       return IndexBuffer.Create(indexes);
     }
   }
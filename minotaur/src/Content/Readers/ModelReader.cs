@@ -18,6 +18,7 @@ namespace Minotaur.Content
     public override void Initialize(ContentTypeReaderManager manager)
     {
       manager.RegisterTypeReader<BoundingSphere>(new BoundingSphereReader());
+      manager.RegisterTypeReader<BoundingBox>(new BoundingBoxReader());
       manager.RegisterTypeReader<Matrix4>(new MatrixReader());
       manager.RegisterTypeReader<VertexBuffer>(new VertexBufferReader());
       manager.RegisterTypeReader<IndexBuffer>(new IndexBufferReader());
@@ -64,6 +65,15 @@ namespace Minotaur.Content
         string meshName = reader.ReadString();
         int parentBone = (int)reader.ReadUInt32();
         BoundingSphere boundingSphere = reader.ReadObjectRaw<BoundingSphere>();
+        BoundingBox boundingBox;
+        if (reader.Version >= 2)
+          boundingBox = reader.ReadObjectRaw<BoundingBox>();
+        else
+        {
+          // version 1 files only have the sphere, the box around it still bounds the mesh
+          Vector3 extent = new Vector3(boundingSphere.Radius);
+          boundingBox = new BoundingBox(boundingSphere.Center - extent, boundingSphere.Center + extent);
+        }
         reader.ReadSharedResource<object>(o => meshes[i].Tag = o);
         int meshPartCount = (int)reader.ReadUInt32();
         List<ModelMeshPart> parts = new List<ModelMeshPart>();
@@ -88,12 +98,24 @@ namespace Minotaur.Content
           {
             part.Material = x;
           });
+          if (reader.Version >= 2)
+          {
+            part.BoundingSphere = reader.ReadObjectRaw<BoundingSphere>();
+            part.BoundingBox = reader.ReadObjectRaw<BoundingBox>();
+          }
+          else
+          {
+            // parts of version 1 files are only bounded by their mesh
+            part.BoundingSphere = boundingSphere;
+            part.BoundingBox = boundingBox;
+          }
           parts.Add(part);
         }
         ModelMesh mesh = new ModelMesh(parts);
         mesh.Name = meshName;
         mesh.ParentBone = parentBone == 0 ? null : bones[parentBone - 1];
         mesh.BoundingSphere = boundingSphere;
+        mesh.BoundingBox = boundingBox;
         meshes.Add(mesh);
       }
       uint rootBoneIndex = reader.ReadUInt32();
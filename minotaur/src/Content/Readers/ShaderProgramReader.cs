@@ -0,0 +1,117 @@
+using System;
+using System.Collections.Generic;
+using System.Text.RegularExpressions;
+using Minotaur.Core;
+using Minotaur.Graphics;
+using OpenTK.Graphics.OpenGL;
+
+namespace Minotaur.Content
+{
+  /// <summary>
+  /// Reads the linked programs written by the CreateShaderSource utility, which share the shader source type id.
+  /// Register it in place of ShaderSourceReader for content built with the utilities.
+  /// </summary>
+  public class ShaderProgramReader : ContentTypeReader<Program>
+  {
+    private static Regex shaderErrorRegex = new Regex(@"ERROR: (\d+):(\d+): (.*)");
+
+    private ProgramBinaryCache _cache;
+
+    public ShaderProgramReader(ProgramBinaryCache cache = null)
+      : base(new Guid("205801eb-a58e-4627-a2df-7c9dafdd33d6"))
+    {
+      _cache = cache ?? new ProgramBinaryCache();
+    }
+
+    public override void Initialize(ContentTypeReaderManager manager)
+    {
+
+    }
+
+    public override object Read(ContentReader reader)
+    {
+      int fileCount = reader.ReadInt32();
+      string[] files = new string[fileCount];
+      for (int i = 0; i < fileCount; i++)
+      {
+        int number = reader.ReadInt32();
+        files[number] = reader.ReadString();
+      }
+
+      int stageCount = reader.ReadInt32();
+      ShaderType[] types = new ShaderType[stageCount];
+      string[] sources = new string[stageCount];
+      for (int i = 0; i < stageCount; i++)
+      {
+        types[i] = ShaderTypeFromID(reader.ReadInt32());
+        sources[i] = reader.ReadString();
+      }
+
+      string sourceHash = reader.ReadString();
+      int entryCount = reader.ReadInt32();
+      List<ProgramBinaryCache.Entry> entries = new List<ProgramBinaryCache.Entry>();
+      for (int i = 0; i < entryCount; i++)
+      {
+        ProgramBinaryCache.Entry entry = new ProgramBinaryCache.Entry();
+        entry.DriverID = reader.ReadString();
+        entry.Format = reader.ReadInt32();
+        entry.Data = reader.ReadBytes(reader.ReadInt32());
+        entries.Add(entry);
+      }
+
+      Program program = _cache.Load(sourceHash, entries);
+      if (program != null)
+        return program;
+
+      // no binary for this driver, compile the sources
+      List<Shader> shaders = new List<Shader>();
+      try
+      {
+        for (int i = 0; i < stageCount; i++)
+        {
+          try
+          {
+            shaders.Add(new Shader(sources[i], types[i]));
+          }
+          catch (CompileFailedException e)
+          {
+            throw new CompileFailedException(MapErrors(e.Message, files));
+          }
+        }
+        program = new Program(shaders);
+      }
+      finally
+      {
+        // the program keeps the linked shaders alive
+        foreach (Shader shader in shaders)
+          shader.Dispose();
+      }
+      _cache.Store(sourceHash, program);
+      return program;
+    }
+
+    private ShaderType ShaderTypeFromID(int id)
+    {
+      if (id == 0)
+        return ShaderType.VertexShader;
+      else if (id == 1)
+        return ShaderType.FragmentShader;
+      else if (id == 2)
+        return ShaderType.GeometryShader;
+      else
+        throw new ArgumentException(string.Format("Unknown shader type id: {0}", id));
+    }
+
+    private string MapErrors(string log, string[] files)
+    {
+      // the sources number their files with #line directives, name them in the errors
+      return shaderErrorRegex.Replace(log, m =>
+      {
+        int fileNumber = int.Parse(m.Groups[1].Value);
+        if (fileNumber >= files.Length)
+          return m.Value;
+        return string.Format("{0} line {1}: {2}", files[fileNumber], m.Groups[2].Value, m.Groups[3].Value);
+      });
+    }
+  }
+}
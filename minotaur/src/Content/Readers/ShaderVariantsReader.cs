@@ -0,0 +1,79 @@
+using System;
+using System.Collections.Generic;
+using Minotaur.Core;
+using Minotaur.Graphics;
+using OpenTK.Graphics.OpenGL;
+
+namespace Minotaur.Content
+{
+  public class ShaderVariantsReader : ContentTypeReader<ShaderVariants>
+  {
+    public ShaderVariantsReader()
+      : base(new Guid("a5da1ca4-3ecc-44e3-826b-66b4d785e7a8")) { }
+
+    public override void Initialize(ContentTypeReaderManager manager)
+    {
+
+    }
+
+    public override object Read(ContentReader reader)
+    {
+      int fileCount = reader.ReadInt32();
+      string[] files = new string[fileCount];
+      for (int i = 0; i < fileCount; i++)
+      {
+        int number = reader.ReadInt32();
+        files[number] = reader.ReadString();
+      }
+
+      // the key of a variant is the sum of each option's value index times its stride
+      int optionCount = reader.ReadInt32();
+      List<ShaderVariants.Option> options = new List<ShaderVariants.Option>();
+      int stride = 1;
+      for (int i = 0; i < optionCount; i++)
+      {
+        ShaderVariants.Option option = new ShaderVariants.Option();
+        option.Name = reader.ReadString();
+        option.Values = new string[reader.ReadInt32()];
+        for (int j = 0; j < option.Values.Length; j++)
+          option.Values[j] = reader.ReadString();
+        option.Stride = stride;
+        stride *= option.Values.Length;
+        options.Add(option);
+      }
+
+      string[] chunks = new string[reader.ReadInt32()];
+      for (int i = 0; i < chunks.Length; i++)
+        chunks[i] = reader.ReadString();
+
+      ShaderVariants.Stage[][] variants = new ShaderVariants.Stage[reader.ReadInt32()][];
+      for (int i = 0; i < variants.Length; i++)
+      {
+        variants[i] = new ShaderVariants.Stage[reader.ReadInt32()];
+        for (int j = 0; j < variants[i].Length; j++)
+        {
+          ShaderVariants.Stage stage = new ShaderVariants.Stage();
+          stage.Type = ShaderTypeFromID(reader.ReadInt32());
+          int chunkCount = reader.ReadInt32();
+          stage.Chunks = new int[chunkCount];
+          Buffer.BlockCopy(reader.ReadBytes(chunkCount * sizeof(int)), 0, stage.Chunks, 0, chunkCount * sizeof(int));
+          variants[i][j] = stage;
+        }
+      }
+
+      return new ShaderVariants(files, options, chunks, variants);
+    }
+
+    private ShaderType ShaderTypeFromID(int id)
+    {
+      if (id == 0)
+        return ShaderType.VertexShader;
+      else if (id == 1)
+        return ShaderType.FragmentShader;
+      else if (id == 2)
+        return ShaderType.GeometryShader;
+      else
+        throw new ArgumentException(string.Format("Unknown shader type id: {0}", id));
+    }
+  }
+}
@@ -1,4 +1,5 @@
 using System;
+using System.Collections.Generic;
 using System.Linq;
 using Minotaur.Core;
 using Minotaur.Graphics;
@@ -32,9 +33,20 @@ namespace Minotaur.Content
       font.CharacterSet.PaddingRight = reader.ReadInt32();
       font.CharacterSet.PaddingDown = reader.ReadInt32();
       font.CharacterSet.PaddingLeft = reader.ReadInt32();
-      font.CharacterSet.Width = texture.Width;
-      font.CharacterSet.Height = texture.Height;
+      if (reader.Version >= 2)
+      {
+        // glyphs are positioned in the source atlas size, a distance field texture may be smaller
+        font.CharacterSet.Width = reader.ReadInt32();
+        font.CharacterSet.Height = reader.ReadInt32();
+        font.CharacterSet.DistanceFieldSpread = reader.ReadSingle();
+      }
+      else
+      {
+        font.CharacterSet.Width = texture.Width;
+        font.CharacterSet.Height = texture.Height;
+      }
       int characterCount = reader.ReadInt32();
+      List<Tuple<int, int, int>> kerning = new List<Tuple<int, int, int>>();
       for (int i = 0; i < characterCount; i++)
       {
         BitmapCharacter character = new BitmapCharacter();
@@ -46,16 +58,55 @@ namespace Minotaur.Content
         character.XOffset = reader.ReadInt32();
         character.YOffset = reader.ReadInt32();
         character.XAdvance = reader.ReadInt32();
-        int kerningCount = reader.ReadInt32();
-        for (int j = 0; j < kerningCount; j++)
+        if (reader.Version >= 2)
+          character.KerningOffset = reader.ReadInt32();
+        else
         {
-          int key = reader.ReadInt32();
-          int value = reader.ReadInt32();
-          character.Kerning[key] = value;
+          // version 1 files list each glyph's kerning pairs after it
+          int kerningCount = reader.ReadInt32();
+          for (int j = 0; j < kerningCount; j++)
+          {
+            int second = reader.ReadInt32();
+            int amount = reader.ReadInt32();
+            kerning.Add(Tuple.Create(character.ID, second, amount));
+          }
         }
         font.CharacterSet.Characters.Add(character);
       }
 
+      if (reader.Version >= 2)
+      {
+        // one table of kerning pairs sorted by first character, each glyph's run ends where the next one's starts
+        int pairCount = reader.ReadInt32();
+        int[] kerningSeconds = new int[pairCount];
+        Buffer.BlockCopy(reader.ReadBytes(pairCount * sizeof(int)), 0, kerningSeconds, 0, pairCount * sizeof(int));
+        short[] kerningAmounts = new short[pairCount];
+        Buffer.BlockCopy(reader.ReadBytes(pairCount * sizeof(short)), 0, kerningAmounts, 0, pairCount * sizeof(short));
+        font.CharacterSet.KerningSeconds = kerningSeconds;
+        font.CharacterSet.KerningAmounts = kerningAmounts;
+        for (int i = 0; i < characterCount; i++)
+        {
+          int end = i + 1 < characterCount ? font.CharacterSet.Characters[i + 1].KerningOffset : pairCount;
+          font.CharacterSet.Characters[i].KerningCount = end - font.CharacterSet.Characters[i].KerningOffset;
+        }
+      }
+      else
+      {
+        // the table is built from the pairs, which needs the codepoint lookup
+        font.CharacterSet.BuildLookupTable();
+        font.CharacterSet.SetKerning(kerning);
+      }
+
+      if (reader.Version >= 2)
+      {
+        font.CharacterSet.FirstCodepoint = reader.ReadInt32();
+        int lookupCount = reader.ReadInt32();
+        byte[] lookupData = reader.ReadBytes(lookupCount * sizeof(ushort));
+        ushort[] glyphIndices = new ushort[lookupCount];
+        Buffer.BlockCopy(lookupData, 0, glyphIndices, 0, lookupData.Length);
+        font.CharacterSet.GlyphIndices = glyphIndices;
+      }
+
       font.Ascent = font.CharacterSet.Characters.Where(c => c.ID > 33 && c.ID < 127).Max(c => c.YOffset);
       font.Descent = font.CharacterSet.Characters.Where(c => c.ID > 33 && c.ID < 127).Max(c => c.Height - c.YOffset);
 
@@ -28,26 +28,41 @@ namespace Minotaur.Content
       PixelFormatFromInt((int)format, out internalFormat, out pixelFormat, out pixelType);
       //Texture2D texture = new Texture2D(width, height, internalFormat);
       Texture2D texture = Texture2D.CreateEmpty(width, height, internalFormat);
+      ReadMipmaps(reader, texture, (int)format, width, height, mipmapCount);
+
+      return texture;
+    }
+
+    internal static void ReadMipmaps(ContentReader reader, Texture2D texture, int format, int width, int height, int mipmapCount)
+    {
+      PixelInternalFormat internalFormat;
+      PixelFormat pixelFormat;
+      PixelType pixelType;
+      PixelFormatFromInt(format, out internalFormat, out pixelFormat, out pixelType);
 
       for (int i = 0; i < mipmapCount; i++)
       {
-        UInt32 dataSize = reader.ReadUInt32();
-        byte[] imageData = reader.ReadBytes((int)dataSize);
-        SetMipmap(texture, i, width, height, imageData, internalFormat, pixelFormat, pixelType, format == 6 || format == 7);
-        width /= 2;
-        height /= 2;
+        byte[] imageData = reader.ReadBlob();
+        SetMipmap(texture, i, width, height, imageData, internalFormat, pixelFormat, pixelType, IsCompressed(format));
+        width = Math.Max(1, width / 2);
+        height = Math.Max(1, height / 2);
       }
 
-      return texture;
+      if (mipmapCount > 1)
+      {
+        texture.Bind();
+        GL.TexParameter(TextureTarget.Texture2D, TextureParameterName.TextureMaxLevel, mipmapCount - 1);
+        texture.Unbind();
+        texture.MinFilter = TextureMinFilter.LinearMipmapLinear;
+      }
     }
 
-    private void SetMipmap(Texture2D texture, int level, int width, int height, byte[] data, PixelInternalFormat internalFormat, PixelFormat pixelFormat, PixelType pixelType, bool compressed)
+    private static void SetMipmap(Texture2D texture, int level, int width, int height, byte[] data, PixelInternalFormat internalFormat, PixelFormat pixelFormat, PixelType pixelType, bool compressed)
     {
       if (compressed)
       {
-        int size = ((width+3)/4)*((height+3)/4)*16; // 16 is the block size
         texture.Bind();
-        GL.CompressedTexImage2D(TextureTarget.Texture2D, level, internalFormat, width, height, 0, 0, data);
+        GL.CompressedTexImage2D(TextureTarget.Texture2D, level, internalFormat, width, height, 0, data.Length, data);
         texture.Unbind();
       }
       else
@@ -69,6 +84,11 @@ namespace Minotaur.Content
       Utilities.CheckGLError();
     }
 
+    public static bool IsCompressed(int value)
+    {
+      return value == 6 || value == 7 || (value >= 13 && value <= 16);
+    }
+
     public static void PixelFormatFromInt(int value, out PixelInternalFormat internalFormat, out PixelFormat pixelFormat, out PixelType pixelType)
     {
       pixelType = PixelType.UnsignedByte;
@@ -126,6 +146,23 @@ namespace Minotaur.Content
           internalFormat = PixelInternalFormat.Rgb32f;
           pixelFormat = PixelFormat.Rgb;
           break;
+        case 13:
+          internalFormat = PixelInternalFormat.CompressedRgbaS3tcDxt1Ext;
+          pixelFormat = PixelFormat.Rgba;
+          break;
+        case 14:
+          internalFormat = PixelInternalFormat.CompressedRedRgtc1;
+          pixelFormat = PixelFormat.Red;
+          break;
+        case 15:
+          internalFormat = PixelInternalFormat.CompressedRgRgtc2;
+          pixelFormat = PixelFormat.Rg;
+          break;
+        case 16:
+          // GL_COMPRESSED_RGBA_BPTC_UNORM
+          internalFormat = (PixelInternalFormat)0x8E8C;
+          pixelFormat = PixelFormat.Rgba;
+          break;
         default:
           throw new ArgumentOutOfRangeException(string.Format("Unknown PixelFormat Enumeration: {0}", value));
       }
@@ -0,0 +1,45 @@
+using System;
+using Minotaur.Core;
+using Minotaur.Graphics;
+using OpenTK.Graphics.OpenGL;
+
+namespace Minotaur.Content
+{
+  public class TextureAtlasReader : ContentTypeReader<TextureAtlas>
+  {
+    public TextureAtlasReader()
+      : base(new Guid("20f75bf7-b777-4c52-8b26-abac8b1e01a1")) { }
+
+    public override void Initialize(ContentTypeReaderManager manager)
+    {
+
+    }
+
+    public override object Read(ContentReader reader)
+    {
+      UInt32 format = reader.ReadUInt32();
+      int width = reader.ReadInt32();
+      int height = reader.ReadInt32();
+      int mipmapCount = reader.ReadInt32();
+      PixelInternalFormat internalFormat;
+      PixelFormat pixelFormat;
+      PixelType pixelType;
+      Texture2DReader.PixelFormatFromInt((int)format, out internalFormat, out pixelFormat, out pixelType);
+      TextureAtlas atlas = new TextureAtlas(width, height, null, internalFormat, pixelFormat, pixelType, TextureMinFilter.Linear, TextureMagFilter.Linear);
+      Texture2DReader.ReadMipmaps(reader, atlas, (int)format, width, height, mipmapCount);
+
+      int spriteCount = reader.ReadInt32();
+      for (int i = 0; i < spriteCount; i++)
+      {
+        string name = reader.ReadString();
+        int x = reader.ReadInt32();
+        int y = reader.ReadInt32();
+        int spriteWidth = reader.ReadInt32();
+        int spriteHeight = reader.ReadInt32();
+        atlas.AddSprite(name, x, y, spriteWidth, spriteHeight);
+      }
+
+      return atlas;
+    }
+  }
+}
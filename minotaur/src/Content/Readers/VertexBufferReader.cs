@@ -18,7 +18,14 @@ namespace Minotaur.Content
     {
       VertexFormat format = reader.ReadObjectRaw<VertexFormat>();
       uint vertexCount = reader.ReadUInt32();
-      byte[] data = reader.ReadBytes(format.Stride * (int)vertexCount);
+      byte[] data;
+      // version 1 files store the vertices inline, without a length
+      if (reader.Version >= 2)
+        data = reader.ReadBlob();
+      else
+        data = reader.ReadBytes(format.Stride * (int)vertexCount);
+      if (data.Length != format.Stride * (int)vertexCount)
+        throw new ContentLoadException(string.Format("Vertex data is {0} bytes, expected {1} vertices of {2} bytes", data.Length, vertexCount, format.Stride));
 
       VertexBuffer buffer = VertexBuffer.Create(format, data);
       return buffer;
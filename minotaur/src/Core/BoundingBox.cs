@@ -89,7 +89,7 @@ namespace Minotaur.Core
       foreach (Vector3 point in points)
       {
         min = Vector3.Min(min, point);
-        max = Vector3.Min(max, point);
+        max = Vector3.Max(max, point);
       }
       return new BoundingBox(min, max);
     }
@@ -1,6 +1,4 @@
-﻿using System.Collections.Generic;
-
-namespace Minotaur.Graphics
+﻿namespace Minotaur.Graphics
 {
     public class BitmapCharacter
     {
@@ -12,6 +10,8 @@ namespace Minotaur.Graphics
         public int XOffset;
         public int YOffset;
         public int XAdvance;
-        public Dictionary<int, int> Kerning = new Dictionary<int, int>();
+        // range of this character's pairs in BitmapCharacterSet.KerningSeconds and KerningAmounts
+        public int KerningOffset;
+        public int KerningCount;
     }
 }
@@ -16,20 +16,85 @@ namespace Minotaur.Graphics
         public int PaddingRight = 0;
         public int PaddingDown = 0;
         public int PaddingLeft = 0;
+        // spread in atlas pixels of a signed distance field texture, 0 for a coverage texture
+        public float DistanceFieldSpread = 0;
         public List<BitmapCharacter> Characters = new List<BitmapCharacter>();
+        // index in Characters of each codepoint from FirstCodepoint, ushort.MaxValue where there is no glyph
+        public int FirstCodepoint;
+        public ushort[] GlyphIndices;
+        // kerning pairs sorted by first then second character, the first character of a pair is the
+        // one whose KerningOffset and KerningCount cover it
+        public int[] KerningSeconds = new int[0];
+        public short[] KerningAmounts = new short[0];
 
         public BitmapCharacter this[int id]
         {
             get
             {
-                return Characters.FirstOrDefault(c => c.ID == id);
+                return GetCharacterByID(id);
             }
         }
 
         public BitmapCharacter GetCharacterByID(int id)
         {
-            BitmapCharacter character = Characters.FirstOrDefault(c => c.ID == id);
-            return character;
+            if (GlyphIndices == null)
+                return Characters.FirstOrDefault(c => c.ID == id);
+            int index = id - FirstCodepoint;
+            if (index < 0 || index >= GlyphIndices.Length || GlyphIndices[index] == ushort.MaxValue)
+                return null;
+            return Characters[GlyphIndices[index]];
+        }
+
+        /// <summary>
+        /// Builds the codepoint lookup table from Characters, call again after changing them.
+        /// </summary>
+        public void BuildLookupTable()
+        {
+            GlyphIndices = null;
+            if (Characters.Count == 0)
+                return;
+            FirstCodepoint = Characters.Min(c => c.ID);
+            ushort[] indices = new ushort[Characters.Max(c => c.ID) - FirstCodepoint + 1];
+            for (int i = 0; i < indices.Length; i++)
+                indices[i] = ushort.MaxValue;
+            for (int i = 0; i < Characters.Count; i++)
+                indices[Characters[i].ID - FirstCodepoint] = (ushort)i;
+            GlyphIndices = indices;
+        }
+
+        public int GetKerning(int first, int second)
+        {
+            BitmapCharacter character = GetCharacterByID(first);
+            if (character == null || character.KerningCount == 0)
+                return 0;
+            int index = Array.BinarySearch(KerningSeconds, character.KerningOffset, character.KerningCount, second);
+            return index < 0 ? 0 : KerningAmounts[index];
+        }
+
+        /// <summary>
+        /// Builds the kerning table from (first, second, amount) pairs, call after BuildLookupTable.
+        /// </summary>
+        public void SetKerning(IEnumerable<Tuple<int, int, int>> pairs)
+        {
+            List<Tuple<int, int, int>> sorted = pairs.OrderBy(p => p.Item1).ThenBy(p => p.Item2).ToList();
+            KerningSeconds = sorted.Select(p => p.Item2).ToArray();
+            if (sorted.Any(p => p.Item3 < short.MinValue || p.Item3 > short.MaxValue))
+                throw new ArgumentOutOfRangeException("pairs", "Kerning amounts must fit in 16 bits.");
+            KerningAmounts = sorted.Select(p => (short)p.Item3).ToArray();
+            foreach (BitmapCharacter character in Characters)
+            {
+                character.KerningOffset = 0;
+                character.KerningCount = 0;
+            }
+            for (int i = 0; i < sorted.Count; i++)
+            {
+                BitmapCharacter character = GetCharacterByID(sorted[i].Item1);
+                if (character == null)
+                    continue;
+                if (character.KerningCount == 0)
+                    character.KerningOffset = i;
+                character.KerningCount++;
+            }
         }
     }
 }
@@ -46,6 +46,7 @@ namespace Minotaur.Graphics
         // load and parse a BMFont file
         public void ParseFNTFile(string fntFile)
         {
+            List<Tuple<int, int, int>> kerning = new List<Tuple<int, int, int>>();
             using (StreamReader stream = new StreamReader(fntFile))
             {
                 string line;
@@ -155,12 +156,12 @@ namespace Minotaur.Graphics
                                 amount = int.Parse(tokens[i + 1]);
                             }
                         }
-                        BitmapCharacter character = _characterSet.GetCharacterByID(index);
-                        if (character != null)
-                            character.Kerning[second] = amount;
+                        kerning.Add(Tuple.Create(index, second, amount));
                     }
                 }
             }
+            _characterSet.BuildLookupTable();
+            _characterSet.SetKerning(kerning);
         }
 
         public Vector2 MeasureString(string s)
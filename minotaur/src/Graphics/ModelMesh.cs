@@ -15,6 +15,8 @@ namespace Minotaur.Graphics
 
     public BoundingSphere BoundingSphere { get; set; }
 
+    public BoundingBox BoundingBox { get; set; }
+
     public Bone ParentBone { get; set; }
 
     public object Tag { get; set; }
@@ -1,4 +1,6 @@
 ﻿
+using Minotaur.Core;
+
 namespace Minotaur.Graphics
 {
   public class ModelMeshPart : GraphicsResource
@@ -25,6 +27,10 @@ namespace Minotaur.Graphics
 
     public uint StartVertex { get; set; }
 
+    public BoundingSphere BoundingSphere { get; set; }
+
+    public BoundingBox BoundingBox { get; set; }
+
     public ModelMeshPart Clone()
     {
       ModelMeshPart part = new ModelMeshPart();
@@ -36,6 +42,8 @@ namespace Minotaur.Graphics
       part.Parent = Parent;
       part.StartIndex = StartIndex;
       part.StartVertex = StartVertex;
+      part.BoundingSphere = BoundingSphere;
+      part.BoundingBox = BoundingBox;
       return part;
     }
   }
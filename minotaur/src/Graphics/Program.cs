@@ -80,6 +80,8 @@ namespace Minotaur.Graphics
         foreach (var item in fragDataLocations)
           GL.BindFragDataLocation(_id, item.Key, item.Value);
       }
+      if (ProgramBinaryCache.IsSupported)
+        GL.ProgramParameter(_id, AssemblyProgramParameterArb.ProgramBinaryRetrievableHint, 1);
       GL.LinkProgram(_id);
       int status;
       GL.GetProgram(_id, ProgramParameter.LinkStatus, out status);
@@ -109,6 +111,25 @@ namespace Minotaur.Graphics
       _id = GL.CreateProgram();
     }
 
+    /// <summary>
+    /// Creates a program from a binary returned by GetBinary, null if the driver does not accept it.
+    /// </summary>
+    internal static Program FromBinary(BinaryFormat format, byte[] binary)
+    {
+      Program program = new Program();
+      GL.ProgramBinary(program._id, format, binary, binary.Length);
+      int status;
+      GL.GetProgram(program._id, ProgramParameter.LinkStatus, out status);
+      if (status == 0)
+      {
+        program.Dispose();
+        return null;
+      }
+      program.MapAttributes();
+      program.MapUniforms();
+      return program;
+    }
+
     static Program()
     {
       // this is solving an error with auto casting to Vector4
@@ -592,6 +613,21 @@ namespace Minotaur.Graphics
       return _id;
     }
 
+    /// <summary>
+    /// The linked program as a driver specific binary, null if the driver cannot provide one.
+    /// </summary>
+    internal byte[] GetBinary(out BinaryFormat format)
+    {
+      format = 0;
+      int length;
+      GL.GetProgram(_id, ProgramParameter.ProgramBinaryLength, out length);
+      if (length == 0)
+        return null;
+      byte[] binary = new byte[length];
+      GL.GetProgramBinary(_id, length, out length, out format, binary);
+      return binary;
+    }
+
     #endregion
 
     #region Private Methods
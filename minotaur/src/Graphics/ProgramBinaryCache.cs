@@ -0,0 +1,145 @@
+﻿using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Security.Cryptography;
+using System.Text;
+using OpenTK.Graphics.OpenGL;
+
+namespace Minotaur.Graphics
+{
+  /// <summary>
+  /// Linked program binaries keyed by the hash of their sources and the driver that built them, so a program
+  /// is only compiled from source the first time it is used with a driver.
+  /// </summary>
+  public class ProgramBinaryCache
+  {
+    public class Entry
+    {
+      public string DriverID;
+      public int Format;
+      public byte[] Data;
+    }
+
+    private static string _driverID;
+    private static bool? _supported;
+    private string _directory;
+
+    /// <summary>
+    /// Identifies the driver, binaries from any other driver are ignored. Set it to a stub for testing.
+    /// </summary>
+    public static string DriverID
+    {
+      get
+      {
+        if (_driverID == null)
+          _driverID = string.Join("|", GL.GetString(StringName.Vendor), GL.GetString(StringName.Renderer), GL.GetString(StringName.Version));
+        return _driverID;
+      }
+      set { _driverID = value; }
+    }
+
+    public static bool IsSupported
+    {
+      get
+      {
+        if (_supported == null)
+        {
+          int count;
+          GL.GetInteger(GetPName.NumProgramBinaryFormats, out count);
+          _supported = count > 0;
+        }
+        return _supported.Value;
+      }
+    }
+
+    /// <summary>
+    /// A cache that saves the binaries of compiled programs to directory, or only loads binaries embedded in
+    /// the content when directory is null.
+    /// </summary>
+    public ProgramBinaryCache(string directory = null)
+    {
+      _directory = directory;
+    }
+
+    public static string FileName(string sourceHash, string driverID)
+    {
+      using (SHA1 sha1 = SHA1.Create())
+      {
+        byte[] hash = sha1.ComputeHash(Encoding.UTF8.GetBytes(driverID));
+        return string.Format("{0}-{1}.bin", sourceHash, BitConverter.ToString(hash, 0, 8).Replace("-", "").ToLowerInvariant());
+      }
+    }
+
+    /// <summary>
+    /// The program from an embedded or saved binary for this driver, null when it has to be compiled.
+    /// </summary>
+    public Program Load(string sourceHash, IEnumerable<Entry> embedded)
+    {
+      if (!IsSupported)
+        return null;
+      foreach (Entry entry in embedded)
+      {
+        if (entry.DriverID != DriverID)
+          continue;
+        Program program = Program.FromBinary((BinaryFormat)entry.Format, entry.Data);
+        if (program != null)
+          return program;
+      }
+      Entry saved = Read(sourceHash);
+      if (saved == null || saved.DriverID != DriverID)
+        return null;
+      // null if the driver was updated without changing its id and rejects the binary
+      return Program.FromBinary((BinaryFormat)saved.Format, saved.Data);
+    }
+
+    /// <summary>
+    /// Saves the binary of a program compiled from source, failing silently as the cache is only an optimisation.
+    /// </summary>
+    public void Store(string sourceHash, Program program)
+    {
+      if (_directory == null || !IsSupported)
+        return;
+      BinaryFormat format;
+      byte[] data = program.GetBinary(out format);
+      if (data == null)
+        return;
+      try
+      {
+        Directory.CreateDirectory(_directory);
+        using (BinaryWriter writer = new BinaryWriter(File.Create(Path.Combine(_directory, FileName(sourceHash, DriverID)))))
+        {
+          writer.Write(DriverID);
+          writer.Write((int)format);
+          writer.Write(data.Length);
+          writer.Write(data);
+        }
+      }
+      catch (IOException) { }
+      catch (UnauthorizedAccessException) { }
+    }
+
+    private Entry Read(string sourceHash)
+    {
+      if (_directory == null)
+        return null;
+      string path = Path.Combine(_directory, FileName(sourceHash, DriverID));
+      if (!File.Exists(path))
+        return null;
+      try
+      {
+        using (BinaryReader reader = new BinaryReader(File.OpenRead(path)))
+        {
+          Entry entry = new Entry();
+          entry.DriverID = reader.ReadString();
+          entry.Format = reader.ReadInt32();
+          entry.Data = reader.ReadBytes(reader.ReadInt32());
+          return entry;
+        }
+      }
+      catch (IOException)
+      {
+        return null;
+      }
+    }
+  }
+}
@@ -0,0 +1,123 @@
+﻿using System;
+using System.Collections.Generic;
+using System.Linq;
+using System.Text;
+using OpenTK.Graphics.OpenGL;
+
+namespace Minotaur.Graphics
+{
+  /// <summary>
+  /// The programs built from one set of shader sources for every combination of a set of #define options.
+  /// Each variant is compiled and linked the first time it is used.
+  /// </summary>
+  public class ShaderVariants : IDisposable
+  {
+    public class Option
+    {
+      public string Name;
+      // an empty string is the option left undefined
+      public string[] Values;
+      public int Stride;
+    }
+
+    public class Stage
+    {
+      public ShaderType Type;
+      public int[] Chunks;
+    }
+
+    private List<Option> _options;
+    private string[] _chunks;
+    private Stage[][] _variants;
+    private Program[] _programs;
+
+    public string[] Files;
+
+    public IList<Option> Options
+    {
+      get { return _options.AsReadOnly(); }
+    }
+
+    public int Count
+    {
+      get { return _variants.Length; }
+    }
+
+    public ShaderVariants(string[] files, IEnumerable<Option> options, string[] chunks, Stage[][] variants)
+    {
+      Files = files;
+      _options = options.ToList();
+      _chunks = chunks;
+      _variants = variants;
+      _programs = new Program[variants.Length];
+    }
+
+    /// <summary>
+    /// The key of the variant with the given option values, options that are not given are at their first value.
+    /// </summary>
+    public int GetKey(IDictionary<string, string> values)
+    {
+      int key = 0;
+      foreach (Option option in _options)
+      {
+        string value;
+        if (values == null || !values.TryGetValue(option.Name, out value))
+          continue;
+        int index = Array.IndexOf(option.Values, value);
+        if (index < 0)
+          throw new ArgumentException(string.Format("{0} is not a value of shader option {1}", value, option.Name));
+        key += index * option.Stride;
+      }
+      return key;
+    }
+
+    public string GetSource(int key, ShaderType type)
+    {
+      Stage stage = _variants[key].FirstOrDefault(s => s.Type == type);
+      if (stage == null)
+        return null;
+      StringBuilder source = new StringBuilder();
+      foreach (int chunk in stage.Chunks)
+        source.Append(_chunks[chunk]);
+      return source.ToString();
+    }
+
+    public Program GetProgram(int key)
+    {
+      if (_programs[key] == null)
+      {
+        List<Shader> shaders = new List<Shader>();
+        try
+        {
+          foreach (Stage stage in _variants[key])
+            shaders.Add(new Shader(GetSource(key, stage.Type), stage.Type));
+          _programs[key] = new Program(shaders);
+        }
+        finally
+        {
+          // the program keeps the linked shaders alive
+          foreach (Shader shader in shaders)
+            shader.Dispose();
+        }
+      }
+      return _programs[key];
+    }
+
+    public Program GetProgram(IDictionary<string, string> values)
+    {
+      return GetProgram(GetKey(values));
+    }
+
+    public void Dispose()
+    {
+      for (int i = 0; i < _programs.Length; i++)
+      {
+        if (_programs[i] != null)
+        {
+          _programs[i].Dispose();
+          _programs[i] = null;
+        }
+      }
+    }
+  }
+}
@@ -0,0 +1,139 @@
+class Rect(object):
+    def __init__(self, x, y, width, height):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    def Contains(self, other):
+        return other.x >= self.x and other.y >= self.y and other.right <= self.right and other.bottom <= self.bottom
+
+    def Intersects(self, other):
+        return other.x < self.right and other.right > self.x and other.y < self.bottom and other.bottom > self.y
+
+class MaxRectsBin(object):
+    # Jukka Jylanki's maximal rectangles packer with the best short side fit heuristic
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = [Rect(0, 0, width, height)]
+
+    def Insert(self, width, height):
+        best = None
+        bestScore = None
+        for r in self.free:
+            if r.width >= width and r.height >= height:
+                score = (min(r.width - width, r.height - height), max(r.width - width, r.height - height))
+                if bestScore is None or score < bestScore:
+                    best, bestScore = r, score
+        if best is None:
+            return None
+        placed = Rect(best.x, best.y, width, height)
+        free = []
+        for r in self.free:
+            if r.Intersects(placed):
+                free.extend(self.Split(r, placed))
+            else:
+                free.append(r)
+        # drop free rectangles that lie inside another one
+        self.free = [r for n, r in enumerate(free) if not any(n != m and o.Contains(r) and (not r.Contains(o) or m < n) for m, o in enumerate(free))]
+        return placed.x, placed.y
+
+    def Split(self, r, placed):
+        result = []
+        if placed.x > r.x:
+            result.append(Rect(r.x, r.y, placed.x - r.x, r.height))
+        if placed.right < r.right:
+            result.append(Rect(placed.right, r.y, r.right - placed.right, r.height))
+        if placed.y > r.y:
+            result.append(Rect(r.x, r.y, r.width, placed.y - r.y))
+        if placed.bottom < r.bottom:
+            result.append(Rect(r.x, placed.bottom, r.width, r.bottom - placed.bottom))
+        return result
+
+class SkylineBin(object):
+    # bottom left skyline packer, faster than max rects and a little less tight
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        # (x, y, width) segments of the skyline from left to right
+        self.skyline = [(0, 0, width)]
+
+    def Fit(self, index, width, height):
+        # the y a rectangle starting at segment index would rest at, or None if it does not fit
+        x = self.skyline[index][0]
+        if x + width > self.width:
+            return None
+        y = 0
+        remaining = width
+        while remaining > 0:
+            if index == len(self.skyline):
+                return None
+            segment = self.skyline[index]
+            y = max(y, segment[1])
+            if y + height > self.height:
+                return None
+            remaining -= segment[2]
+            index += 1
+        return y
+
+    def Insert(self, width, height):
+        best = None
+        for index in xrange(len(self.skyline)):
+            y = self.Fit(index, width, height)
+            if y is not None and (best is None or (y + height, self.skyline[index][2]) < best[0]):
+                best = ((y + height, self.skyline[index][2]), index, y)
+        if best is None:
+            return None
+        index, y = best[1], best[2]
+        x = self.skyline[index][0]
+        segments = self.skyline[:index] + [(x, y + height, width)]
+        for sx, sy, sw in self.skyline[index:]:
+            if sx + sw <= x + width:
+                continue
+            if sx < x + width:
+                sw -= x + width - sx
+                sx = x + width
+            segments.append((sx, sy, sw))
+        # merge neighbouring segments at the same height
+        self.skyline = []
+        for segment in segments:
+            if self.skyline and self.skyline[-1][1] == segment[1]:
+                last = self.skyline.pop()
+                segment = (last[0], last[1], last[2] + segment[2])
+            self.skyline.append(segment)
+        return x, y
+
+Packers = {
+    'maxrects': MaxRectsBin,
+    'skyline': SkylineBin,
+}
+
+def Pack(sizes, maxWidth, maxHeight, packer = 'maxrects'):
+    # place (width, height) rectangles on as few maxWidth x maxHeight pages as needed, largest first.
+    # returns a (page, x, y) placement for each size, in the order given, and the page count
+    order = sorted(xrange(len(sizes)), key = lambda n: (max(sizes[n]), sizes[n][0] * sizes[n][1]), reverse = True)
+    pages = []
+    placements = [None] * len(sizes)
+    for n in order:
+        width, height = sizes[n]
+        if width > maxWidth or height > maxHeight:
+            raise ValueError("a %dx%d image does not fit on a %dx%d page" % (width, height, maxWidth, maxHeight))
+        for page, bin in enumerate(pages):
+            position = bin.Insert(width, height)
+            if position:
+                break
+        else:
+            page = len(pages)
+            pages.append(Packers[packer](maxWidth, maxHeight))
+            position = pages[page].Insert(width, height)
+        placements[n] = (page, position[0], position[1])
+    return placements, len(pages)
@@ -0,0 +1,213 @@
+from threading import Thread
+from struct import pack
+
+# MEB texture format ids, see Texture2DReader.PixelFormatFromInt
+FormatBC3 = 6
+FormatBC1 = 13
+FormatBC4 = 14
+FormatBC5 = 15
+FormatBC7 = 16
+
+FormatNames = {
+    'bc1': FormatBC1,
+    'bc3': FormatBC3,
+    'bc4': FormatBC4,
+    'bc5': FormatBC5,
+    'bc7': FormatBC7,
+}
+
+# bytes per 4x4 block
+BlockSizes = {
+    FormatBC1: 8,
+    FormatBC3: 16,
+    FormatBC4: 8,
+    FormatBC5: 16,
+    FormatBC7: 16,
+}
+
+def GetBlock(pixels, width, height, channels, bx, by):
+    # the 16 pixels of a block as tuples, repeating the edge pixels of partial blocks
+    block = []
+    for j in xrange(4):
+        row = min(by * 4 + j, height - 1) * width
+        for i in xrange(4):
+            offset = (row + min(bx * 4 + i, width - 1)) * channels
+            block.append(tuple(pixels[offset:offset + channels]))
+    return block
+
+def PrincipalAxis(colors):
+    # mean and dominant direction of a set of colours by power iteration on the covariance
+    n = float(len(colors))
+    dimension = len(colors[0])
+    mean = [sum(c[k] for c in colors) / n for k in xrange(dimension)]
+    cov = [[0.0] * dimension for k in xrange(dimension)]
+    for c in colors:
+        d = [c[k] - mean[k] for k in xrange(dimension)]
+        for a in xrange(dimension):
+            for b in xrange(a, dimension):
+                cov[a][b] += d[a] * d[b]
+    for a in xrange(dimension):
+        for b in xrange(a):
+            cov[a][b] = cov[b][a]
+    axis = [cov[k][k] for k in xrange(dimension)]
+    axis = [1.0 if x == max(axis) else 0.0 for x in axis]
+    for i in xrange(8):
+        axis = [sum(cov[a][b] * axis[b] for b in xrange(dimension)) for a in xrange(dimension)]
+        length = max(abs(x) for x in axis)
+        if length == 0:
+            return mean, [0.0] * dimension
+        axis = [x / length for x in axis]
+    return mean, axis
+
+def EndPoints(colors):
+    # the extremes of the colours projected on their principal axis
+    mean, axis = PrincipalAxis(colors)
+    dimension = len(mean)
+    projections = [sum((c[k] - mean[k]) * axis[k] for k in xrange(dimension)) for c in colors]
+    lengthSquared = sum(x * x for x in axis)
+    if lengthSquared == 0:
+        return mean, mean
+    low = min(projections) / lengthSquared
+    high = max(projections) / lengthSquared
+    return [mean[k] + axis[k] * high for k in xrange(dimension)], [mean[k] + axis[k] * low for k in xrange(dimension)]
+
+def To565(c):
+    r, g, b = [min(max(int(x + 0.5), 0), 255) for x in c]
+    return ((r * 31 + 127) // 255) << 11 | ((g * 63 + 127) // 255) << 5 | (b * 31 + 127) // 255
+
+def From565(v):
+    r = v >> 11
+    g = (v >> 5) & 0x3f
+    b = v & 0x1f
+    return ((r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2))
+
+def Nearest(palette, c):
+    best = 0
+    bestError = None
+    for n, p in enumerate(palette):
+        error = sum((c[k] - p[k]) ** 2 for k in xrange(len(c)))
+        if bestError is None or error < bestError:
+            best, bestError = n, error
+    return best
+
+def EncodeColorBlock(block):
+    # BC1 colour block, always in four colour mode so it is also valid inside BC3
+    colors = [p[:3] for p in block]
+    high, low = EndPoints(colors)
+    c0 = To565(high)
+    c1 = To565(low)
+    if c0 < c1:
+        c0, c1 = c1, c0
+    if c0 == c1:
+        return pack('<HHI', c0, c1, 0)
+    e0 = From565(c0)
+    e1 = From565(c1)
+    palette = [e0, e1,
+        tuple((2 * e0[k] + e1[k]) // 3 for k in xrange(3)),
+        tuple((e0[k] + 2 * e1[k]) // 3 for k in xrange(3))]
+    indices = 0
+    for n, c in enumerate(colors):
+        indices |= Nearest(palette, c) << (n * 2)
+    return pack('<HHI', c0, c1, indices)
+
+def EncodeValueBlock(values):
+    # BC4 block of 16 single channel values in the eight value mode
+    a0 = max(values)
+    a1 = min(values)
+    if a0 == a1:
+        return pack('<BBHI', a0, a1, 0, 0)
+    indices = 0
+    scale = 7.0 / (a0 - a1)
+    for n, v in enumerate(values):
+        step = int((a0 - v) * scale + 0.5)
+        if step == 0:
+            index = 0
+        elif step == 7:
+            index = 1
+        else:
+            index = step + 1
+        indices |= index << (n * 3)
+    return pack('<BBHI', a0, a1, indices & 0xffff, indices >> 16)
+
+Bc7Weights = [0, 4, 9, 13, 17, 21, 26, 30, 34, 38, 43, 47, 51, 55, 60, 64]
+
+def QuantizeBc7EndPoint(c):
+    # 7 bits per channel plus a shared low bit, returns the 7 bit values, the p bit and the 8 bit result
+    best = None
+    for p in xrange(2):
+        q = [min(max(int((x - p) / 2.0 + 0.5), 0), 127) for x in c]
+        value = [(x << 1) | p for x in q]
+        error = sum((value[k] - c[k]) ** 2 for k in xrange(4))
+        if best is None or error < best[0]:
+            best = (error, q, p, value)
+    return best[1:]
+
+def EncodeBc7Block(block):
+    # BC7 mode 6: a single subset with rgba endpoints and 4 bit indices
+    high, low = EndPoints(block)
+    q0, p0, e0 = QuantizeBc7EndPoint(high)
+    q1, p1, e1 = QuantizeBc7EndPoint(low)
+    palette = [tuple(((64 - w) * e0[k] + w * e1[k] + 32) >> 6 for k in xrange(4)) for w in Bc7Weights]
+    indices = [Nearest(palette, p) for p in block]
+    if indices[0] >= 8:
+        # the anchor index has an implicit zero high bit, swap the endpoints to make it so
+        q0, p0, q1, p1 = q1, p1, q0, p0
+        indices = [15 - i for i in indices]
+
+    bits = 1 << 6
+    position = 7
+    for k in xrange(4):
+        bits |= q0[k] << position
+        bits |= q1[k] << (position + 7)
+        position += 14
+    bits |= p0 << position
+    bits |= p1 << (position + 1)
+    position += 2
+    for n, i in enumerate(indices):
+        bits |= i << position
+        position += 3 if n == 0 else 4
+    return pack('<QQ', bits & 0xffffffffffffffff, bits >> 64)
+
+def EncodeBlock(format, block):
+    if format == FormatBC1:
+        return EncodeColorBlock(block)
+    elif format == FormatBC3:
+        return EncodeValueBlock([p[3] for p in block]) + EncodeColorBlock(block)
+    elif format == FormatBC4:
+        return EncodeValueBlock([p[0] for p in block])
+    elif format == FormatBC5:
+        return EncodeValueBlock([p[0] for p in block]) + EncodeValueBlock([p[1] for p in block])
+    elif format == FormatBC7:
+        return EncodeBc7Block(block)
+    raise ValueError("unknown block compression format: %d" % format)
+
+def CompressRows(pixels, width, height, channels, format, firstRow, lastRow):
+    blocksWide = (width + 3) // 4
+    data = bytearray()
+    for by in xrange(firstRow, lastRow):
+        for bx in xrange(blocksWide):
+            data.extend(EncodeBlock(format, GetBlock(pixels, width, height, channels, bx, by)))
+    return data
+
+def Compress(pixels, width, height, channels, format, threads = 1):
+    # encode an image of 1 (BC4 only) or 4 channels, splitting the rows of blocks between threads
+    if channels == 1 and format != FormatBC4:
+        raise ValueError("only BC4 can encode single channel images")
+    blocksHigh = (height + 3) // 4
+    threads = max(1, min(threads, blocksHigh))
+    if threads == 1:
+        return CompressRows(pixels, width, height, channels, format, 0, blocksHigh)
+    results = [None] * threads
+    def Work(n):
+        results[n] = CompressRows(pixels, width, height, channels, format, blocksHigh * n // threads, blocksHigh * (n + 1) // threads)
+    workers = [Thread(target=Work, args=(n,)) for n in xrange(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if None in results:
+        raise RuntimeError("block compression failed")
+    data = bytearray()
+    for result in results:
+        data.extend(result)
+    return data
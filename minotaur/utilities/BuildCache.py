@@ -0,0 +1,107 @@
+from threading import Lock
+import hashlib
+import json
+import os
+import os.path
+
+CacheVersion = 1
+
+class BuildCache(object):
+    # remembers, for every output, a hash of the converter, its options and the content of every
+    # file it was built from, so an output is only rebuilt when one of those changes.
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        # path -> [size, mtime, sha1] so unchanged files are not hashed again on every build
+        self.files = {}
+        # output path -> build key
+        self.outputs = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.isfile(path):
+            f = open(path, 'r')
+            try:
+                try:
+                    data = json.load(f)
+                except ValueError:
+                    data = {}
+            finally:
+                f.close()
+            if data.get('version') == CacheVersion:
+                self.files = data['files']
+                self.outputs = data['outputs']
+
+    def FileHash(self, path):
+        path = os.path.normcase(os.path.abspath(path))
+        stat = os.stat(path)
+        self.lock.acquire()
+        try:
+            entry = self.files.get(path)
+        finally:
+            self.lock.release()
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime:
+            return entry[2]
+        digest = hashlib.sha1()
+        f = open(path, 'rb')
+        try:
+            while True:
+                data = f.read(65536)
+                if not data:
+                    break
+                digest.update(data)
+        finally:
+            f.close()
+        hash = digest.hexdigest()
+        self.lock.acquire()
+        try:
+            self.files[path] = [stat.st_size, stat.st_mtime, hash]
+        finally:
+            self.lock.release()
+        return hash
+
+    def Key(self, converter, options, dependencies):
+        digest = hashlib.sha1()
+        digest.update(converter.encode('utf-8'))
+        digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+        for path in dependencies:
+            digest.update(os.path.normcase(os.path.abspath(path)).encode('utf-8'))
+            digest.update(self.FileHash(path).encode('utf-8'))
+        return digest.hexdigest()
+
+    def IsCurrent(self, output, key):
+        self.lock.acquire()
+        try:
+            current = self.outputs.get(os.path.normcase(os.path.abspath(output))) == key and os.path.isfile(output)
+            if current:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return current
+        finally:
+            self.lock.release()
+
+    def Update(self, output, key):
+        # key is None for a failed build, so it is retried next time
+        output = os.path.normcase(os.path.abspath(output))
+        self.lock.acquire()
+        try:
+            if key is None:
+                self.outputs.pop(output, None)
+            else:
+                self.outputs[output] = key
+        finally:
+            self.lock.release()
+
+    def Save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        temp = self.path + '.tmp'
+        f = open(temp, 'w')
+        try:
+            json.dump({'version': CacheVersion, 'files': self.files, 'outputs': self.outputs}, f, sort_keys=True)
+        finally:
+            f.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(temp, self.path)
@@ -0,0 +1,282 @@
+import clr
+
+from System import Environment
+from threading import Thread, Lock
+from Queue import Queue, Empty
+import argparse
+import json
+import os
+import os.path
+import sys
+import time
+import traceback
+import ContentWriter
+import MeshOptimizer
+import PixelConversion
+import Mipmaps
+import BlockCompression
+import DistanceField
+import ConvertImage
+import ConvertModel
+import ConvertFont
+import CreateShaderSource
+import CreateShaderVariants
+import ShaderPreprocessor
+import CreateTextureAtlas
+import AtlasPacker
+from BuildCache import BuildCache
+
+ImageExtensions = ['.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff']
+ModelExtensions = ['.x', '.obj', '.fbx', '.dae', '.3ds', '.blend', '.ply', '.md5mesh']
+FontExtensions = ['.fnt']
+ShaderStages = {'.vert': 'vertex', '.frag': 'fragment', '.geom': 'geometry'}
+
+Converters = {
+    'image': ConvertImage,
+    'model': ConvertModel,
+    'font': ConvertFont,
+    'shader': CreateShaderSource,
+    'shadervariants': CreateShaderVariants,
+    'atlas': CreateTextureAtlas,
+}
+
+# converters that can need an OpenGL context current on the worker thread
+ContextConverters = ['shader', 'shadervariants']
+
+# converters whose source is a dict of stage name to path
+ShaderConverters = ['shader', 'shadervariants']
+
+# the scripts each converter runs, a change to any of them rebuilds its outputs
+ToolModules = {
+    'image': [ConvertImage, PixelConversion, Mipmaps, BlockCompression, ContentWriter],
+    'model': [ConvertModel, MeshOptimizer, ContentWriter],
+    'font': [ConvertFont, PixelConversion, Mipmaps, BlockCompression, DistanceField, ContentWriter],
+    'shader': [CreateShaderSource, ShaderPreprocessor, ContentWriter],
+    'shadervariants': [CreateShaderVariants, CreateShaderSource, ShaderPreprocessor, ContentWriter],
+    'atlas': [CreateTextureAtlas, AtlasPacker, ConvertImage, PixelConversion, Mipmaps, BlockCompression, ContentWriter],
+}
+
+def SourceFile(module):
+    path = module.__file__
+    if path.endswith('.pyc') or path.endswith('.pyo'):
+        path = path[:-1]
+    return path
+
+class BuildItem(object):
+    def __init__(self, converter, source, output, options = None):
+        if converter not in Converters:
+            raise ValueError("unknown converter: %s" % converter)
+        self.converter = converter
+        # the input path, for shaders a dict of stage name to path and for atlases a list of paths
+        self.source = source
+        self.output = output
+        self.options = options if options else {}
+        self.time = 0.0
+        self.error = None
+        self.skipped = False
+
+    @property
+    def name(self):
+        if self.converter in ShaderConverters:
+            return ", ".join(self.source[x] for x in sorted(self.source))
+        elif self.converter == 'atlas':
+            return ", ".join(self.source)
+        return self.source
+
+    def Dependencies(self):
+        module = Converters[self.converter]
+        if self.converter == 'shader':
+            inputs = module.Dependencies(includePaths=self.options.get('includePaths'), binaryCache=self.options.get('binaryCache'), **self.source)
+        elif self.converter in ShaderConverters:
+            inputs = module.Dependencies(includePaths=self.options.get('includePaths'), **self.source)
+        else:
+            inputs = module.Dependencies(self.source)
+        return inputs + [SourceFile(x) for x in ToolModules[self.converter]]
+
+    def Run(self, threads = 1):
+        directory = os.path.dirname(self.output)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # another worker may have created it first
+                if not os.path.isdir(directory):
+                    raise
+        options = dict(self.options)
+        module = Converters[self.converter]
+        if self.converter == 'shadervariants':
+            # how many variants are validated at once, outside the options so it is not part of the cache key
+            options.setdefault('threads', threads)
+        if self.converter in ShaderConverters:
+            options.update(self.source)
+            module.Convert(self.output, **options)
+        else:
+            module.Convert(self.source, self.output, **options)
+
+def OutputPath(outputDirectory, root, path):
+    return os.path.join(outputDirectory, os.path.splitext(os.path.relpath(path, root))[0] + '.meb')
+
+def ScanDirectory(root, outputDirectory, options):
+    # one build item per image, model and font, and one shader per set of stage files sharing a name
+    items = []
+    shaders = {}
+    fontPages = set()
+    for path, directories, files in os.walk(root):
+        directories.sort()
+        for name in sorted(files):
+            source = os.path.join(path, name)
+            extension = os.path.splitext(name)[1].lower()
+            if extension in ImageExtensions:
+                items.append(BuildItem('image', source, OutputPath(outputDirectory, root, source), options))
+            elif extension in ModelExtensions:
+                items.append(BuildItem('model', source, OutputPath(outputDirectory, root, source), options))
+            elif extension in FontExtensions:
+                items.append(BuildItem('font', source, OutputPath(outputDirectory, root, source), options))
+                try:
+                    pages = ConvertFont.LoadFont(source).pages
+                except Exception:
+                    # the font item fails with the error when it is built, only its pages are not excluded
+                    pages = []
+                fontPages.update(os.path.normcase(os.path.abspath(x)) for x in pages)
+            elif extension in ShaderStages:
+                shaders.setdefault(os.path.splitext(source)[0], {})[ShaderStages[extension]] = source
+    # font page images are built into the font, not on their own
+    items = [x for x in items if x.converter != 'image' or os.path.normcase(os.path.abspath(x.source)) not in fontPages]
+    for base in sorted(shaders):
+        items.append(BuildItem('shader', shaders[base], OutputPath(outputDirectory, root, base), options))
+    return items
+
+def LoadManifest(path, outputDirectory, options):
+    # {"builditems": [{"source": "crate.png"}, {"source": "dwarf.x", "options": {"skin": true}},
+    #                 {"converter": "shader", "vertex": "basic.vert", "fragment": "basic.frag", "output": "basic.meb",
+    #                  "options": {"defines": {"SKINNING": 1}, "includePaths": ["include"]}},
+    #                 {"converter": "shadervariants", "vertex": "lit.vert", "fragment": "lit.frag", "output": "lit.meb",
+    #                  "options": {"permutations": ["SKINNING", "NORMALMAP", "LIGHTS=1,2,4"]}},
+    #                 {"converter": "atlas", "sources": ["gui"], "output": "gui.meb", "options": {"padding": 4}}]}
+    # sources, include paths and binary caches are relative to the manifest, outputs to the output directory
+    root = os.path.dirname(os.path.abspath(path))
+    f = open(path, 'r')
+    try:
+        manifest = json.load(f)
+    finally:
+        f.close()
+    items = []
+    for entry in manifest['builditems']:
+        itemOptions = dict(options)
+        itemOptions.update(dict((str(k), v) for k, v in entry.get('options', {}).items()))
+        if 'includePaths' in itemOptions:
+            itemOptions['includePaths'] = [os.path.join(root, x) for x in itemOptions['includePaths']]
+        if 'binaryCache' in itemOptions:
+            itemOptions['binaryCache'] = os.path.join(root, itemOptions['binaryCache'])
+        converter = entry.get('converter')
+        if converter in ShaderConverters:
+            source = dict((stage, os.path.join(root, entry[stage])) for stage in ShaderStages.values() if stage in entry)
+            name = source[sorted(source)[0]]
+        elif converter == 'atlas':
+            source = [os.path.join(root, x) for x in entry['sources']]
+            name = source[0]
+        else:
+            source = os.path.join(root, entry['source'])
+            name = source
+            if converter is None:
+                extension = os.path.splitext(source)[1].lower()
+                if extension in ImageExtensions:
+                    converter = 'image'
+                elif extension in ModelExtensions:
+                    converter = 'model'
+                elif extension in FontExtensions:
+                    converter = 'font'
+                else:
+                    raise ValueError("no converter for %s" % source)
+        if 'output' in entry:
+            output = os.path.join(outputDirectory, entry['output'])
+        else:
+            output = OutputPath(outputDirectory, root, name)
+        items.append(BuildItem(converter, source, output, itemOptions))
+    return items
+
+def Worker(queue, lock, cache, threads):
+    window = None
+    context = None
+    while True:
+        try:
+            item = queue.get_nowait()
+        except Empty:
+            break
+        start = time.time()
+        key = None
+        try:
+            if cache:
+                key = cache.Key(item.converter, item.options, item.Dependencies())
+                if cache.IsCurrent(item.output, key):
+                    item.skipped = True
+                    continue
+            if window is None and item.converter in ContextConverters and CreateShaderSource.NeedsContext(item.options.get('validate', 'auto')):
+                # created once per worker, not once per asset
+                window, context = CreateShaderSource.CreateContext()
+            item.Run(threads)
+        except Exception:
+            item.error = traceback.format_exc()
+        item.time = time.time() - start
+        if cache:
+            cache.Update(item.output, None if item.error else key)
+        lock.acquire()
+        try:
+            print "%s %s (%.2fs)" % ("failed" if item.error else "built", item.name, item.time)
+        finally:
+            lock.release()
+    if context is not None:
+        context.Dispose()
+        window.Dispose()
+
+def Build(items, workerCount, cache = None):
+    # returns the items that failed and the number of workers started
+    queue = Queue()
+    for item in items:
+        queue.put(item)
+    lock = Lock()
+    workers = [Thread(target=Worker, args=(queue, lock, cache, workerCount)) for i in xrange(max(1, min(workerCount, len(items))))]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return [x for x in items if x.error], len(workers)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert a directory or manifest of content to MEB files in parallel.')
+    parser.add_argument('input', help='the directory to convert, or a JSON manifest of build items.')
+    parser.add_argument('-o', metavar='OUTPUT', default='.', help='directory to output MEB files to.')
+    parser.add_argument('-j', '--jobs', metavar='JOBS', type=int, default=Environment.ProcessorCount, help='number of worker threads (default is the number of processors).')
+    parser.add_argument('-c', '--cache', metavar='CACHE', help='build cache file (default is .buildcache in the output directory).')
+    parser.add_argument('-f', '--force', action='store_true', help='rebuild everything, ignoring the build cache.')
+    parser.add_argument('-z', '--compress', metavar='LEVEL', nargs='?', type=int, const=6, help='compress the MEB output, with an optional compression LEVEL from 0 to 9 (default 6).')
+
+    args = parser.parse_args()
+
+    options = {}
+    if args.compress is not None:
+        options['compress'] = args.compress
+    if os.path.isdir(args.input):
+        items = ScanDirectory(args.input, args.o, options)
+    else:
+        items = LoadManifest(args.input, args.o, options)
+
+    cache = BuildCache(args.cache if args.cache else os.path.join(args.o, '.buildcache'))
+    if args.force:
+        cache.outputs.clear()
+
+    start = time.time()
+    failed, workerCount = Build(items, args.jobs, cache)
+    elapsed = time.time() - start
+    cache.Save()
+
+    for item in failed:
+        print "\n%s failed:\n%s" % (item.name, item.error)
+    built = [x for x in items if not x.skipped]
+    if built:
+        slowest = max(built, key=lambda x: x.time)
+        print "slowest: %s (%.2fs)" % (slowest.name, slowest.time)
+    print "cache: %d hits, %d misses" % (cache.hits, cache.misses)
+    print "%d built, %d up to date, %d failed in %.2fs with %d workers" % (len(built) - len(failed), len(items) - len(built), len(failed), elapsed, workerCount)
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,349 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import uuid
+import zlib
+
+# the types the utilities write, for naming them in summaries
+KnownTypes = {
+    'e5e29004-6f77-4be4-a9c6-c3eb363ca021': 'texture 2d',
+    '1f6057f0-d13f-42ae-9e6b-4011fad823fd': 'sprite font',
+    '20f75bf7-b777-4c52-8b26-abac8b1e01a1': 'texture atlas',
+    '205801eb-a58e-4627-a2df-7c9dafdd33d6': 'shader',
+    'a5da1ca4-3ecc-44e3-826b-66b4d785e7a8': 'shader variants',
+    '09b12e6d-acf3-4cf5-a150-923056d88d9b': 'model',
+    '1da5cdcd-2f1e-41d5-b7ab-fde163a5336e': 'vertex buffer',
+    'f6eded0f-1342-4249-b231-c166a860b224': 'index buffer',
+    '6f1be25e-7f37-4faa-b551-7a58c8d91824': 'effect material',
+}
+
+FlagCompressed = 0x1
+FlagBlobSection = 0x2
+FlagTableOfContents = 0x4
+FlagStringPool = 0x8
+FlagUncompressedHeader = 0x10
+
+class ContentReader(object):
+    # read side of ContentWriter. uncompressed files are memory mapped and read through read only
+    # buffer views, so only the pages that are looked at are loaded and nothing is copied. python 2
+    # mmaps only have the old buffer interface, so the views are buffers rather than memoryviews.
+    # compressed files have to be inflated into memory first.
+    def __init__(self, path, identifierString = "MEB"):
+        self.path = path
+        self.identifierString = identifierString
+        self.file = open(path, 'rb')
+        self.map = None
+        try:
+            length = os.fstat(self.file.fileno()).st_size
+            if length == 0:
+                raise ValueError("%s is empty" % path)
+            self.map = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+            self.data = self.map
+            self.position = 0
+            self.ReadIdentifier(length)
+            if self.compressed and self.flags & FlagUncompressedHeader:
+                # written in place, only the content after the type list and resource count is deflated
+                typeCount = struct.unpack_from('<i', self.data, self.position)[0]
+                headerEnd = self.position + 8 + 16 * typeCount
+                self.data = self.map[self.position:headerEnd] + zlib.decompress(self.map[headerEnd:], -15)
+                self.position = 0
+            elif self.compressed:
+                # raw deflate of the header and content, as Ionic's DeflateStream writes it
+                self.data = zlib.decompress(self.map[self.position:], -15)
+                self.position = 0
+            self.headerOffset = self.position
+            typeCount = self.ReadInt()
+            self.types = [self.ReadGuid() for i in xrange(typeCount)]
+            self.sharedResourceCount = self.ReadInt()
+            self.blobTableOffset = self.ReadLong() if self.flags & FlagBlobSection else None
+            self.tableOfContentsOffset = self.ReadLong() if self.flags & FlagTableOfContents else None
+            self.stringPoolOffset = self.ReadLong() if self.flags & FlagStringPool else None
+            self.contentOffset = self.position
+            self.ReadBlobTable()
+            self.ReadTableOfContents()
+            self.ReadStringPool()
+        except:
+            self.Close()
+            raise
+
+    def ReadIdentifier(self, length):
+        identifier = self.data[:len(self.identifierString)]
+        if identifier != self.identifierString:
+            raise ValueError("%s is not an %s file" % (self.path, self.identifierString))
+        self.position = len(self.identifierString)
+        self.version = self.ReadByte()
+        self.flags = self.ReadByte()
+        self.fileSize = self.ReadLong()
+        if self.fileSize != length:
+            raise ValueError("%s is %d bytes, its header says %d" % (self.path, length, self.fileSize))
+
+    def ReadBlobTable(self):
+        # (offset, length) of each blob, offsets are from the start of the file
+        self.blobs = []
+        self.blobAlignment = 0
+        if self.blobTableOffset is None:
+            return
+        position = self.position
+        self.position = self.blobTableOffset
+        count = self.ReadInt()
+        self.blobAlignment = self.ReadInt()
+        values = self.ReadStruct('%dq' % (count * 2))
+        self.blobs = zip(values[::2], values[1::2])
+        self.position = position
+
+    def ReadTableOfContents(self):
+        # (offset, length, type index) of the root object then each shared resource
+        self.entries = []
+        if self.tableOfContentsOffset is None:
+            return
+        position = self.position
+        self.position = self.tableOfContentsOffset
+        count = self.ReadInt()
+        values = self.ReadStruct('2qi' * count)
+        self.entries = zip(values[::3], values[1::3], values[2::3])
+        self.position = position
+
+    def ReadStringPool(self):
+        # the distinct strings, which ReadString then reads by index
+        self.strings = None
+        if self.stringPoolOffset is None:
+            return
+        position = self.position
+        self.position = self.stringPoolOffset
+        count = self.ReadInt()
+        strings = []
+        for n in xrange(count):
+            strings.append(str(self.ReadBytes(self.ReadVarInt())).decode('utf-8'))
+        self.strings = strings
+        self.position = position
+
+    def Entry(self, index):
+        # a read only view of one top level object, starting with its type index
+        offset, length, typeIndex = self.entries[index]
+        return buffer(self.data, offset, length)
+
+    @property
+    def compressed(self):
+        return bool(self.flags & FlagCompressed)
+
+    @property
+    def content(self):
+        # the objects after the header, and before the blobs and tables when there are any, without copying
+        ends = [x for x in [self.blobs[0][0] if self.blobs else None, self.blobTableOffset, self.tableOfContentsOffset, self.stringPoolOffset] if x is not None]
+        if ends:
+            return buffer(self.data, self.contentOffset, min(ends) - self.contentOffset)
+        return buffer(self.data, self.contentOffset)
+
+    def Blob(self, index):
+        # a read only view of a blob in the blob section, straight from the mapped file
+        offset, length = self.blobs[index]
+        return buffer(self.data, offset, length)
+
+    def TypeName(self, index):
+        # index is as written before an object, 1 for the first type
+        guid = str(self.types[index - 1])
+        return KnownTypes.get(guid, guid)
+
+    def Seek(self, position):
+        self.position = position
+
+    def ReadStruct(self, format):
+        format = "<" + format.lstrip("<>=!@")
+        values = struct.unpack_from(format, self.data, self.position)
+        self.position += struct.calcsize(format)
+        return values
+
+    def ReadByte(self):
+        return self.ReadStruct('B')[0]
+
+    def ReadBool(self):
+        return self.ReadStruct('?')[0]
+
+    def ReadInt16(self):
+        return self.ReadStruct('h')[0]
+
+    def ReadInt(self):
+        return self.ReadStruct('i')[0]
+
+    def ReadLong(self):
+        return self.ReadStruct('q')[0]
+
+    def ReadUInt16(self):
+        return self.ReadStruct('H')[0]
+
+    def ReadUInt32(self):
+        return self.ReadStruct('I')[0]
+
+    def ReadUint64(self):
+        return self.ReadStruct('Q')[0]
+
+    def ReadSingle(self):
+        return self.ReadStruct('f')[0]
+
+    def ReadDouble(self):
+        return self.ReadStruct('d')[0]
+
+    def ReadBytes(self, count):
+        # a read only view of the next count bytes, not a copy
+        if self.position + count > len(self.data):
+            raise ValueError("%s: %d bytes at %d is past the end of the data" % (self.path, count, self.position))
+        view = buffer(self.data, self.position, count)
+        self.position += count
+        return view
+
+    def ReadVarInt(self):
+        # 7 bits a byte, low bits first
+        value = 0
+        shift = 0
+        while True:
+            byte = self.ReadByte()
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value
+
+    def ReadString(self):
+        if self.strings is not None:
+            return self.strings[self.ReadVarInt()]
+        return str(self.ReadBytes(self.ReadInt())).decode('utf-8')
+
+    def ReadGuid(self):
+        # .NET writes the first three fields of a Guid little endian
+        return uuid.UUID(bytes_le = str(self.ReadBytes(16)))
+
+    def Close(self):
+        self.data = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.Close()
+
+def Summary(reader):
+    lines = [
+        "%s" % reader.path,
+        "  identifier: %s version %d, flags 0x%02x%s" % (reader.identifierString, reader.version, reader.flags, " (compressed)" if reader.compressed else ""),
+        "  file size: %d bytes, content %d bytes" % (reader.fileSize, len(reader.content)),
+        "  shared resources: %d" % reader.sharedResourceCount,
+        "  blobs: %d, %d bytes aligned to %d" % (len(reader.blobs), sum(x[1] for x in reader.blobs), reader.blobAlignment) if reader.blobTableOffset is not None else "  blobs: inline",
+        "  strings: %d pooled" % len(reader.strings) if reader.strings is not None else "  strings: inline",
+        "  types:",
+    ]
+    for n, guid in enumerate(reader.types):
+        lines.append("    %d: %s %s" % (n + 1, guid, KnownTypes.get(str(guid), "")))
+    if reader.tableOfContentsOffset is not None:
+        lines.append("  objects:")
+        for n, (offset, length, typeIndex) in enumerate(reader.entries):
+            lines.append("    %s: %s, %d bytes at %d" % ("root" if n == 0 else "shared resource %d" % n, EntryTypeName(reader, typeIndex), length, offset))
+    elif len(reader.content) >= 4:
+        reader.Seek(reader.contentOffset)
+        first = reader.ReadInt()
+        lines.append("  first object: %s" % EntryTypeName(reader, first))
+    return "\n".join(lines)
+
+def EntryTypeName(reader, typeIndex):
+    return reader.TypeName(typeIndex) if 0 < typeIndex <= len(reader.types) else "type %d" % typeIndex
+
+def DifferentRanges(a, b, blockSize = 65536):
+    # (start, end) of the runs of bytes that differ, comparing whole blocks first
+    ranges = []
+    length = min(len(a), len(b))
+    for block in xrange(0, length, blockSize):
+        end = min(block + blockSize, length)
+        x = a[block:end]
+        y = b[block:end]
+        if x == y:
+            continue
+        for i in xrange(end - block):
+            if x[i] != y[i]:
+                if ranges and ranges[-1][1] == block + i:
+                    ranges[-1] = (ranges[-1][0], block + i + 1)
+                else:
+                    ranges.append((block + i, block + i + 1))
+    if len(a) != len(b):
+        if ranges and ranges[-1][1] == length:
+            ranges[-1] = (ranges[-1][0], max(len(a), len(b)))
+        else:
+            ranges.append((length, max(len(a), len(b))))
+    return ranges
+
+def Compare(a, b, limit = 20):
+    # the differences between two files, header field by field then runs of differing content bytes
+    differences = []
+    for name in ['version', 'flags', 'fileSize', 'sharedResourceCount', 'blobAlignment']:
+        if getattr(a, name) != getattr(b, name):
+            differences.append("%s: %s != %s" % (name, getattr(a, name), getattr(b, name)))
+    for n in xrange(max(len(a.types), len(b.types))):
+        x = a.types[n] if n < len(a.types) else None
+        y = b.types[n] if n < len(b.types) else None
+        if x != y:
+            differences.append("type %d: %s != %s" % (n + 1, x, y))
+    if a.entries and b.entries:
+        # object by object, so a change in one does not show as every later byte moving
+        if len(a.entries) != len(b.entries):
+            differences.append("object count: %d != %d" % (len(a.entries), len(b.entries)))
+        for n in xrange(min(len(a.entries), len(b.entries))):
+            name = "root" if n == 0 else "shared resource %d" % n
+            x = a.Entry(n)
+            y = b.Entry(n)
+            if len(x) != len(y):
+                differences.append("%s size: %d != %d" % (name, len(x), len(y)))
+            ranges = DifferentRanges(x, y)
+            for start, end in ranges[:limit]:
+                differences.append("%s bytes %d to %d differ" % (name, start, end))
+            if len(ranges) > limit:
+                differences.append("... %d more differing ranges in %s" % (len(ranges) - limit, name))
+    else:
+        if len(a.content) != len(b.content):
+            differences.append("content size: %d != %d" % (len(a.content), len(b.content)))
+        ranges = DifferentRanges(a.content, b.content)
+        for start, end in ranges[:limit]:
+            differences.append("content bytes %d to %d differ" % (start, end))
+        if len(ranges) > limit:
+            differences.append("... %d more differing ranges" % (len(ranges) - limit))
+    if a.strings is not None and b.strings is not None and a.strings != b.strings:
+        differences.append("string pools differ: %d strings, %d strings" % (len(a.strings), len(b.strings)))
+    if len(a.blobs) != len(b.blobs):
+        differences.append("blob count: %d != %d" % (len(a.blobs), len(b.blobs)))
+    for n in xrange(min(len(a.blobs), len(b.blobs))):
+        x = a.Blob(n)
+        y = b.Blob(n)
+        if len(x) != len(y):
+            differences.append("blob %d size: %d != %d" % (n, len(x), len(y)))
+        elif x != y:
+            differences.append("blob %d differs" % n)
+    return differences
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Inspect and compare MEB files.')
+    subparsers = parser.add_subparsers(dest='command')
+    summary = subparsers.add_parser('summary', help='print the header of MEB files.')
+    summary.add_argument('input', nargs='+', help='the MEB files to summarise.')
+    diff = subparsers.add_parser('diff', help='compare two MEB files, exiting with 1 if they differ.')
+    diff.add_argument('first', help='the first MEB file.')
+    diff.add_argument('second', help='the second MEB file.')
+    diff.add_argument('-n', '--limit', metavar='COUNT', type=int, default=20, help='number of differing content ranges to list (default 20).')
+    for subparser in [summary, diff]:
+        subparser.add_argument('--identifier', default='MEB', help='the file identifier (default MEB).')
+
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        for path in args.input:
+            with ContentReader(path, args.identifier) as reader:
+                print Summary(reader)
+    else:
+        with ContentReader(args.first, args.identifier) as first:
+            with ContentReader(args.second, args.identifier) as second:
+                differences = Compare(first, second, args.limit)
+        if differences:
+            print "\n".join(differences)
+            sys.exit(1)
+        print "identical"
@@ -1,22 +1,109 @@
 import clr
 
+clr.AddReferenceToFileAndPath("..\\External Resources\\Ionic.Zip.dll")
+
 from System import *
 from System.IO import *
+from System.Text import Encoding
+from System.Security.Cryptography import SHA1
+from Ionic.Zlib import DeflateStream, CompressionMode, CompressionLevel
+from array import array
+from itertools import chain
+from struct import pack
+
+# maps the characters of a packed str one to one onto bytes
+byteEncoding = Encoding.GetEncoding(28591)
+
+def PackedBytes(value, typecode, clrType, size):
+    # convert a sequence of numbers to a Byte array in a single block copy where possible
+    if isinstance(value, Array):
+        if value.GetType().GetElementType() == clrType:
+            data = Array.CreateInstance(Byte, value.Length * size)
+            Buffer.BlockCopy(value, 0, data, 0, data.Length)
+            return data
+        value = list(value)
+    elif isinstance(value, (str, bytearray, buffer)):
+        # already packed in the target layout
+        return byteEncoding.GetBytes(str(value))
+    if not isinstance(value, array) or value.typecode != typecode:
+        value = array(typecode, value)
+    return byteEncoding.GetBytes(value.tostring())
+
+# blob alignment the converters use, 0 writes blobs inline
+DefaultBlobAlignment = 16
+
+FlagCompressed = 0x1
+FlagBlobSection = 0x2
+FlagTableOfContents = 0x4
+FlagStringPool = 0x8
+FlagUncompressedHeader = 0x10
+
+def ContentHash(data):
+    # key telling Byte arrays apart by their content
+    return BitConverter.ToString(SHA1.Create().ComputeHash(data))
+
+def LittleEndianFormat(format):
+    # MEB files are always little endian with no alignment padding
+    return "<" + format.lstrip("<>=!@")
 
 class ContentWriter(object):
-    def __init__(self, outputStream, compressOutput = False, identifierString = "MEB"):
+    def __init__(self, outputStream, compressOutput = False, identifierString = "MEB", compressionLevel = 6, bufferSize = 4096, streamOutput = True, blobAlignment = 0, tableOfContents = False, stringPool = False):
+        if compressionLevel < 0 or compressionLevel > 9:
+            raise ValueError("compression level must be between 0 and 9: %d" % compressionLevel)
+        if bufferSize <= 0:
+            raise ValueError("buffer size must be positive: %d" % bufferSize)
+        if blobAlignment < 0:
+            raise ValueError("blob alignment must not be negative: %d" % blobAlignment)
         self.identifierString = identifierString
         self.compressContent = compressOutput
+        self.compressionLevel = compressionLevel
+        self.bufferSize = bufferSize
         self.finalOutput = BinaryWriter(outputStream)
-        self.headerContent = MemoryStream()
-        self.contentData = MemoryStream()
-        self.outStream = BinaryWriter(self.contentData)
+        # seekable output is written in place and the header patched on Flush, compressed content
+        # being deflated as it is written. non-seekable output is buffered until the header and file
+        # size are known.
+        self.streamOutput = streamOutput and outputStream.CanSeek
+        self.deflateStream = None
+        if self.streamOutput:
+            self.headerContent = None
+            self.contentData = None
+            self._outStream = None
+        else:
+            self.headerContent = MemoryStream()
+            self.contentData = MemoryStream()
+            self._outStream = BinaryWriter(self.contentData)
+        self.startPosition = 0
+        self.sizePosition = 0
+        self.contentStart = 0
+        self.reservedTypeCount = 0
         self.typeMap = {}
         self.sharedResourceMap = {}
         self.sharedResources = []
         self.typeList = []
         self.typeSerializerMap = {}
-        self.version = 1
+        # compressed files cannot be mapped, so their blobs stay inline
+        self.blobAlignment = 0 if compressOutput else blobAlignment
+        self.blobs = []
+        self.blobMap = {}
+        self.blobTableOffset = 0
+        # [offset, length, type index] of each top level object, also only for uncompressed files
+        self.tableOfContents = tableOfContents and not compressOutput
+        self.entries = []
+        self.objectStart = None
+        self.tableOfContentsOffset = 0
+        # each distinct string once, strings in the content are indices into it
+        self.stringPool = stringPool and not compressOutput
+        self.strings = []
+        self.stringMap = {}
+        self.stringPoolOffset = 0
+        # 2 for the current record layouts, the runtime still reads version 1 files in the old ones
+        self.version = 2
+    
+    @property
+    def outStream(self):
+        if self._outStream is None:
+            self.BeginContent()
+        return self._outStream
         
     def WriteBool(self, value):
         self.outStream.Write(clr.Convert(value, Boolean))
@@ -55,53 +142,304 @@ class ContentWriter(object):
         self.outStream.Write(clr.Convert(value, SByte))
         
     def WriteByteArray(self, value):
+        if not isinstance(value, Array):
+            value = PackedBytes(value, 'B', Byte, 1)
         self.outStream.Write(value)
     
     def WriteByteArrayPartial(self, value, offset, count):
         self.outStream.Write(value, offset, count)
         
+    def WriteInt16Array(self, value):
+        self.outStream.Write(PackedBytes(value, 'h', Int16, 2))
+    
+    def WriteUInt16Array(self, value):
+        self.outStream.Write(PackedBytes(value, 'H', UInt16, 2))
+    
+    def WriteInt32Array(self, value):
+        self.outStream.Write(PackedBytes(value, 'i', Int32, 4))
+    
+    def WriteUInt32Array(self, value):
+        self.outStream.Write(PackedBytes(value, 'I', UInt32, 4))
+    
+    def WriteSingleArray(self, value):
+        self.outStream.Write(PackedBytes(value, 'f', Single, 4))
+    
+    def WriteDoubleArray(self, value):
+        self.outStream.Write(PackedBytes(value, 'd', Double, 8))
+    
+    def WriteStruct(self, format, *values):
+        self.outStream.Write(byteEncoding.GetBytes(pack(LittleEndianFormat(format), *values)))
+    
+    def WriteStructArray(self, format, records):
+        # write a list of records sharing one struct format as a single block
+        records = list(records)
+        if not records:
+            return
+        format = LittleEndianFormat(format)[1:]
+        data = pack("<" + format * len(records), *chain.from_iterable(records))
+        self.outStream.Write(byteEncoding.GetBytes(data))
+        
     def WriteChar(self, value):
         self.outStream.Write(clr.Convert(value, Char))
         
     def WriteString(self, value):
-        self.WriteInt(len(value))
-        self.outStream.Write(clr.Convert(value, String).ToCharArray(), 0, len(value))
+        if self.stringPool:
+            if value not in self.stringMap:
+                self.stringMap[value] = len(self.strings)
+                self.strings.append(value)
+            self.WriteVarInt(self.stringMap[value])
+        else:
+            # the length is of the UTF-8 bytes, not the characters
+            data = Encoding.UTF8.GetBytes(value)
+            self.WriteInt(data.Length)
+            self.outStream.Write(data)
+    
+    def WriteVarInt(self, value):
+        # 7 bits a byte, low bits first, with the top bit set on every byte but the last
+        if value < 0:
+            raise ValueError("variable length integers must not be negative: %d" % value)
+        data = bytearray()
+        while value >= 0x80:
+            data.append(value & 0x7f | 0x80)
+            value >>= 7
+        data.append(value)
+        self.outStream.Write(PackedBytes(data, 'B', Byte, 1))
+    
+    def WriteBlob(self, value):
+        # bulk data such as pixels and vertices. with a blob alignment it goes in the blob section at
+        # the end of the file, starting on an aligned offset, and only its index is written here.
+        # otherwise it is written inline after its length
+        if not isinstance(value, Array):
+            value = PackedBytes(value, 'B', Byte, 1)
+        if self.blobAlignment:
+            # equal data, such as the same buffer in two shared resources, is stored once
+            key = ContentHash(value)
+            if key not in self.blobMap:
+                self.blobMap[key] = len(self.blobs)
+                self.blobs.append(value)
+            self.WriteInt(self.blobMap[key])
+        else:
+            self.WriteInt(value.Length)
+            self.outStream.Write(value)
     
     def WriteGuid(self, value):
         self.outStream.Write(value.ToByteArray())
     
+    def BeginObject(self, typeIndex):
+        # start a top level object, the root or a shared resource, ending the one before it
+        self.EndObject()
+        if self.tableOfContents:
+            # from the start of the content until the header is written on Flush
+            self.objectStart = self.ContentPosition()
+            self.entries.append([self.objectStart, 0, typeIndex])
+        self.WriteInt(typeIndex)
+    
+    def EndObject(self):
+        if self.objectStart is not None:
+            self.entries[-1][1] = self.ContentPosition() - self.objectStart
+            self.objectStart = None
+    
     def WriteObject(self, value):
-        # TODO: implement writing objects
-        pass
+        # the type index of the value's serializer then what the serializer writes, 0 for None
+        if value is None:
+            self.WriteInt(0)
+            return
+        serializer = self.GetSerializer(value)
+        self.WriteInt(self.TypeIndex(serializer))
+        serializer.Write(self, value)
+    
+    def GetSerializer(self, value):
+        # serializers have an id Guid and a Write(writer, value) method, typeSerializerMap maps the
+        # types they write to them
+        for t in type(value).__mro__:
+            if t in self.typeSerializerMap:
+                return self.typeSerializerMap[t]
+        raise ValueError("no serializer for %s" % type(value).__name__)
+    
+    def TypeIndex(self, serializer):
+        # index of the serializer in the header, from 1, adding it to the type list on first use
+        if serializer not in self.typeMap:
+            if serializer not in self.typeList:
+                self.typeList.append(serializer)
+            self.typeMap[serializer] = self.typeList.index(serializer) + 1
+        return self.typeMap[serializer]
+    
+    def AddSharedResource(self, value):
+        # the index a reference to value is written as, from 1 with 0 for None. resources are written
+        # once after the root object, and ones that serialize to the same bytes are stored once
+        if value is None:
+            return 0
+        serializer = self.GetSerializer(value)
+        typeIndex = self.TypeIndex(serializer)
+        data = self.Serialize(serializer, value)
+        key = (typeIndex, ContentHash(data))
+        if key not in self.sharedResourceMap:
+            self.sharedResourceMap[key] = len(self.sharedResources)
+            self.sharedResources.append((typeIndex, data))
+        return self.sharedResourceMap[key] + 1
+    
+    def WriteSharedResource(self, value):
+        self.WriteInt(self.AddSharedResource(value))
+    
+    def Serialize(self, serializer, value):
+        # what the serializer writes for value, as a Byte array instead of in the output. blobs it
+        # writes are still added to the blob section
+        output = self._outStream
+        data = MemoryStream()
+        self._outStream = BinaryWriter(data)
+        try:
+            serializer.Write(self, value)
+            self._outStream.Flush()
+        finally:
+            self._outStream = output
+        return data.ToArray()
     
     def Flush(self):
         self.WriteSharedResources()
-        self.WriteHeader()
-        self.WriteOutput()
+        self.EndObject()
+        if not self.streamOutput:
+            # the section offsets written from here on take the header length from these types
+            self.reservedTypeCount = len(self.typeList)
+        self.WriteBlobs()
+        self.WriteTableOfContents()
+        self.WriteStringPool()
+        if self.streamOutput:
+            self.PatchHeader()
+        else:
+            self.CheckTypeList()
+            self.WriteHeader(BinaryWriter(self.headerContent))
+            self.WriteOutput()
     
     def WriteSharedResources(self):
-        for i in xrange(len(self.sharedResources)):
-            value = self.sharedResources[i]
-            self.WriteObject(value)
+        for typeIndex, data in self.sharedResources:
+            self.BeginObject(typeIndex)
+            self.outStream.Write(data)
+    
+    def WriteBlobs(self):
+        # each blob padded to start on a multiple of the alignment from the start of the file, then
+        # the table of their offsets and lengths, which the header points to
+        if not self.blobAlignment:
+            return
+        table = []
+        for blob in self.blobs:
+            padding = -self.FilePosition() % self.blobAlignment
+            if padding:
+                self.outStream.Write(Array.CreateInstance(Byte, padding))
+            table.append((self.FilePosition(), blob.Length))
+            self.outStream.Write(blob)
+        self.blobTableOffset = self.FilePosition()
+        self.WriteInt(len(table))
+        self.WriteInt(self.blobAlignment)
+        self.WriteStructArray('2q', table)
+    
+    def WriteTableOfContents(self):
+        # after everything else, so the header only needs its offset and can be reserved up front
+        if not self.tableOfContents:
+            return
+        self.tableOfContentsOffset = self.FilePosition()
+        self.WriteInt(len(self.entries))
+        self.WriteStructArray('2qi', [(self.FileOffset(offset), length, typeIndex) for offset, length, typeIndex in self.entries])
+    
+    def WriteStringPool(self):
+        if not self.stringPool:
+            return
+        self.stringPoolOffset = self.FilePosition()
+        self.WriteInt(len(self.strings))
+        for value in self.strings:
+            data = Encoding.UTF8.GetBytes(value)
+            self.WriteVarInt(data.Length)
+            self.outStream.Write(data)
     
-    def WriteHeader(self):
-        writer = BinaryWriter(self.headerContent)
+    def FilePosition(self):
+        # offset in the file of the next content byte, only final once every type is known on Flush
+        return self.FileOffset(self.ContentPosition())
+    
+    def ContentPosition(self):
+        # offset of the next content byte from the end of the header
+        if self.streamOutput:
+            self.outStream.Flush()
+            return self.finalOutput.BaseStream.Position - self.contentStart
+        return self.contentData.Length
+    
+    def FileOffset(self, contentPosition):
+        # offset in the file of a content position. buffered output has its header written on Flush,
+        # with however many types are in use by then
+        if self.streamOutput:
+            return self.contentStart - self.startPosition + contentPosition
+        return len(self.identifierString) + 10 + self.HeaderLength() + contentPosition
+    
+    def HeaderLength(self):
+        return 8 + 16 * len(self.typeList) + (8 if self.blobAlignment else 0) + (8 if self.tableOfContents else 0) + (8 if self.stringPool else 0)
+    
+    def WriteHeader(self, writer):
         writer.Write(clr.Convert(len(self.typeList), Int32))
         for serializer in self.typeList:
             writer.Write(serializer.id.ToByteArray())
         writer.Write(clr.Convert(len(self.sharedResources), Int32))
+        if self.blobAlignment:
+            writer.Write(clr.Convert(self.blobTableOffset, Int64))
+        if self.tableOfContents:
+            writer.Write(clr.Convert(self.tableOfContentsOffset, Int64))
+        if self.stringPool:
+            writer.Write(clr.Convert(self.stringPoolOffset, Int64))
         
-    def WriteOutput(self):
+    def BeginContent(self):
+        # reserve the file size and header in the output, the content is then written straight after them
+        self.startPosition = self.finalOutput.BaseStream.Position
+        self.WriteIdentifier()
+        self.sizePosition = self.finalOutput.BaseStream.Position
+        self.finalOutput.Write(clr.Convert(0, Int64))
+        self.reservedTypeCount = len(self.typeList)
+        self.WriteHeader(self.finalOutput)
+        self.finalOutput.Flush()
+        self.contentStart = self.finalOutput.BaseStream.Position
+        if self.compressContent:
+            # the header is left uncompressed so it can be patched, only the content is deflated
+            self.deflateStream = DeflateStream(self.finalOutput.BaseStream, CompressionMode.Compress, self.DeflateLevel(), True)
+            self.deflateStream.BufferSize = max(self.bufferSize, 1024)  # Ionic's smallest buffer
+            self._outStream = BinaryWriter(self.deflateStream)
+        else:
+            self._outStream = self.finalOutput
+    
+    def PatchHeader(self):
+        if self._outStream is None:
+            self.BeginContent()
+        self.CheckTypeList()
+        if self.deflateStream is not None:
+            self._outStream.Flush()
+            self.deflateStream.Close()
+        self.finalOutput.Flush()
+        output = self.finalOutput.BaseStream
+        end = output.Position
+        output.Seek(self.sizePosition, SeekOrigin.Begin)
+        self.finalOutput.Write(clr.Convert(end - self.startPosition, Int64))
+        self.WriteHeader(self.finalOutput)
+        self.finalOutput.Flush()
+        output.Seek(end, SeekOrigin.Begin)
+    
+    def CheckTypeList(self):
+        if len(self.typeList) != self.reservedTypeCount:
+            raise ValueError("type list changed after content was written: %d types reserved, %d in use" % (self.reservedTypeCount, len(self.typeList)))
+    
+    def WriteIdentifier(self):
         for c in self.identifierString:
             self.finalOutput.Write(clr.Convert(c, Char))
         self.finalOutput.Write(clr.Convert(self.version, Byte))
         flags = 0
         if self.compressContent:
-            flags |= 0x1
+            flags |= FlagCompressed
+            if self.streamOutput:
+                flags |= FlagUncompressedHeader
+        if self.blobAlignment:
+            flags |= FlagBlobSection
+        if self.tableOfContents:
+            flags |= FlagTableOfContents
+        if self.stringPool:
+            flags |= FlagStringPool
         self.finalOutput.Write(clr.Convert(flags, Byte))
         
-        filesize = self.finalOutput.BaseStream.Length + self.headerContent.Length + self.contentData.Length + 8
-        self.finalOutput.Write(clr.Convert(filesize, Int64))
+    def WriteOutput(self):
+        self.WriteIdentifier()
         
         if self.compressContent:
             self.WriteCompressedContent()
@@ -109,16 +447,52 @@ class ContentWriter(object):
             self.WriteUncompressedContent()
     
     def WriteCompressedContent(self):
-        raise NotImplementedError()
+        # buffered output has the header and content deflated together after the file size,
+        # which is only known once compression is finished.
+        self.finalOutput.Flush()
+        output = self.finalOutput.BaseStream
+        if output.CanSeek:
+            sizePosition = output.Position
+            self.finalOutput.Write(clr.Convert(0, Int64))
+            self.finalOutput.Flush()
+            compressedSize = self.Deflate(output)
+            end = output.Position
+            output.Seek(sizePosition, SeekOrigin.Begin)
+            self.finalOutput.Write(clr.Convert(len(self.identifierString) + 10 + compressedSize, Int64))
+            self.finalOutput.Flush()
+            output.Seek(end, SeekOrigin.Begin)
+        else:
+            # no way to patch the size, so hold the compressed data until it is known
+            compressed = MemoryStream()
+            compressedSize = self.Deflate(compressed)
+            self.finalOutput.Write(clr.Convert(len(self.identifierString) + 10 + compressedSize, Int64))
+            compressed.Seek(0, SeekOrigin.Begin)
+            self.Pump(compressed, self.finalOutput)
+    
+    def Deflate(self, output):
+        # compress the header and content into output, returning the number of bytes written
+        start = output.Position
+        stream = DeflateStream(output, CompressionMode.Compress, self.DeflateLevel(), True)
+        self.headerContent.Seek(0, SeekOrigin.Begin)
+        self.contentData.Seek(0, SeekOrigin.Begin)
+        self.Pump(self.headerContent, stream)
+        self.Pump(self.contentData, stream)
+        stream.Close()
+        return output.Position - start
+        
+    def DeflateLevel(self):
+        return getattr(CompressionLevel, "Level%d" % self.compressionLevel)
         
     def WriteUncompressedContent(self):
+        filesize = len(self.identifierString) + 10 + self.headerContent.Length + self.contentData.Length
+        self.finalOutput.Write(clr.Convert(filesize, Int64))
         self.headerContent.Seek(0, SeekOrigin.Begin)
         self.contentData.Seek(0, SeekOrigin.Begin)
         self.Pump(self.headerContent, self.finalOutput)
         self.Pump(self.contentData, self.finalOutput)
         
     def Pump(self, input, output):
-        bytes = Array.CreateInstance(Byte, 4096)    # 4Kib at a time
+        bytes = Array.CreateInstance(Byte, self.bufferSize)
         while 1:
             n = input.Read(bytes, 0, bytes.Length)
             if n == 0:
@@ -6,27 +6,28 @@ clr.AddReferenceByPartialName("PresentationFramework")
 clr.AddReferenceByPartialName("WindowsBase")
 clr.AddReferenceByPartialName("IronPython")
 
-clr.AddReferenceToFileAndPath("..\\External Resources\\OpenTK.dll")
-
 from System import *
 from sys import *
 from System.IO import *
 from System.Drawing import *
 from System.Drawing.Imaging import BitmapData, ImageLockMode
 import System.Drawing.Imaging.PixelFormat as PF
-from OpenTK import *
-from OpenTK.Graphics import GraphicsContext, GraphicsMode
-from OpenTK.Graphics.OpenGL import *
-from OpenTK.Graphics.OpenGL import GL
 from System.Text import Encoding
 from struct import *
 import argparse
 import os.path
-from ContentWriter import ContentWriter
+import re
+from ContentWriter import ContentWriter, DefaultBlobAlignment
+from PixelConversion import LoadPixels, BgraToR8
+from Mipmaps import MipmapChain, Filters
+from DistanceField import SignedDistanceField, Reduce
+import BlockCompression
 
 class BitmapFont:
     def __init__(self):
         self.characterSet = CharacterSet()
+        # page image paths, indexed by page id
+        self.pages = []
 
 class CharacterSet:
     def __init__(self):
@@ -37,14 +38,29 @@ class CharacterSet:
         self.paddingRight = 0
         self.paddingDown = 0
         self.paddingLeft = 0
+        self.pageWidth = 0
+        self.pageHeight = 0
         self.characters = []
+        self.characterMap = {}
+
+    def AddCharacter(self, character):
+        self.characterMap[character.id] = character
+        self.characters.append(character)
     
     def GetCharacterByID(self, id):
-        character = [x for x in self.characters if x.id == id]
-        if len(character) == 1:
-            return character[0]
-        else:
-            return None
+        return self.characterMap.get(id)
+
+    def LookupTable(self):
+        # first codepoint and the glyph index of every codepoint from it to the last, 0xffff for none
+        if not self.characters:
+            return 0, []
+        if len(self.characters) >= 0xffff:
+            raise ValueError("too many glyphs for a 16 bit lookup table: %d" % len(self.characters))
+        first = min(self.characterMap)
+        table = [0xffff] * (max(self.characterMap) - first + 1)
+        for n, c in enumerate(self.characters):
+            table[c.id - first] = n
+        return first, table
         
 class Character:
     def __init__(self):
@@ -56,141 +72,207 @@ class Character:
         self.xOffset = 0
         self.yOffset = 0
         self.xAdvance = 0
+        self.page = 0
         self.kerning = {}
 
 class Serializer:
     def __init__(self, id):
         self.id = Guid(id)
         
-window = NativeWindow()
-context = GraphicsContext(GraphicsMode.Default, window.WindowInfo)
-context.MakeCurrent(window.WindowInfo)
-context.LoadAll()
-
-parser = argparse.ArgumentParser(description='Convert an font file to MEB font format.')
-parser.add_argument('input', help='the font file to convert')
-parser.add_argument('-o', metavar='OUTPUT', help='file to output MEB font to.')
-
-args = parser.parse_args()
-
-if args.o:
-    outfile = args.o
-else:
-    outfile = os.path.splitext(os.path.split(args.input)[1])[0] + '.meb'
-
-# load and read the fnt file
-f = open(args.input, 'r')
-inputPath = os.path.split(args.input)[0]
-fontImagePath = ""
-font = BitmapFont()
-for line in f.readlines():
-    tokens = line.strip().split()
-    if tokens[0] == "info":
-        for token in tokens[1:]:
-            data = token.split("=", 1)
-            if data[0] == "size":
-                font.characterSet.renderedSize = int(data[1])
-            elif data[0] == "padding":
-                up, right, down, left = [int(x) for x in data[1].split(',')]
-                font.characterSet.paddingUp = up
-                font.characterSet.paddingRight = right
-                font.characterSet.paddingDown = down
-                font.characterSet.paddingLeft = left
-    elif tokens[0] == "common":
-        for token in tokens[1:]:
-            data = token.split("=", 1)
-            if data[0] == "lineHeight":
-                font.characterSet.lineHeight = int(data[1])
-            elif data[0] == "base":
-                font.characterSet.base = int(data[1])
-    elif tokens[0] == "page":
-        if tokens[1] != "id=0":
+def OutputName(input):
+    return os.path.splitext(os.path.split(input)[1])[0] + '.meb'
+
+def Dependencies(input):
+    # every file the output is built from, the fnt file and its page images
+    return [input] + LoadFont(input).pages
+
+def LoadFont(input):
+    # load a text or binary BMFont file
+    f = open(input, 'rb')
+    try:
+        data = f.read()
+    finally:
+        f.close()
+    if data[:3] == 'BMF':
+        font = ParseBinaryFont(data)
+    else:
+        font = ParseTextFont(data)
+    inputPath = os.path.split(input)[0]
+    font.pages = [os.path.join(inputPath, x) for x in font.pages]
+    return font
+
+fntAttributeRegex = re.compile(r'(\w+)=("[^"]*"|\S*)')
+
+def ParseTextFont(data):
+    font = BitmapFont()
+    cs = font.characterSet
+    pages = {}
+    for line in data.splitlines():
+        tag = line.split(None, 1)
+        if not tag:
             continue
-        fontImagePath = os.path.join(inputPath, tokens[2].split('=', 1)[1][1:-1])
-    elif tokens[0] == "char":
-        char = Character()
-        for token in tokens[1:]:
-            data = token.split("=", 1)
-            if data[0] == "id":
-                char.id = int(data[1])
-            elif data[0] == "x":
-                char.x = int(data[1])
-            elif data[0] == "y":
-                char.y = int(data[1])
-            elif data[0] == "width":
-                char.width = int(data[1])
-            elif data[0] == "height":
-                char.height = int(data[1])
-            elif data[0] == "xoffset":
-                char.xOffset = int(data[1])
-            elif data[0] == "yoffset":
-                char.yOffset = int(data[1])
-            elif data[0] == "xadvance":
-                char.xAdvance = int(data[1])
-        font.characterSet.characters.append(char)
-    elif tokens[0] == "kerning":
-        for token in tokens[1:]:
-            data = token.split("=", 1)
-            if data[0] == "first":
-                index = int(data[1])
-            elif data[0] == "second":
-                second = int(data[1])
-            elif data[0] == "amount":
-                amount = int(data[1])
-        char = font.characterSet.GetCharacterByID(index)
-        if char:
-            char.kerning[second] = ammount
-
-# build the MEB font file
-f = File.Create(outfile)
-writer = ContentWriter(f)      
-
-# get and write the image data
-bmp = Bitmap(fontImagePath)
-bmp_data = bmp.LockBits(Rectangle(0, 0, bmp.Width, bmp.Height), ImageLockMode.ReadOnly, PF.Format32bppArgb)
-texID = GL.GenTexture()
-GL.BindTexture(TextureTarget.Texture2D, texID)
-GL.TexImage2D(TextureTarget.Texture2D, 0, PixelInternalFormat.Rgba, bmp.Width, bmp.Height, 0, PixelFormat.Bgra, PixelType.UnsignedByte, bmp_data.Scan0);
-bmp.UnlockBits(bmp_data);
-data = Array.CreateInstance(Byte, bmp.Width * bmp.Height * 4)
-GL.GetTexImage(TextureTarget.Texture2D, 0, PixelFormat.Rgba, PixelType.UnsignedByte, data)
-# we just need grayscale image for the font
-img = Array.CreateInstance(Byte, bmp.Width * bmp.Height)
-for i in xrange(bmp.Width * bmp.Height):
-    img[i] = data[i * 4]
+        tag = tag[0]
+        attributes = dict(fntAttributeRegex.findall(line))
+        if tag == "info":
+            cs.renderedSize = int(attributes.get("size", 0))
+            if "padding" in attributes:
+                cs.paddingUp, cs.paddingRight, cs.paddingDown, cs.paddingLeft = [int(x) for x in attributes["padding"].split(',')]
+        elif tag == "common":
+            cs.lineHeight = int(attributes.get("lineHeight", 0))
+            cs.base = int(attributes.get("base", 0))
+            cs.pageWidth = int(attributes.get("scaleW", 0))
+            cs.pageHeight = int(attributes.get("scaleH", 0))
+        elif tag == "page":
+            pages[int(attributes["id"])] = attributes["file"].strip('"')
+        elif tag == "char":
+            char = Character()
+            char.id = int(attributes["id"])
+            char.x = int(attributes.get("x", 0))
+            char.y = int(attributes.get("y", 0))
+            char.width = int(attributes.get("width", 0))
+            char.height = int(attributes.get("height", 0))
+            char.xOffset = int(attributes.get("xoffset", 0))
+            char.yOffset = int(attributes.get("yoffset", 0))
+            char.xAdvance = int(attributes.get("xadvance", 0))
+            char.page = int(attributes.get("page", 0))
+            cs.AddCharacter(char)
+        elif tag == "kerning":
+            char = cs.GetCharacterByID(int(attributes["first"]))
+            if char:
+                char.kerning[int(attributes["second"])] = int(attributes["amount"])
+    font.pages = [pages[x] for x in sorted(pages)]
+    return font
+
+def ParseBinaryFont(data):
+    # BMFont binary format version 3, a sequence of typed blocks after the 4 byte header
+    if ord(data[3]) != 3:
+        raise ValueError("unsupported binary BMFont version: %d" % ord(data[3]))
+    font = BitmapFont()
+    cs = font.characterSet
+    position = 4
+    while position < len(data):
+        blockType, size = unpack_from('<BI', data, position)
+        position += 5
+        block = data[position:position + size]
+        position += size
+        if blockType == 1:
+            cs.renderedSize = unpack_from('<h', block)[0]
+            cs.paddingUp, cs.paddingRight, cs.paddingDown, cs.paddingLeft = unpack_from('<4B', block, 7)
+        elif blockType == 2:
+            cs.lineHeight, cs.base, cs.pageWidth, cs.pageHeight = unpack_from('<4H', block)
+        elif blockType == 3:
+            font.pages = [x for x in block.split('\0') if x]
+        elif blockType == 4:
+            for offset in xrange(0, size - size % 20, 20):
+                char = Character()
+                char.id, char.x, char.y, char.width, char.height, char.xOffset, char.yOffset, char.xAdvance, char.page = unpack_from('<I4H3hB', block, offset)
+                cs.AddCharacter(char)
+        elif blockType == 5:
+            for offset in xrange(0, size - size % 10, 10):
+                first, second, amount = unpack_from('<IIh', block, offset)
+                char = cs.GetCharacterByID(first)
+                if char:
+                    char.kerning[second] = amount
+    return font
+
+# formats the font atlas can be written in
+FontFormats = ['r8', 'bc4']
+
+def Convert(input, output, mipmaps = None, format = 'r8', threads = 1, sdf = None, sdfScale = 1, compress = None, align = DefaultBlobAlignment):
+    # sdf is the spread in atlas pixels to store a signed distance field of the glyphs over, in an
+    # atlas sdfScale times smaller. glyph metrics stay in the units of the source atlas.
+    font = LoadFont(input)
+    cs = font.characterSet
+    
+    # get the image data, we just need the red channel as a grayscale image for the font. pages are
+    # stacked from top to bottom in one texture and the glyphs moved to their page's place in it
+    pages = []
+    for page in font.pages:
+        width, height, data = LoadPixels(page)
+        if pages and (width, height) != (pageWidth, pageHeight):
+            raise ValueError("font pages are not all the same size: %s" % page)
+        pageWidth, pageHeight = width, height
+        img = BgraToR8(data)
+        if sdf:
+            img = SignedDistanceField(img, width, height, sdf)
+        pages.append(img)
+    if not pages:
+        raise ValueError("font has no pages: %s" % input)
+    img = bytearray()
+    for page in pages:
+        img.extend(page)
+    width = pageWidth
+    height = pageHeight * len(pages)
+    for c in cs.characters:
+        c.y += c.page * pageHeight
+    atlasWidth, atlasHeight = width, height
+    if sdf and sdfScale > 1:
+        img, width, height = Reduce(img, width, height, sdfScale)
+    if mipmaps:
+        # glyph coverage is linear, no gamma correction
+        levels = MipmapChain(img, width, height, 1, mipmaps, False)
+    else:
+        levels = [(width, height, img)]
     
-writer.typeList.append(Serializer('1f6057f0-d13f-42ae-9e6b-4011fad823fd'))
-writer.typeList.append(Serializer('e5e29004-6f77-4be4-a9c6-c3eb363ca021'))
-writer.WriteInt(1)  # first type
-writer.WriteInt(2)  # second type
-writer.WriteUInt32(4)   # R8 format
-writer.WriteInt(bmp.Width)
-writer.WriteInt(bmp.Height)
-writer.WriteInt(1)  # single image no mipmaps
-writer.WriteUInt32(bmp.Width * bmp.Height)  # data size
-writer.WriteByteArray(img)
-writer.WriteInt(font.characterSet.lineHeight)
-writer.WriteInt(font.characterSet.base)
-writer.WriteInt(font.characterSet.renderedSize)
-writer.WriteInt(font.characterSet.paddingUp)
-writer.WriteInt(font.characterSet.paddingRight)
-writer.WriteInt(font.characterSet.paddingDown)
-writer.WriteInt(font.characterSet.paddingLeft)
-writer.WriteInt(len(font.characterSet.characters))
-for c in font.characterSet.characters:
-    writer.WriteInt(c.id)
-    writer.WriteInt(c.x)
-    writer.WriteInt(c.y)
-    writer.WriteInt(c.width)
-    writer.WriteInt(c.height)
-    writer.WriteInt(c.xOffset)
-    writer.WriteInt(c.yOffset)
-    writer.WriteInt(c.xAdvance)
-    writer.WriteInt(len(c.kerning))
-    for k, v in c.kerning:
-        writer.WriteInt(k)
-        writer.WriteInt(v)
-
-writer.Flush()
-f.Close()
-        
\ No newline at end of file
+    # build the MEB font file
+    f = File.Create(output)
+    try:
+        writer = ContentWriter(f, compress is not None, "MEB", 6 if compress is None else compress, blobAlignment = align, tableOfContents = True)
+        writer.typeList.append(Serializer('1f6057f0-d13f-42ae-9e6b-4011fad823fd'))
+        writer.typeList.append(Serializer('e5e29004-6f77-4be4-a9c6-c3eb363ca021'))
+        writer.BeginObject(1)  # first type
+        writer.WriteInt(2)  # second type
+        if format == 'bc4':
+            writer.WriteUInt32(BlockCompression.FormatBC4)
+        else:
+            writer.WriteUInt32(4)   # R8 format
+        writer.WriteInt(width)
+        writer.WriteInt(height)
+        writer.WriteInt(len(levels))
+        for levelWidth, levelHeight, levelData in levels:
+            if format == 'bc4':
+                levelData = BlockCompression.Compress(levelData, levelWidth, levelHeight, 1, BlockCompression.FormatBC4, threads)
+            writer.WriteBlob(levelData)
+        writer.WriteStruct('7i', cs.lineHeight, cs.base, cs.renderedSize, cs.paddingUp, cs.paddingRight, cs.paddingDown, cs.paddingLeft)
+        writer.WriteStruct('2if', atlasWidth, atlasHeight, sdf if sdf else 0.0)  # glyph coordinate space and distance field spread
+        # glyphs in codepoint order so the kerning table below is sorted by (first, second), each
+        # glyph's pairs start at its kerning offset and end at the next glyph's
+        cs.characters.sort(key = lambda c: c.id)
+        seconds = []
+        amounts = []
+        writer.WriteInt(len(cs.characters))
+        for c in cs.characters:
+            writer.WriteStruct('9i', c.id, c.x, c.y, c.width, c.height, c.xOffset, c.yOffset, c.xAdvance, len(seconds))
+            for second in sorted(c.kerning):
+                amount = c.kerning[second]
+                if not -0x8000 <= amount <= 0x7fff:
+                    raise ValueError("kerning amount %d between %d and %d does not fit in 16 bits" % (amount, c.id, second))
+                seconds.append(second)
+                amounts.append(amount)
+        writer.WriteInt(len(seconds))
+        writer.WriteInt32Array(seconds)
+        writer.WriteInt16Array(amounts)
+        # dense codepoint to glyph index table so the runtime can find a glyph without searching
+        first, table = cs.LookupTable()
+        writer.WriteInt(first)
+        writer.WriteInt(len(table))
+        writer.WriteUInt16Array(table)
+        writer.Flush()
+    finally:
+        f.Close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert an font file to MEB font format.')
+    parser.add_argument('input', help='the text or binary BMFont file to convert')
+    parser.add_argument('-o', metavar='OUTPUT', help='file to output MEB font to.')
+    parser.add_argument('-m', '--mipmaps', metavar='FILTER', nargs='?', const='box', choices=sorted(Filters), help='generate the mipmap chain, with an optional FILTER of box, kaiser or lanczos (default box).')
+    parser.add_argument('-f', '--format', metavar='FORMAT', default='r8', choices=FontFormats, help='atlas format, r8 or bc4 (default r8).')
+    parser.add_argument('-j', '--threads', metavar='THREADS', type=int, default=Environment.ProcessorCount, help='number of threads to block compress with (default is the number of processors).')
+    parser.add_argument('--sdf', metavar='SPREAD', type=float, help='store a signed distance field spreading SPREAD pixels either side of the glyph edges, the font should be generated with at least that much padding.')
+    parser.add_argument('--sdf-scale', metavar='FACTOR', type=int, default=1, help='reduce a distance field atlas by FACTOR (default 1).')
+    parser.add_argument('-z', '--compress', metavar='LEVEL', nargs='?', type=int, const=6, help='compress the MEB output, with an optional compression LEVEL from 0 to 9 (default 6).')
+    parser.add_argument('-a', '--align', metavar='BYTES', type=int, default=DefaultBlobAlignment, help='align the glyph page data to BYTES in an uncompressed MEB so it can be mapped, 0 to write it inline (default %d).' % DefaultBlobAlignment)
+
+    args = parser.parse_args()
+
+    Convert(args.input, args.o if args.o else OutputName(args.input), args.mipmaps, args.format, args.threads, args.sdf, args.sdf_scale, args.compress, args.align)
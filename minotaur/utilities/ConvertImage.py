@@ -5,7 +5,6 @@ clr.AddReferenceByPartialName("PresentationCore")
 clr.AddReferenceByPartialName("PresentationFramework")
 clr.AddReferenceByPartialName("WindowsBase")
 clr.AddReferenceByPartialName("IronPython")
-clr.AddReferenceToFileAndPath("..\\External Resources\\OpenTK.dll")
 
 from System import *
 from sys import *
@@ -14,59 +13,76 @@ from System.Drawing import *
 from System.Drawing.Imaging import BitmapData, ImageLockMode
 import System.Drawing.Imaging.PixelFormat as PF
 from System.Runtime.InteropServices import Marshal
-from OpenTK import *
-from OpenTK.Graphics import GraphicsContext, GraphicsMode
-from OpenTK.Graphics.OpenGL import *
-from OpenTK.Graphics.OpenGL import GL
 from System.Text import Encoding
 from struct import *
 import argparse
 import os.path
-from ContentWriter import ContentWriter
+from ContentWriter import ContentWriter, DefaultBlobAlignment
+from PixelConversion import LoadPixels, BgraToRgba, Premultiply
+from Mipmaps import MipmapChain, Filters
+import BlockCompression
 
 class Serializer:
     def __init__(self, id):
         self.id = Guid(id)
 
-window = NativeWindow()
-context = GraphicsContext(GraphicsMode.Default, window.WindowInfo)
-context.MakeCurrent(window.WindowInfo)
-context.LoadAll()
+def OutputName(input):
+    return os.path.splitext(os.path.split(input)[1])[0] + '.meb'
 
-parser = argparse.ArgumentParser(description='Convert an image file to MEB image format.')
-parser.add_argument('input', help='the image file to convert')
-parser.add_argument('-o', metavar='OUTPUT', help='file to output MEB image to.')
+def Dependencies(input):
+    # every file the output is built from
+    return [input]
 
-args = parser.parse_args()
+# formats an image can be written in, bc5 keeps only the red and green channels for normal maps
+ImageFormats = ['rgba', 'bc1', 'bc3', 'bc5', 'bc7']
 
-if args.o:
-    outfile = args.o
-else:
-    outfile = os.path.splitext(os.path.split(args.input)[1])[0] + '.meb'
-
-bmp = Bitmap(args.input)
-bmp_data = bmp.LockBits(Rectangle(0, 0, bmp.Width, bmp.Height), ImageLockMode.ReadOnly, PF.Format32bppArgb)
-texID = GL.GenTexture()
-GL.BindTexture(TextureTarget.Texture2D, texID)
-GL.TexImage2D(TextureTarget.Texture2D, 0, PixelInternalFormat.Rgba, bmp.Width, bmp.Height, 0, PixelFormat.Bgra, PixelType.UnsignedByte, bmp_data.Scan0);
-bmp.UnlockBits(bmp_data);
-data = Array.CreateInstance(Byte, bmp.Width * bmp.Height * 4)
-GL.GetTexImage(TextureTarget.Texture2D, 0, PixelFormat.Rgba, PixelType.UnsignedByte, data)
-
-
-f = File.Create(outfile)
-writer = ContentWriter(f)
-writer.typeList.append(Serializer('e5e29004-6f77-4be4-a9c6-c3eb363ca021'))
-writer.WriteInt(1)  # first type
-writer.WriteUInt32(1)   # RGBA format
-writer.WriteInt(bmp.Width)
-writer.WriteInt(bmp.Height)
-writer.WriteInt(1)  # single image no mipmaps
-writer.WriteUInt32(bmp.Width * bmp.Height * 4)  # data size
-writer.WriteByteArray(data)
-writer.Flush()
-f.Close()
+def WriteTexture(writer, data, width, height, mipmaps = None, linear = False, format = 'rgba', threads = 1):
+    # the body of a texture record from RGBA pixels, mipmaps is the name of the filter to build
+    # the mipmap chain with, or None for a single image
+    if mipmaps:
+        levels = MipmapChain(data, width, height, 4, mipmaps, not linear)
+    else:
+        levels = [(width, height, data)]
+    if format == 'rgba':
+        writer.WriteUInt32(1)   # RGBA format
+    else:
+        writer.WriteUInt32(BlockCompression.FormatNames[format])
+    writer.WriteInt(width)
+    writer.WriteInt(height)
+    writer.WriteInt(len(levels))
+    for levelWidth, levelHeight, levelData in levels:
+        if format != 'rgba':
+            levelData = BlockCompression.Compress(levelData, levelWidth, levelHeight, 4, BlockCompression.FormatNames[format], threads)
+        writer.WriteBlob(levelData)
 
+def Convert(input, output, premultiply = False, mipmaps = None, linear = False, format = 'rgba', threads = 1, compress = None, align = DefaultBlobAlignment):
+    width, height, data = LoadPixels(input)
+    data = BgraToRgba(data)
+    if premultiply:
+        data = Premultiply(data)
+    
+    f = File.Create(output)
+    try:
+        writer = ContentWriter(f, compress is not None, "MEB", 6 if compress is None else compress, blobAlignment = align, tableOfContents = True)
+        writer.typeList.append(Serializer('e5e29004-6f77-4be4-a9c6-c3eb363ca021'))
+        writer.BeginObject(1)  # first type
+        WriteTexture(writer, data, width, height, mipmaps, linear, format, threads)
+        writer.Flush()
+    finally:
+        f.Close()
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert an image file to MEB image format.')
+    parser.add_argument('input', help='the image file to convert')
+    parser.add_argument('-o', metavar='OUTPUT', help='file to output MEB image to.')
+    parser.add_argument('-p', '--premultiply', action='store_true', help='premultiply the colour channels by alpha.')
+    parser.add_argument('-m', '--mipmaps', metavar='FILTER', nargs='?', const='box', choices=sorted(Filters), help='generate the mipmap chain, with an optional FILTER of box, kaiser or lanczos (default box).')
+    parser.add_argument('--linear', action='store_true', help='filter mipmaps without sRGB gamma correction, for normal maps and other non colour data.')
+    parser.add_argument('-f', '--format', metavar='FORMAT', default='rgba', choices=ImageFormats, help='texture format, one of %s (default rgba).' % ", ".join(ImageFormats))
+    parser.add_argument('-j', '--threads', metavar='THREADS', type=int, default=Environment.ProcessorCount, help='number of threads to block compress with (default is the number of processors).')
+    parser.add_argument('-z', '--compress', metavar='LEVEL', nargs='?', type=int, const=6, help='compress the MEB output, with an optional compression LEVEL from 0 to 9 (default 6).')
+    parser.add_argument('-a', '--align', metavar='BYTES', type=int, default=DefaultBlobAlignment, help='align the pixel data to BYTES in an uncompressed MEB so it can be mapped, 0 to write it inline (default %d).' % DefaultBlobAlignment)
 
+    args = parser.parse_args()
 
+    Convert(args.input, args.o if args.o else OutputName(args.input), args.premultiply, args.mipmaps, args.linear, args.format, args.threads, args.compress, args.align)
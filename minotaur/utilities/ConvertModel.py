@@ -25,41 +25,44 @@ from struct import *
 import argparse
 import os
 import os.path
-from ContentWriter import ContentWriter
+from ContentWriter import ContentWriter, PackedBytes, DefaultBlobAlignment
+import MeshOptimizer
 import Assimp
 from System.Linq import Enumerable
 from System.Collections.Generic import List
+from array import array
+from itertools import chain
+from math import sqrt
     
 class CustomWriter(ContentWriter):
-    def __init__(self, outputStream, compressOutput = False, identifierString = "MEB"):
-        super(CustomWriter, self).__init__(outputStream, compressOutput, identifierString)
+    def __init__(self, outputStream, compressOutput = False, identifierString = "MEB", compressionLevel = 6, blobAlignment = 0, tableOfContents = False, stringPool = False):
+        super(CustomWriter, self).__init__(outputStream, compressOutput, identifierString, compressionLevel, blobAlignment = blobAlignment, tableOfContents = tableOfContents, stringPool = stringPool)
 
     def WriteMatrix(self, value):
-        self.outStream.Write(value.M11)
-        self.outStream.Write(value.M12)
-        self.outStream.Write(value.M13)
-        self.outStream.Write(value.M14)
-        self.outStream.Write(value.M21)
-        self.outStream.Write(value.M22)
-        self.outStream.Write(value.M23)
-        self.outStream.Write(value.M24)
-        self.outStream.Write(value.M31)
-        self.outStream.Write(value.M32)
-        self.outStream.Write(value.M33)
-        self.outStream.Write(value.M34)
-        self.outStream.Write(value.M41)
-        self.outStream.Write(value.M42)
-        self.outStream.Write(value.M43)
-        self.outStream.Write(value.M44)
+        self.WriteSingleArray(matrixElements(value))
     
     def WriteVector3(self, value):
-        self.outStream.Write(value.X)
-        self.outStream.Write(value.Y)
-        self.outStream.Write(value.Z)
+        self.WriteSingleArray((value.X, value.Y, value.Z))
     
     def WriteBoundingSphere(self, value):
         self.WriteVector3(value.Center)
         self.WriteSingle(value.Radius)
+    
+    def WriteBoundingBox(self, value):
+        self.WriteVector3(value.Min)
+        self.WriteVector3(value.Max)
+    
+    def WriteIndexBuffer(self, indices):
+        # use 16 bit indices whenever every index fits
+        if not indices or max(indices) <= 0xFFFF:
+            self.WriteUInt32(2)
+            self.WriteBlob(PackedBytes(indices, 'H', UInt16, 2))
+        else:
+            self.WriteUInt32(4)
+            self.WriteBlob(PackedBytes(indices, 'I', UInt32, 4))
+
+def matrixElements(m):
+    return (m.M11, m.M12, m.M13, m.M14, m.M21, m.M22, m.M23, m.M24, m.M31, m.M32, m.M33, m.M34, m.M41, m.M42, m.M43, m.M44)
 
 class Bone(object):
     def __init__(self, index, name):
@@ -99,21 +102,25 @@ class PositionNormalTextureBoneIDWeights(object):
         return Enumerable.ToArray(res)
 
 class VertexElement(object):
-    def __init__(self, dimension, t, usage, getData, isFloat=True):
+    def __init__(self, dimension, t, usage, getStream, isFloat=True):
         self.dimension = dimension
         self.type = t
         self.usage = usage
         self.isFloat = isFloat
-        self.getData = getData
+        self.getStream = getStream
     
-    def toBinaryArray(self, mesh, i):
-        res = List[Byte]()
-        for x in self.getData(mesh, i):
-            if self.isFloat:
-                res.AddRange(BitConverter.GetBytes(clr.Convert(x, Single)))
-            else:
-                res.AddRange(BitConverter.GetBytes(clr.Convert(x, Int32)))
-        return res
+    @property
+    def typecode(self):
+        return 'f' if self.isFloat else 'i'
+    
+    @property
+    def packedSize(self):
+        # bytes written per vertex, every component is written as a 32 bit value
+        return self.dimension * array(self.typecode).itemsize
+    
+    def pack(self, mesh):
+        # the element's components for every vertex in the mesh, as bytes in vertex order
+        return array('B', array(self.typecode, self.getStream(mesh)).tostring())
     
     @property
     def stride(self):
@@ -129,7 +136,7 @@ class VertexElement(object):
     
     @staticmethod
     def Position():
-        return VertexElement(3, 6, 0, lambda mesh, i: (mesh.Vertices[i].X, mesh.Vertices[i].Y, mesh.Vertices[i].Z))
+        return VertexElement(3, 6, 0, lambda mesh: list(chain.from_iterable((v.X, v.Y, v.Z) for v in mesh.Vertices)))
     
     # @staticmethod
     # def Color():
@@ -137,19 +144,19 @@ class VertexElement(object):
         
     @staticmethod
     def Texture():
-        return VertexElement(2, 6, 2, lambda mesh, i: (mesh.GetTextureCoords(0)[i].X, 1 - mesh.GetTextureCoords(0)[i].Y))
+        return VertexElement(2, 6, 2, lambda mesh: list(chain.from_iterable((t.X, 1 - t.Y) for t in mesh.GetTextureCoords(0))))
         
     @staticmethod
     def Normal():
-        return VertexElement(3, 6, 3, lambda mesh, i:(mesh.Normals[i].X, mesh.Normals[i].Y, mesh.Normals[i].Z))
+        return VertexElement(3, 6, 3, lambda mesh: list(chain.from_iterable((n.X, n.Y, n.Z) for n in mesh.Normals)))
         
     @staticmethod
     def BlendIndices():
-        return VertexElement(4, 4, 6, lambda mesh, i: (0,0,0,0), False)
+        return VertexElement(4, 4, 6, lambda mesh: [0] * (4 * mesh.VertexCount), False)
     
     @staticmethod
     def BlendWeight():
-        return VertexElement(4, 6, 7, lambda mesh, i: (0,0,0,0))
+        return VertexElement(4, 6, 7, lambda mesh: [0] * (4 * mesh.VertexCount))
 
 class VertexDeclaration(object):
     def __init__(self, elements = None):
@@ -161,11 +168,43 @@ class VertexDeclaration(object):
     def add(self, element):
         self.elements.append(element)
     
-    def toBinaryArray(self, mesh, i):
-        res = List[Byte]()
+    @property
+    def packedSize(self):
+        return sum(e.packedSize for e in self.elements)
+    
+    @property
+    def format(self):
+        # struct layout of one packed vertex
+        return "".join("%d%s" % (e.dimension, e.typecode) for e in self.elements)
+    
+    def unpackPositions(self, data, first, count):
+        # the x, y, z position floats of count packed vertices starting at vertex first
+        offset = 0
         for e in self.elements:
-                res.AddRange(e.toBinaryArray(mesh, i))
-        return Enumerable.ToArray(res)
+            if e.usage == 0:
+                break
+            offset += e.packedSize
+        else:
+            raise ValueError("vertex declaration has no position element")
+        stride = self.packedSize
+        start = first * stride + offset
+        packed = array('B', [0]) * (12 * count)
+        for b in xrange(12):
+            packed[b::12] = data[start + b:start + count * stride:stride]
+        return array('f', packed.tostring())
+    
+    def packVertices(self, mesh):
+        # interleave each element's column into the vertex layout, one strided copy per byte lane
+        vertexSize = self.packedSize
+        data = array('B', [0]) * (vertexSize * mesh.VertexCount)
+        offset = 0
+        for e in self.elements:
+            column = e.pack(mesh)
+            size = e.packedSize
+            for b in xrange(size):
+                data[offset + b::vertexSize] = column[b::size]
+            offset += size
+        return data
     
     def __getattr__(self, key):
         if isinstance(key, str):
@@ -208,35 +247,118 @@ class MeshPart(object):
         self.materialIndex = 0
         self.numVertices = 0
         self.primitiveCount = 0
+        self.boundingSphere = None
+        self.boundingBox = None
+
+def distanceSquared(positions, a, b):
+    a *= 3
+    b *= 3
+    dx = positions[a] - positions[b]
+    dy = positions[a + 1] - positions[b + 1]
+    dz = positions[a + 2] - positions[b + 2]
+    return dx * dx + dy * dy + dz * dz
 
 class BoundingSphere(object):
     def __init__(self):
         self.Center = Vector3(0,0,0)
         self.Radius = 0
     
-    def CreateFromPoints(self, points):
-        numPoints = len(points)
-        center = Vector3(0,0,0)
-        for p in points:
-            center += p / numPoints
-        radius = 0
-        for p in points:
-            distance = (p - center).Length
-            if distance > radius:
-                radius = distance
+    def CreateFromPositions(self, positions):
+        # Ritter's bounding sphere over a flat x, y, z float array
+        if len(positions) < 3:
+            return
+        # start from the most distant pair of the extreme points along each axis
+        extremes = []
+        for axis in xrange(3):
+            values = positions[axis::3]
+            extremes.append((values.index(min(values)), values.index(max(values))))
+        a, b = max(extremes, key=lambda pair: distanceSquared(positions, pair[0], pair[1]))
+        cx = (positions[a * 3] + positions[b * 3]) / 2.0
+        cy = (positions[a * 3 + 1] + positions[b * 3 + 1]) / 2.0
+        cz = (positions[a * 3 + 2] + positions[b * 3 + 2]) / 2.0
+        radius = sqrt(distanceSquared(positions, a, b)) / 2.0
+        radiusSquared = radius * radius
         
-        self.Center = center
+        # grow the sphere just enough to take in each point left outside it
+        for i in xrange(0, len(positions), 3):
+            dx = positions[i] - cx
+            dy = positions[i + 1] - cy
+            dz = positions[i + 2] - cz
+            d = dx * dx + dy * dy + dz * dz
+            if d > radiusSquared:
+                d = sqrt(d)
+                newRadius = (radius + d) / 2.0
+                k = (newRadius - radius) / d
+                cx += dx * k
+                cy += dy * k
+                cz += dz * k
+                radius = newRadius
+                radiusSquared = radius * radius
+        
+        self.Center = Vector3(cx, cy, cz)
         self.Radius = radius
 
+class BoundingBox(object):
+    def __init__(self):
+        self.Min = Vector3(0,0,0)
+        self.Max = Vector3(0,0,0)
+    
+    def CreateFromPositions(self, positions):
+        if len(positions) < 3:
+            return
+        xs, ys, zs = positions[0::3], positions[1::3], positions[2::3]
+        self.Min = Vector3(min(xs), min(ys), min(zs))
+        self.Max = Vector3(max(xs), max(ys), max(zs))
+
+def ComputeBounds(positions):
+    sphere = BoundingSphere()
+    sphere.CreateFromPositions(positions)
+    box = BoundingBox()
+    box.CreateFromPositions(positions)
+    return sphere, box
+
+def PartBounds(part):
+    # sphere center and radius then box min and max, as they follow a mesh part record
+    sphere, box = part.boundingSphere, part.boundingBox
+    return (sphere.Center.X, sphere.Center.Y, sphere.Center.Z, sphere.Radius, box.Min.X, box.Min.Y, box.Min.Z, box.Max.X, box.Max.Y, box.Max.Z)
+
 class Serializer:
     def __init__(self, id):
         self.id = Guid(id)
+
+class VertexBuffer(object):
+    def __init__(self, declaration, vertices):
+        self.declaration = declaration
+        self.vertices = vertices
+
+class IndexBuffer(object):
+    def __init__(self, indices):
+        self.indices = indices
+
+class VertexBufferSerializer(Serializer):
+    def __init__(self):
+        Serializer.__init__(self, '1da5cdcd-2f1e-41d5-b7ab-fde163a5336e')
+
+    def Write(self, writer, value):
+        # vertex declaration
+        declaration = value.declaration
+        writer.WriteUInt32(declaration.stride)
+        writer.WriteUInt32(declaration.elementCount)
+        for e in declaration.elements:
+            writer.WriteSByte(e.dimension)
+            writer.WriteSByte(e.type)
+            writer.WriteUInt32(e.usage)
+        writer.WriteUInt32(len(value.vertices) / declaration.stride)
+        writer.WriteBlob(PackedBytes(value.vertices, 'B', Byte, 1))
+
+class IndexBufferSerializer(Serializer):
+    def __init__(self):
+        Serializer.__init__(self, 'f6eded0f-1342-4249-b231-c166a860b224')
+
+    def Write(self, writer, value):
+        writer.WriteIndexBuffer(value.indices)
         
-vertices = List[Byte]()
-indices = []
-parts = []
-points = []
-def InitMesh(scene, vertexDeclaration):
+def InitMesh(scene, vertexDeclaration, vertices, indices, parts):
     numVertices = 0
     numIndices = 0
     
@@ -253,23 +375,84 @@ def InitMesh(scene, vertexDeclaration):
         numIndices += mesh.FaceCount * 3
         
         parts.append(part)
-        for i in xrange(mesh.VertexCount):
-            # vertex = PositionNormalTextureBoneIDWeights()
-            # vertex.position = Vector3(mesh.Vertices[i].X, mesh.Vertices[i].Y, mesh.Vertices[i].Z)
-            # vertex.texCoord = Vector2(mesh.GetTextureCoords(0)[i].X, 1 - mesh.GetTextureCoords(0)[i].Y)
-            # vertex.normal = Vector3(mesh.Normals[i].X, mesh.Normals[i].Y, mesh.Normals[i].Z)
-            vertices.AddRange(vertexDeclaration.toBinaryArray(mesh, i))
-            points.append(Vector3(mesh.Vertices[i].X, mesh.Vertices[i].Y, mesh.Vertices[i].Z))
+        if mesh.VertexCount:
+            vertices.extend(vertexDeclaration.packVertices(mesh))
+        
+        faceIndices = array('I', chain.from_iterable(face.Indices for face in mesh.Faces))
+        assert(len(faceIndices) == part.numIndices)
+        if part.baseIndex:
+            faceIndices = array('I', (i + part.baseIndex for i in faceIndices))
+        indices.extend(faceIndices)
+
+def WeldMeshParts(vertices, indices, parts, vertexDeclaration, epsilon):
+    stride = vertexDeclaration.packedSize
+    before = len(vertices) / stride
+    welded = array('B')
+    for part in parts:
+        first = part.baseVertex * stride
+        block = vertices[first:first + part.numVertices * stride]
+        remap, unique = MeshOptimizer.WeldVertices(block, stride, part.numVertices, vertexDeclaration.format, epsilon)
+        start = part.baseIndex
+        end = start + part.numIndices
+        indices[start:end] = array('I', [remap[i - part.baseIndex] + part.baseIndex for i in indices[start:end]])
+        part.baseVertex = len(welded) / stride
+        part.numVertices = len(unique) / stride
+        welded.extend(unique)
+    vertices[:] = welded
+    after = len(vertices) / stride
+    if before:
+        print "welded vertices: %d -> %d (%.1f%% smaller)" % (before, after, 100.0 * (before - after) / before)
+
+def OptimizeMeshParts(vertices, indices, parts, vertexDeclaration, cacheSize, overdrawThreshold):
+    stride = vertexDeclaration.packedSize
+    for n, part in enumerate(parts):
+        start = part.baseIndex
+        end = start + part.numIndices
+        local = [i - part.baseIndex for i in indices[start:end]]
+        before = MeshOptimizer.ACMR(local, cacheSize)
+        local = MeshOptimizer.OptimizeVertexCache(local, part.numVertices, cacheSize)
+        if overdrawThreshold is not None:
+            positions = vertexDeclaration.unpackPositions(vertices, part.baseVertex, part.numVertices)
+            local = MeshOptimizer.OptimizeOverdraw(local, positions, cacheSize, overdrawThreshold)
+        after = MeshOptimizer.ACMR(local, cacheSize)
         
-        for face in mesh.Faces:
-            assert(face.IndexCount == 3)
-            for i in face.Indices:
-                indices.append(i + part.baseIndex)
+        remap = MeshOptimizer.OptimizeVertexFetch(local, part.numVertices)
+        first = part.baseVertex * stride
+        last = first + part.numVertices * stride
+        vertices[first:last] = MeshOptimizer.RemapVertices(vertices[first:last], stride, remap)
+        indices[start:end] = array('I', [remap[i] + part.baseIndex for i in local])
+        print "mesh part %d: ACMR %.3f -> %.3f" % (n, before, after)
+
+def ShareRepeatedParts(vertices, indices, parts, vertexDeclaration):
+    # kit-bashed models repeat the same submesh. a part whose vertices and triangles match an
+    # earlier part's draws from that part's ranges instead of storing its own copy
+    stride = vertexDeclaration.packedSize
+    sharedVertices = array('B')
+    sharedIndices = array('I')
+    ranges = {}
+    repeats = 0
+    for part in parts:
+        first = part.baseVertex * stride
+        block = vertices[first:first + part.numVertices * stride]
+        local = array('I', [i - part.baseIndex for i in indices[part.baseIndex:part.baseIndex + part.numIndices]])
+        key = (block.tostring(), local.tostring())
+        if key in ranges:
+            part.baseVertex, part.baseIndex = ranges[key]
+            repeats += 1
+            continue
+        part.baseVertex = len(sharedVertices) / stride
+        part.baseIndex = len(sharedIndices)
+        ranges[key] = (part.baseVertex, part.baseIndex)
+        sharedVertices.extend(block)
+        sharedIndices.extend(array('I', [i + part.baseIndex for i in local]))
+    vertices[:] = sharedVertices
+    indices[:] = sharedIndices
+    if repeats:
+        print "repeated mesh parts: %d of %d drawn from an earlier part's vertices and indices" % (repeats, len(parts))
 
 def toMatrix4(m):
     return Matrix4(m.A1, m.A2, m.A3, m.A4, m.B1, m.B2, m.B3, m.B4, m.C1, m.C2, m.C3, m.C4, m.D1, m.D2, m.D3, m.D4)
                 
-bones = []
 def CreateSkeleton(bones, node, index = 0):
     bone = Bone(index, node.Name)
     bone.transform = toMatrix4(node.Transform)
@@ -297,140 +480,111 @@ def processBonesRecursive(bone, inverseTransform):
     
 os.environ["Path"] = os.environ["Path"] + ";..\\External Resources\\;C:\\Windows\\Microsoft.NET\\Framework\\v4.0.30319"
         
-parser = argparse.ArgumentParser(description='Convert a model file to MEB model format.')
-parser.add_argument('input', help='the image file to convert')
-parser.add_argument('-n', '--nonormals', action='store_false', default=True, dest='normals', help='do not include normal information in exported model.')
-parser.add_argument('-t', '--notexture', action='store_false', default=True, dest='texture', help='do not include texture mapping information in exported model.')
-parser.add_argument('-s', '--skin', action='store_true', default=False, dest='skin', help='include bone skinning information in exported model.')
-parser.add_argument('-o', metavar='OUTPUT', help='file to output MEB image to.')
-
-args = parser.parse_args()
-
-if args.o:
-    outfile = args.o
-else:
-    outfile = os.path.splitext(os.path.split(args.input)[1])[0] + '.meb'
-
-vertexDeclaration = VertexDeclaration()
-vertexDeclaration.add(VertexElement.Position())
-if args.normals:
-    vertexDeclaration.add(VertexElement.Normal())
-if args.texture:
-    vertexDeclaration.add(VertexElement.Texture())
-if args.skin:
-    vertexDeclaration.add(VertexElement.BlendIndices())
-    vertexDeclaration.add(VertexElement.BlendWeight())
+def OutputName(input):
+    return os.path.splitext(os.path.split(input)[1])[0] + '.meb'
+
+def Dependencies(input):
+    # every file the output is built from
+    return [input]
+
+def Convert(input, output, normals = True, texture = True, skin = False, weld = None, optimize = False, cacheSize = 32, overdraw = None, compress = None, align = DefaultBlobAlignment):
+    vertexDeclaration = VertexDeclaration()
+    vertexDeclaration.add(VertexElement.Position())
+    if normals:
+        vertexDeclaration.add(VertexElement.Normal())
+    if texture:
+        vertexDeclaration.add(VertexElement.Texture())
+    if skin:
+        vertexDeclaration.add(VertexElement.BlendIndices())
+        vertexDeclaration.add(VertexElement.BlendWeight())
     
-importer = Assimp.AssimpImporter()
-scene = importer.ImportFile(args.input, Assimp.PostProcessPreset.TargetRealTimeMaximumQuality)
-
-InitMesh(scene, vertexDeclaration)
-CreateSkeleton(bones, scene.RootNode)
-processBones(bones)
-
-if args.skin:
-    # TODO: skinning weighting and indexes
-    pass
-
-boundingSphere = BoundingSphere()
-boundingSphere.CreateFromPoints(points)
-
-f = File.Create(outfile)
-writer = CustomWriter(f)
-writer.typeList.append(Serializer('09b12e6d-acf3-4cf5-a150-923056d88d9b'))  # model
-writer.typeList.append(Serializer('1da5cdcd-2f1e-41d5-b7ab-fde163a5336e'))  # vertex buffer
-writer.typeList.append(Serializer('f6eded0f-1342-4249-b231-c166a860b224'))  # index buffer
-writer.typeList.append(Serializer('6f1be25e-7f37-4faa-b551-7a58c8d91824'))  # effect material
-writer.WriteInt(1)  # first type
-# skeleton information
-writer.WriteUInt32(len(bones))
-for bone in bones:
-    writer.WriteString(bone.name)
-    writer.WriteMatrix(bone.transform)
-    writer.WriteMatrix(bone.absoluteInverseTransform)
-for bone in bones:
-    writer.WriteUInt32(bone.parent.index + 1 if bone.parent else 0)
-    writer.WriteUInt32(len(bone.children))
-    for child in bone.children:
-        writer.WriteUInt32(child.index + 1)
-
-# mesh information
-writer.WriteUInt32(1)   # this script only converts single models currently
-writer.WriteString(os.path.splitext(os.path.split(args.input)[1])[0])
-writer.WriteUInt32(bones[0].index + 1 if bones else 0)  # parent bone is the root node
-writer.WriteBoundingSphere(boundingSphere)
-writer.WriteInt(0)    # no tag object
-writer.WriteUInt32(len(parts))
-for part in parts:
-    writer.WriteUInt32(part.baseVertex)
-    writer.WriteUInt32(part.numVertices)
-    writer.WriteUInt32(part.numIndices)
-    writer.WriteUInt32(part.baseIndex)
-    writer.WriteUInt32(part.primitiveCount)
-    writer.WriteInt(0)  # no tag object
-    writer.WriteInt(1)  # shared resource 0
-    writer.WriteInt(2)  # shared resource 1
-    writer.WriteInt(0)
-
-writer.WriteUInt32(bones[0].index + 1 if bones else 0)
-writer.WriteInt(0)  # no tag object
-
-# animation reference
-# TODO: handle animation 
-writer.WriteUInt32(0)
-
-# shared resources
-writer.sharedResources.append(1)
-writer.sharedResources.append(2)
-
-writer.WriteInt(2)
-# # vertex declaration
-# writer.WriteUInt32(64)
-# writer.WriteUInt32(5)
-# # position
-# writer.WriteSByte(3)
-# writer.WriteSByte(6)
-# writer.WriteUInt32(0)
-# # normal
-# writer.WriteSByte(3)
-# writer.WriteSByte(6)
-# writer.WriteUInt32(3)
-# # texture coordinates
-# writer.WriteSByte(2)
-# writer.WriteSByte(6)
-# writer.WriteUInt32(2)
-# # bone indices
-# writer.WriteSByte(4)
-# writer.WriteSByte(4)
-# writer.WriteUInt32(6)
-# # bone weights
-# writer.WriteSByte(4)
-# writer.WriteSByte(6)
-# writer.WriteUInt32(7)
-
-# vertex declaration
-writer.WriteUInt32(vertexDeclaration.stride)
-writer.WriteUInt32(vertexDeclaration.elementCount)
-for e in vertexDeclaration.elements:
-    writer.WriteSByte(e.dimension)
-    writer.WriteSByte(e.type)
-    writer.WriteUInt32(e.usage)
-
-writer.WriteUInt32(vertices.Count / vertexDeclaration.stride)
-# data = List[Byte]()
-# for v in vertices:
-    # data.AddRange(vertexDeclaration.toBinaryArray(v))
-# assert(data.Count == len(vertices) * vertexDeclaration.stride)
-writer.WriteByteArray(Enumerable.ToArray(vertices))
-
-# index buffer
-writer.WriteInt(3)
-data = List[Byte]()
-for i in indices:
-    data.AddRange(BitConverter.GetBytes(i))
-writer.WriteUInt32(data.Count)
-writer.WriteByteArray(Enumerable.ToArray(data))
-
-writer.Flush()
-f.Close()
-  
\ No newline at end of file
+    vertices = array('B')
+    indices = array('I')
+    parts = []
+    bones = []
+    importer = Assimp.AssimpImporter()
+    scene = importer.ImportFile(input, Assimp.PostProcessPreset.TargetRealTimeMaximumQuality)
+
+    InitMesh(scene, vertexDeclaration, vertices, indices, parts)
+    if weld is not None:
+        WeldMeshParts(vertices, indices, parts, vertexDeclaration, weld)
+    if optimize:
+        OptimizeMeshParts(vertices, indices, parts, vertexDeclaration, cacheSize, overdraw)
+    ShareRepeatedParts(vertices, indices, parts, vertexDeclaration)
+    CreateSkeleton(bones, scene.RootNode)
+    processBones(bones)
+
+    if skin:
+        # TODO: skinning weighting and indexes
+        pass
+
+    # model and per part bounds, read straight from the packed positions
+    boundingSphere, boundingBox = ComputeBounds(vertexDeclaration.unpackPositions(vertices, 0, len(vertices) / vertexDeclaration.packedSize))
+    for part in parts:
+        part.boundingSphere, part.boundingBox = ComputeBounds(vertexDeclaration.unpackPositions(vertices, part.baseVertex, part.numVertices))
+
+    f = File.Create(output)
+    try:
+        writer = CustomWriter(f, compress is not None, "MEB", 6 if compress is None else compress, align, True, True)
+        writer.typeList.append(Serializer('09b12e6d-acf3-4cf5-a150-923056d88d9b'))  # model
+        writer.typeList.append(VertexBufferSerializer())
+        writer.typeList.append(IndexBufferSerializer())
+        writer.typeList.append(Serializer('6f1be25e-7f37-4faa-b551-7a58c8d91824'))  # effect material
+        writer.typeSerializerMap[VertexBuffer] = writer.typeList[1]
+        writer.typeSerializerMap[IndexBuffer] = writer.typeList[2]
+        writer.BeginObject(1)  # first type
+        # skeleton information
+        writer.WriteUInt32(len(bones))
+        for bone in bones:
+            writer.WriteString(bone.name)
+            writer.WriteMatrix(bone.transform)
+            writer.WriteMatrix(bone.absoluteInverseTransform)
+        for bone in bones:
+            writer.WriteUInt32(bone.parent.index + 1 if bone.parent else 0)
+            writer.WriteUInt32(len(bone.children))
+            for child in bone.children:
+                writer.WriteUInt32(child.index + 1)
+
+        # mesh information
+        writer.WriteUInt32(1)   # this script only converts single models currently
+        writer.WriteString(os.path.splitext(os.path.split(input)[1])[0])
+        writer.WriteUInt32(bones[0].index + 1 if bones else 0)  # parent bone is the root node
+        writer.WriteBoundingSphere(boundingSphere)
+        writer.WriteBoundingBox(boundingBox)
+        writer.WriteInt(0)    # no tag object
+        writer.WriteUInt32(len(parts))
+        # the parts share the model's buffers, written once after the model as shared resources
+        vertexBuffer = writer.AddSharedResource(VertexBuffer(vertexDeclaration, vertices))
+        indexBuffer = writer.AddSharedResource(IndexBuffer(indices))
+        # baseVertex, numVertices, numIndices, baseIndex, primitiveCount, no tag object, vertex buffer, index buffer, 0,
+        # then the part's bounding sphere and box so the runtime can cull it on its own
+        writer.WriteStructArray('5I4i10f', [(part.baseVertex, part.numVertices, part.numIndices, part.baseIndex, part.primitiveCount, 0, vertexBuffer, indexBuffer, 0) + PartBounds(part) for part in parts])
+
+        writer.WriteUInt32(bones[0].index + 1 if bones else 0)
+        writer.WriteInt(0)  # no tag object
+
+        # animation reference
+        # TODO: handle animation 
+        writer.WriteUInt32(0)
+
+        writer.Flush()
+    finally:
+        f.Close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert a model file to MEB model format.')
+    parser.add_argument('input', help='the image file to convert')
+    parser.add_argument('-n', '--nonormals', action='store_false', default=True, dest='normals', help='do not include normal information in exported model.')
+    parser.add_argument('-t', '--notexture', action='store_false', default=True, dest='texture', help='do not include texture mapping information in exported model.')
+    parser.add_argument('-s', '--skin', action='store_true', default=False, dest='skin', help='include bone skinning information in exported model.')
+    parser.add_argument('-w', '--weld', metavar='EPSILON', nargs='?', type=float, const=0.0, help='merge duplicate vertices, optionally treating float attributes within EPSILON of each other as equal.')
+    parser.add_argument('-O', '--optimize', action='store_true', default=False, help='reorder triangles and vertices of each mesh part for the post-transform vertex cache.')
+    parser.add_argument('--cachesize', metavar='SIZE', type=int, default=32, help='vertex cache size used by --optimize (default 32).')
+    parser.add_argument('--overdraw', metavar='THRESHOLD', nargs='?', type=float, const=0.75, help='with --optimize, also cluster triangles to reduce overdraw, splitting clusters once their ACMR is below THRESHOLD (default 0.75).')
+    parser.add_argument('-o', metavar='OUTPUT', help='file to output MEB image to.')
+    parser.add_argument('-z', '--compress', metavar='LEVEL', nargs='?', type=int, const=6, help='compress the MEB output, with an optional compression LEVEL from 0 to 9 (default 6).')
+    parser.add_argument('-a', '--align', metavar='BYTES', type=int, default=DefaultBlobAlignment, help='align the vertex and index data to BYTES in an uncompressed MEB so it can be mapped, 0 to write it inline (default %d).' % DefaultBlobAlignment)
+
+    args = parser.parse_args()
+
+    Convert(args.input, args.o if args.o else OutputName(args.input), args.normals, args.texture, args.skin, args.weld, args.optimize, args.cachesize, args.overdraw, args.compress, args.align)
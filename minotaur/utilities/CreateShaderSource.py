@@ -5,17 +5,32 @@ clr.AddReferenceToFileAndPath("..\\External Resources\\OpenTK.dll")
 from System import *
 from System.IO import *
 import argparse
+import hashlib
+import struct
 import sys
 from OpenTK import *
 from OpenTK.Graphics import GraphicsContext, GraphicsMode
 from OpenTK.Graphics.OpenGL import *
 from OpenTK.Graphics.OpenGL import GL
+from System.Diagnostics import Process, ProcessStartInfo
+import os
 import os.path
-from ContentWriter import ContentWriter
+import shutil
+import tempfile
+from ContentWriter import ContentWriter, PackedBytes
+from ContentReader import ContentReader
+from ShaderPreprocessor import Preprocessor, PreprocessorError, Includes
 import re
 
 glslRegex = re.compile("ERROR: (\d+):(\d+): (.*)")
 
+ShaderTypes = {0: ShaderType.VertexShader, 1: ShaderType.FragmentShader, 2: ShaderType.GeometryShader}
+ValidatorStages = {0: 'vert', 1: 'frag', 2: 'geom'}
+ValidationModes = ['auto', 'offline', 'gl', 'none']
+
+# a driver id for testing the binary cache without a driver
+StubDriverId = 'stub'
+
 class Serializer:
     def __init__(self, id):
         self.id = Guid(id)
@@ -34,104 +49,316 @@ def ParseGLSLError(error):
     
     return None
         
-parser = argparse.ArgumentParser(description='Convert an font file to MEB font format.')
-parser.add_argument('-v', '--vertex', metavar='VERTEX', type=argparse.FileType('r'), help='The vertex shader source file for the shader')
-parser.add_argument('-f', '--fragment', metavar='FRAGMENT', type=argparse.FileType('r'), help='The frament shader source file for the shader')
-parser.add_argument('-g', '--geometry', metavar='GEOMETRY', type=argparse.FileType('r'), help='The geometry shader source file for the shader')
-parser.add_argument('-o', '--output', metavar='OUTPUT', required=True, help='The file to output the shader to.')
-
-args = parser.parse_args()
-
-window = NativeWindow()
-context = GraphicsContext(GraphicsMode.Default, window.WindowInfo)
-context.MakeCurrent(window.WindowInfo)
-context.LoadAll()
-
-vertexSource = ""
-fragmentSource = ""
-geometrySource = ""
-
-fileMap = []
-
-fileNumber = 0
-
-if args.vertex:
-    vertexSource = "#line 0 %d\n%s" % (fileNumber, args.vertex.read())
-    fileMap.append([fileNumber, os.path.abspath(args.vertex.name)])
-    fileNumber += 1
-if args.fragment:
-    fragmentSource = "#line 0 %d\n%s" % (fileNumber, args.fragment.read())
-    fileMap.append([fileNumber, os.path.abspath(args.fragment.name)])
-    fileNumber += 1
-if args.geometry:
-    geometrySource = "#line 0 %d\n%s" % (fileNumber, args.geometry.read())
-    fileMap.append([fileNumber, os.path.abspath(args.geometry.name)])
-    fileNumber += 1
-
-# compile and check shaders for errors
-sources = [x for x in [[vertexSource, 0], [fragmentSource, 1], [geometrySource, 2]] if x[0] != ""]
-programID = GL.CreateProgram()
-fileNumber = 0
-errors = []
-shaderIDs = []
-for source, typenum in sources:
-    if typenum == 0:
-        type = ShaderType.VertexShader
-    elif typenum == 1:
-        type = ShaderType.FragmentShader
-    elif typenum == 2:
-        type = ShaderType.GeometryShader
-    else:
-        raise VakueError("Unknown shader type: %d", typenum)
-        
-    id = GL.CreateShader(type)
-    GL.ShaderSource(id, source)
-    GL.CompileShader(id)
-    status = GL.GetShader(id, ShaderParameter.CompileStatus)
+def CreateContext():
+    # an OpenGL context current on the calling thread, keep the window alive while it is used
+    window = NativeWindow()
+    context = GraphicsContext(GraphicsMode.Default, window.WindowInfo)
+    context.MakeCurrent(window.WindowInfo)
+    context.LoadAll()
+    return window, context
+
+def HasContext():
+    # whether an OpenGL context is already current on the calling thread
+    return GraphicsContext.CurrentContext is not None
+
+def FindValidator():
+    # the Khronos reference compiler, from GLSLANG_VALIDATOR or the PATH
+    path = os.environ.get('GLSLANG_VALIDATOR')
+    if path:
+        return path if os.path.isfile(path) else None
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        for name in ['glslangValidator.exe', 'glslangValidator']:
+            candidate = os.path.join(directory, name)
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+def ValidationMode(validate = 'auto'):
+    # auto validates offline when the reference compiler is installed and with OpenGL otherwise
+    if validate == 'auto':
+        return 'offline' if FindValidator() else 'gl'
+    if validate not in ValidationModes:
+        raise ValueError("unknown shader validation: %s" % validate)
+    return validate
+
+def NeedsContext(validate = 'auto'):
+    return ValidationMode(validate) == 'gl'
+
+def FormatGLSLError(line, fileMap):
+    parsed = ParseGLSLError(line)
+    if parsed is None or int(parsed[0]) >= len(fileMap):
+        return line
+    filenum, linenum, msg = parsed
+    return "%s line %s: %s" % (fileMap[int(filenum)][1], linenum, msg)
+
+def ValidateWithContext(sources, fileMap):
+    # compile and link with the OpenGL context current on this thread
+    programID = GL.CreateProgram()
+    errors = []
+    shaderIDs = []
+    for source, typenum in sources:
+        id = GL.CreateShader(ShaderTypes[typenum])
+        GL.ShaderSource(id, source)
+        GL.CompileShader(id)
+        status = GL.GetShader(id, ShaderParameter.CompileStatus)
+        if status == 0:
+            log = GL.GetShaderInfoLog(id)
+            for line in log.strip().split("\n"):
+                errors.append(FormatGLSLError(line, fileMap))
+        GL.AttachShader(programID, id)
+        shaderIDs.append(id)
+
+    if errors:
+        GL.DeleteProgram(programID)
+        for shaderID in shaderIDs:
+            GL.DeleteShader(shaderID)
+        raise GLSLError("GLSL shader compile errors:\n" + "\n".join(errors))
+
+    # link and check program for errors
+    GL.LinkProgram(programID)
+    status = GL.GetProgram(programID, ProgramParameter.LinkStatus)
     if status == 0:
-        log = GL.GetShaderInfoLog(id)
-        for line in log.strip().split("\n"):
-            filenum, linenum, msg = ParseGLSLError(line)
-            errors.append("%s line %s: %s" % (fileMap[int(filenum)][1], linenum, msg))
-        # GL.DeleteShader(id)
-    GL.AttachShader(programID, id)
-    shaderIDs.append(id)
-        
-if errors:
-    print "GLSL shader compile errors:"
-    print "\n".join(errors)
-    sys.exit(1)
-
-# link and check program for errors
-GL.LinkProgram(programID)
-status = GL.GetProgram(programID, ProgramParameter.LinkStatus)
-if status == 0:
-    log = GL.GetProgramInfoLog(programID)
-    for line in [x for x in log.strip().split("\n") if x.strip()]:
-        msg = line.split(" ", 1)[1]
-        errors.append(msg)
-
-GL.DeleteProgram(programID)
-for s in shaderIDs:
-    GL.DeleteShader(id)
-
-if errors:
-    print "GLSL program linking errors:"
-    print "\n".join(errors)
-    sys.exit(1)
-    
-f = File.Create(args.output)
-writer = ContentWriter(f)
-writer.typeList.append(Serializer('205801eb-a58e-4627-a2df-7c9dafdd33d6'))
-writer.WriteInt(1)
-writer.WriteInt(len(fileMap))
-for num, name in fileMap:
-    writer.WriteInt(num)
-    writer.WriteString(name)
-
-writer.WriteInt(len(sources))
-for source, type in sources:
-    writer.WriteInt(type)
-    writer.WriteString(source)
-
-writer.Flush()
+        log = GL.GetProgramInfoLog(programID)
+        for line in [x for x in log.strip().split("\n") if x.strip()]:
+            msg = line.split(" ", 1)[1]
+            errors.append(msg)
+
+    GL.DeleteProgram(programID)
+    for shaderID in shaderIDs:
+        GL.DeleteShader(shaderID)
+
+    if errors:
+        raise GLSLError("GLSL program linking errors:\n" + "\n".join(errors))
+
+def ValidateOffline(sources, fileMap, validator):
+    # compile and link the stages with the reference compiler, no context or window needed
+    directory = tempfile.mkdtemp()
+    try:
+        paths = []
+        for source, typenum in sources:
+            path = os.path.join(directory, "shader." + ValidatorStages[typenum])
+            f = open(path, 'w')
+            try:
+                f.write(source)
+            finally:
+                f.close()
+            paths.append(path)
+        info = ProcessStartInfo(validator, "-l " + " ".join('"%s"' % x for x in paths))
+        info.UseShellExecute = False
+        info.CreateNoWindow = True
+        info.RedirectStandardOutput = True
+        info.RedirectStandardError = True
+        process = Process.Start(info)
+        log = process.StandardOutput.ReadToEnd() + process.StandardError.ReadToEnd()
+        process.WaitForExit()
+        if process.ExitCode != 0:
+            errors = [FormatGLSLError(x.strip(), fileMap) for x in log.split("\n") if x.startswith("ERROR:")]
+            raise GLSLError("GLSL shader errors:\n" + "\n".join(errors if errors else [log.strip()]))
+    finally:
+        shutil.rmtree(directory, True)
+
+def SourceHash(sources):
+    # identifies the linked program, a binary is only used for the sources it was built from
+    digest = hashlib.sha1()
+    for source, typenum in sources:
+        digest.update(struct.pack('<i', typenum))
+        digest.update(source.encode('utf-8'))
+    return digest.hexdigest()
+
+def BinaryCacheName(sourceHash, driverId):
+    # the file ProgramBinaryCache.FileName names, a program binary is saved for its sources and driver
+    return "%s-%s.bin" % (sourceHash, hashlib.sha1(driverId.encode('utf-8')).hexdigest()[:16])
+
+def ReadBinaryCache(directory, sourceHash, driverId = None):
+    # [driver id, binary format, binary] of the program binaries saved for these sources,
+    # for every driver or only the given one
+    entries = []
+    if not directory or not os.path.isdir(directory):
+        return entries
+    for name in sorted(os.listdir(directory)):
+        if not name.startswith(sourceHash + '-') or not name.endswith('.bin'):
+            continue
+        f = File.OpenRead(os.path.join(directory, name))
+        try:
+            reader = BinaryReader(f)
+            entryDriverId = reader.ReadString()
+            format = reader.ReadInt32()
+            data = reader.ReadBytes(reader.ReadInt32())
+        finally:
+            f.Close()
+        if driverId is None or entryDriverId == driverId:
+            entries.append([entryDriverId, format, data])
+    return entries
+
+def WriteBinaryCache(directory, sourceHash, driverId, format, data):
+    # save a program binary the way ProgramBinaryCache.Store does, for testing with the stub driver id
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    f = File.Create(os.path.join(directory, BinaryCacheName(sourceHash, driverId)))
+    try:
+        writer = BinaryWriter(f)
+        writer.Write(driverId)
+        writer.Write(Int32(format))
+        data = PackedBytes(data, 'B', Byte, 1)
+        writer.Write(Int32(data.Length))
+        writer.Write(data)
+        writer.Flush()
+    finally:
+        f.Close()
+
+def PreprocessSources(vertex = None, fragment = None, geometry = None, defines = None, includePaths = None, strip = True):
+    # [source, type] of each stage and [number, name] of each file the sources came from
+    preprocessor = Preprocessor(defines, includePaths, strip)
+    sources = []
+    for path, typenum in [[vertex, 0], [fragment, 1], [geometry, 2]]:
+        if path:
+            try:
+                sources.append([preprocessor.Process(path), typenum])
+            except PreprocessorError, e:
+                raise GLSLError(str(e))
+    fileMap = [[num, name] for num, name in enumerate(preprocessor.files)]
+    return sources, fileMap
+
+def Convert(output, vertex = None, fragment = None, geometry = None, compress = None, defines = None, includePaths = None, strip = True, validate = 'auto', binaryCache = None, driverId = None):
+    # vertex, fragment and geometry are the paths of the shader stage sources. the stages are
+    # preprocessed here, with includes expanded, comments removed and #if blocks on the defines
+    # folded, and checked with the reference compiler, an OpenGL context or not at all.
+    # program binaries the runtime saved to the binaryCache directory for these sources are
+    # embedded, for every driver or only driverId, so they load without compiling.
+    sources, fileMap = PreprocessSources(vertex, fragment, geometry, defines, includePaths, strip)
+
+    mode = ValidationMode(validate)
+    if mode == 'offline':
+        ValidateOffline(sources, fileMap, FindValidator())
+    elif mode == 'gl':
+        ValidateWithContext(sources, fileMap)
+
+    f = File.Create(output)
+    try:
+        writer = ContentWriter(f, compress is not None, "MEB", 6 if compress is None else compress, stringPool = True)
+        writer.typeList.append(Serializer('205801eb-a58e-4627-a2df-7c9dafdd33d6'))
+        writer.BeginObject(1)
+        writer.WriteInt(len(fileMap))
+        for num, name in fileMap:
+            writer.WriteInt(num)
+            writer.WriteString(name)
+
+        writer.WriteInt(len(sources))
+        for source, type in sources:
+            writer.WriteInt(type)
+            writer.WriteString(source)
+
+        # program binary cache section, the runtime compiles the sources when none match its driver
+        sourceHash = SourceHash(sources)
+        writer.WriteString(sourceHash)
+        entries = ReadBinaryCache(binaryCache, sourceHash, driverId)
+        writer.WriteInt(len(entries))
+        for entryDriverId, format, data in entries:
+            writer.WriteString(entryDriverId)
+            writer.WriteInt(format)
+            writer.WriteInt(len(data))
+            writer.WriteByteArray(data)
+
+        writer.Flush()
+    finally:
+        f.Close()
+
+def ReadEmbeddedBinaries(path):
+    # [driver id, binary format, binary] of each program binary embedded in a converted shader
+    reader = ContentReader(path)
+    try:
+        reader.Seek(reader.contentOffset)
+        reader.ReadInt()  # shader type index
+        for n in xrange(reader.ReadInt()):
+            reader.ReadInt()
+            reader.ReadString()
+        for n in xrange(reader.ReadInt()):
+            reader.ReadInt()
+            reader.ReadString()
+        reader.ReadString()  # source hash
+        entries = []
+        for n in xrange(reader.ReadInt()):
+            entryDriverId = reader.ReadString()
+            format = reader.ReadInt()
+            entries.append([entryDriverId, format, str(reader.ReadBytes(reader.ReadInt()))])
+        return entries
+    finally:
+        reader.Close()
+
+def CheckBinaryCache():
+    # convert a shader against a cache holding a stub driver binary and one for another driver,
+    # which tests the embedding without a driver that can save binaries. returns what went wrong,
+    # or None
+    directory = tempfile.mkdtemp()
+    try:
+        vertex = os.path.join(directory, 'check.vert')
+        f = open(vertex, 'w')
+        try:
+            f.write('#version 150\nvoid main()\n{\n  gl_Position = vec4(0.0);\n}\n')
+        finally:
+            f.close()
+        cache = os.path.join(directory, 'cache')
+        sources, fileMap = PreprocessSources(vertex)
+        sourceHash = SourceHash(sources)
+        data = str(bytearray(xrange(32)))
+        WriteBinaryCache(cache, sourceHash, StubDriverId, 1, data)
+        WriteBinaryCache(cache, sourceHash, 'other', 2, '\xff' * 8)
+        output = os.path.join(directory, 'check.meb')
+        Convert(output, vertex, validate = 'none', binaryCache = cache, driverId = StubDriverId)
+        entries = ReadEmbeddedBinaries(output)
+        if entries != [[StubDriverId, 1, data]]:
+            return "expected only the %s binary to be embedded, found %s" % (StubDriverId, [[x[0], x[1], len(x[2])] for x in entries])
+        return None
+    finally:
+        shutil.rmtree(directory, True)
+
+def Dependencies(vertex = None, fragment = None, geometry = None, includePaths = None, binaryCache = None):
+    # every file the output is built from, including everything the stages #include and the
+    # program binaries that could be embedded
+    files = []
+    for path in [vertex, fragment, geometry]:
+        if path:
+            files.extend(x for x in Includes(path, includePaths) if x not in files)
+    if binaryCache and os.path.isdir(binaryCache):
+        files.extend(os.path.join(binaryCache, x) for x in sorted(os.listdir(binaryCache)) if x.endswith('.bin'))
+    return files
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert an font file to MEB font format.')
+    parser.add_argument('-v', '--vertex', metavar='VERTEX', help='The vertex shader source file for the shader')
+    parser.add_argument('-f', '--fragment', metavar='FRAGMENT', help='The frament shader source file for the shader')
+    parser.add_argument('-g', '--geometry', metavar='GEOMETRY', help='The geometry shader source file for the shader')
+    parser.add_argument('-o', '--output', metavar='OUTPUT', help='The file to output the shader to.')
+    parser.add_argument('-z', '--compress', metavar='LEVEL', nargs='?', type=int, const=6, help='Compress the MEB output, with an optional compression LEVEL from 0 to 9 (default 6).')
+    parser.add_argument('-D', '--define', metavar='NAME[=VALUE]', action='append', default=[], help='Define a macro for the shader, #if blocks on it are folded.')
+    parser.add_argument('-I', '--include', metavar='DIRECTORY', action='append', default=[], help='A directory to search for #include files.')
+    parser.add_argument('--no-strip', action='store_true', help='Keep the whitespace and blank lines of the sources.')
+    parser.add_argument('--validate', default='auto', choices=ValidationModes, help='Check the shader with the offline reference compiler (glslangValidator), an OpenGL context, or not at all (default offline when glslangValidator is found).')
+    parser.add_argument('--binary-cache', metavar='DIRECTORY', help='A program binary cache directory saved by the runtime, binaries for this shader are embedded in the output.')
+    parser.add_argument('--driver-id', metavar='ID', help='Only embed binaries built by this driver, %s for testing.' % StubDriverId)
+    parser.add_argument('--check-binary-cache', action='store_true', help='Check that binaries in a cache are embedded, using the %s driver id, then exit.' % StubDriverId)
+
+    args = parser.parse_args()
+    if args.check_binary_cache:
+        error = CheckBinaryCache()
+        if error:
+            print "binary cache check failed: %s" % error
+            sys.exit(1)
+        print "binary cache check passed"
+        sys.exit(0)
+    if not args.output:
+        parser.error('an OUTPUT file is required')
+
+    defines = dict((x.split('=', 1) + ['1'])[:2] for x in args.define)
+    window = None
+    if NeedsContext(args.validate):
+        window, context = CreateContext()
+    try:
+        Convert(args.output, args.vertex, args.fragment, args.geometry, args.compress, defines, args.include, not args.no_strip, args.validate, args.binary_cache, args.driver_id)
+    except GLSLError, e:
+        print e
+        sys.exit(1)
+    finally:
+        if window is not None:
+            context.Dispose()
+            window.Dispose()
@@ -0,0 +1,217 @@
+import clr
+
+from System import *
+from System.IO import *
+import argparse
+import binascii
+import hashlib
+import sys
+from threading import Thread, Lock
+from Queue import Queue, Empty
+from ContentWriter import ContentWriter
+from ShaderPreprocessor import Preprocessor, PreprocessorError
+import CreateShaderSource
+from CreateShaderSource import GLSLError, ValidationMode, ValidationModes, FindValidator, ValidateOffline, ValidateWithContext, CreateContext, HasContext
+
+# a chunk ends after a line whose crc has these bits clear, on average every 8 lines
+ChunkMask = 7
+
+class Serializer:
+    def __init__(self, id):
+        self.id = Guid(id)
+
+class Variant(object):
+    def __init__(self, key, defines):
+        self.key = key
+        self.defines = defines
+        # [source, stage type] for each stage
+        self.sources = []
+
+    @property
+    def name(self):
+        return " ".join("%s=%s" % (k, v) for k, v in sorted(self.defines.items()) if v is not None) or "no defines"
+
+def ParseOption(option):
+    # NAME is a switch that is undefined or 1, NAME=A,B,C is a macro with one of the values.
+    # returns the name and the values, None being undefined
+    if '=' in option:
+        name, values = option.split('=', 1)
+        return name, values.split(',')
+    return option, [None, '1']
+
+def Variants(options, defines = None):
+    # every combination of the option values. the key of a variant is the sum of each option's
+    # value index times the product of the value counts of the options before it
+    options = [ParseOption(x) for x in options]
+    count = 1
+    for name, values in options:
+        count *= len(values)
+    variants = []
+    for key in xrange(count):
+        variantDefines = dict(defines) if defines else {}
+        remainder = key
+        for name, values in options:
+            variantDefines[name] = values[remainder % len(values)]
+            remainder //= len(values)
+        variants.append(Variant(key, variantDefines))
+    return options, variants
+
+def SplitChunks(source):
+    # content defined chunks of whole lines, so a line that differs between variants only changes
+    # the chunk it is in and the chunks around it still match
+    chunks = []
+    current = []
+    for line in source.splitlines(True):
+        current.append(line)
+        if binascii.crc32(line) & ChunkMask == 0:
+            chunks.append("".join(current))
+            current = []
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+def Validate(variants, fileMap, validate, threads):
+    # check the variants, several at once with the reference compiler or a context per thread.
+    # returns an error message for each variant that fails
+    mode = ValidationMode(validate)
+    if mode == 'none':
+        return []
+    validator = FindValidator() if mode == 'offline' else None
+    queue = Queue()
+    for variant in variants:
+        queue.put(variant)
+    errors = []
+    lock = Lock()
+    def Work(ownContext):
+        window = None
+        if ownContext and mode == 'gl':
+            window, context = CreateContext()
+        try:
+            while True:
+                try:
+                    variant = queue.get_nowait()
+                except Empty:
+                    break
+                try:
+                    if mode == 'offline':
+                        ValidateOffline(variant.sources, fileMap, validator)
+                    else:
+                        ValidateWithContext(variant.sources, fileMap)
+                except GLSLError, e:
+                    lock.acquire()
+                    try:
+                        errors.append("variant %d, %s:\n%s" % (variant.key, variant.name, e))
+                    finally:
+                        lock.release()
+        finally:
+            if window is not None:
+                context.Dispose()
+                window.Dispose()
+    threads = max(1, min(threads, len(variants)))
+    if threads == 1:
+        # on the calling thread, with a context of its own for gl validation unless it already has one
+        Work(mode == 'gl' and not HasContext())
+    else:
+        workers = [Thread(target=Work, args=(True,)) for n in xrange(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return sorted(errors)
+
+def Convert(output, vertex = None, fragment = None, geometry = None, permutations = None, compress = None, defines = None, includePaths = None, strip = True, validate = 'auto', threads = Environment.ProcessorCount):
+    # one MEB holding a program for every combination of the permutation options. the sources are
+    # stored once as chunks shared between the variants, each stage is a list of chunk indices
+    options, variants = Variants(permutations or [], defines)
+    files = []
+    for variant in variants:
+        preprocessor = Preprocessor(variant.defines, includePaths, strip, files)
+        for path, typenum in [[vertex, 0], [fragment, 1], [geometry, 2]]:
+            if path:
+                try:
+                    variant.sources.append([preprocessor.Process(path), typenum])
+                except PreprocessorError, e:
+                    raise GLSLError("variant %d, %s:\n%s" % (variant.key, variant.name, e))
+    fileMap = [[num, name] for num, name in enumerate(files)]
+
+    errors = Validate(variants, fileMap, validate, threads)
+    if errors:
+        raise GLSLError("%d of %d shader variants failed:\n%s" % (len(errors), len(variants), "\n".join(errors)))
+
+    chunks = []
+    chunkIndices = {}
+    stages = []
+    for variant in variants:
+        variantStages = []
+        for source, typenum in variant.sources:
+            indices = []
+            for chunk in SplitChunks(source):
+                digest = hashlib.sha1(chunk).digest()
+                if digest not in chunkIndices:
+                    chunkIndices[digest] = len(chunks)
+                    chunks.append(chunk)
+                indices.append(chunkIndices[digest])
+            variantStages.append((typenum, indices))
+        stages.append(variantStages)
+
+    f = File.Create(output)
+    try:
+        writer = ContentWriter(f, compress is not None, "MEB", 6 if compress is None else compress, stringPool = True)
+        writer.typeList.append(Serializer('a5da1ca4-3ecc-44e3-826b-66b4d785e7a8'))
+        writer.BeginObject(1)
+        writer.WriteInt(len(fileMap))
+        for num, name in fileMap:
+            writer.WriteInt(num)
+            writer.WriteString(name)
+
+        # the variant key table, an undefined value is an empty string
+        writer.WriteInt(len(options))
+        for name, values in options:
+            writer.WriteString(name)
+            writer.WriteInt(len(values))
+            for value in values:
+                writer.WriteString(value if value is not None else "")
+
+        writer.WriteInt(len(chunks))
+        for chunk in chunks:
+            writer.WriteString(chunk)
+
+        writer.WriteInt(len(stages))
+        for variantStages in stages:
+            writer.WriteInt(len(variantStages))
+            for typenum, indices in variantStages:
+                writer.WriteInt(typenum)
+                writer.WriteInt(len(indices))
+                writer.WriteInt32Array(indices)
+
+        writer.Flush()
+    finally:
+        f.Close()
+    return len(variants), len(chunks)
+
+def Dependencies(vertex = None, fragment = None, geometry = None, includePaths = None):
+    return CreateShaderSource.Dependencies(vertex, fragment, geometry, includePaths)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build every permutation of a shader\'s #define options into one MEB file.')
+    parser.add_argument('-v', '--vertex', metavar='VERTEX', help='The vertex shader source file for the shader')
+    parser.add_argument('-f', '--fragment', metavar='FRAGMENT', help='The frament shader source file for the shader')
+    parser.add_argument('-g', '--geometry', metavar='GEOMETRY', help='The geometry shader source file for the shader')
+    parser.add_argument('-o', '--output', metavar='OUTPUT', required=True, help='The file to output the shader variants to.')
+    parser.add_argument('-p', '--permutation', metavar='NAME[=A,B,...]', action='append', default=[], help='An option to build variants for, NAME alone is off or on (undefined or 1), NAME=A,B,... is one of the values.')
+    parser.add_argument('-D', '--define', metavar='NAME[=VALUE]', action='append', default=[], help='Define a macro for every variant.')
+    parser.add_argument('-I', '--include', metavar='DIRECTORY', action='append', default=[], help='A directory to search for #include files.')
+    parser.add_argument('--no-strip', action='store_true', help='Keep the whitespace and blank lines of the sources.')
+    parser.add_argument('--validate', default='auto', choices=ValidationModes, help='Check the variants with the offline reference compiler (glslangValidator), an OpenGL context, or not at all (default offline when glslangValidator is found).')
+    parser.add_argument('-j', '--threads', metavar='THREADS', type=int, default=Environment.ProcessorCount, help='Number of variants to validate at once (default is the number of processors).')
+    parser.add_argument('-z', '--compress', metavar='LEVEL', nargs='?', type=int, const=6, help='Compress the MEB output, with an optional compression LEVEL from 0 to 9 (default 6).')
+
+    args = parser.parse_args()
+
+    defines = dict((x.split('=', 1) + ['1'])[:2] for x in args.define)
+    try:
+        count, chunkCount = Convert(args.output, args.vertex, args.fragment, args.geometry, args.permutation, args.compress, defines, args.include, not args.no_strip, args.validate, args.threads)
+        print "wrote %d variants from %d source chunks" % (count, chunkCount)
+    except GLSLError, e:
+        print e
+        sys.exit(1)
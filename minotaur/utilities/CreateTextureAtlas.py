@@ -0,0 +1,153 @@
+import clr
+
+from System import *
+from System.IO import *
+import argparse
+import os
+import os.path
+from ContentWriter import ContentWriter, DefaultBlobAlignment
+from PixelConversion import LoadPixels, BgraToRgba, Premultiply
+from Mipmaps import Filters
+from ConvertImage import WriteTexture, ImageFormats
+from AtlasPacker import Pack, Packers
+
+ImageExtensions = ['.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff']
+
+class Serializer:
+    def __init__(self, id):
+        self.id = Guid(id)
+
+class Sprite:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.page = 0
+        self.x = 0
+        self.y = 0
+        self.width = 0
+        self.height = 0
+        self.data = None
+
+def FindImages(inputs):
+    # (name, path) of every image, named by file name or by path relative to a given directory
+    images = []
+    for input in inputs:
+        if os.path.isdir(input):
+            for path, directories, files in os.walk(input):
+                directories.sort()
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in ImageExtensions:
+                        source = os.path.join(path, name)
+                        images.append((os.path.splitext(os.path.relpath(source, input))[0].replace(os.sep, '/'), source))
+        else:
+            images.append((os.path.splitext(os.path.basename(input))[0], input))
+    return images
+
+def Dependencies(inputs):
+    # every file the output is built from
+    return [path for name, path in FindImages(inputs)]
+
+def Extrude(data, width, height, extrude):
+    # surround BGRA pixels with copies of their edge pixels so filtering does not bleed in the neighbours
+    rowSize = width * 4
+    rows = []
+    for y in xrange(height):
+        row = data[y * rowSize:(y + 1) * rowSize]
+        rows.append(row[:4] * extrude + row + row[-4:] * extrude)
+    rows = [rows[0]] * extrude + rows + [rows[-1]] * extrude
+    result = bytearray()
+    for row in rows:
+        result.extend(row)
+    return result
+
+def PageNames(output, count):
+    # the first page keeps the output name, later ones are numbered from 1
+    base, extension = os.path.splitext(output)
+    return [output] + ["%s_%d%s" % (base, n, extension) for n in xrange(1, count)]
+
+def NextPowerOfTwo(n):
+    size = 1
+    while size < n:
+        size *= 2
+    return size
+
+def Convert(inputs, output, packer = 'maxrects', padding = 2, extrude = 1, size = 2048, powerOfTwo = False, premultiply = False, mipmaps = None, linear = False, format = 'rgba', threads = 1, compress = None, align = DefaultBlobAlignment):
+    # inputs are image files and directories of images, output is the first page's file name.
+    # returns the page file names.
+    sprites = []
+    names = set()
+    for name, path in FindImages(inputs):
+        if name in names:
+            raise ValueError("more than one image is named %s" % name)
+        names.add(name)
+        sprite = Sprite(name, path)
+        sprite.width, sprite.height, data = LoadPixels(path)
+        sprite.data = Extrude(data, sprite.width, sprite.height, extrude) if extrude else data
+        sprites.append(sprite)
+    if not sprites:
+        raise ValueError("no images to pack")
+
+    # padding is left free between neighbours, the page is that much larger so the last column and row fit
+    border = extrude * 2
+    sizes = [(x.width + border + padding, x.height + border + padding) for x in sprites]
+    placements, pageCount = Pack(sizes, size + padding, size + padding, packer)
+    pageSizes = [[1, 1] for n in xrange(pageCount)]
+    for sprite, (page, x, y) in zip(sprites, placements):
+        sprite.page = page
+        sprite.x = x + extrude
+        sprite.y = y + extrude
+        pageSizes[page][0] = max(pageSizes[page][0], x + sprite.width + border)
+        pageSizes[page][1] = max(pageSizes[page][1], y + sprite.height + border)
+    if powerOfTwo:
+        pageSizes = [[NextPowerOfTwo(w), NextPowerOfTwo(h)] for w, h in pageSizes]
+
+    pages = PageNames(output, pageCount)
+    for page, (pageWidth, pageHeight) in enumerate(pageSizes):
+        pageSprites = [x for x in sprites if x.page == page]
+        data = bytearray(pageWidth * pageHeight * 4)
+        for sprite in pageSprites:
+            width = (sprite.width + border) * 4
+            left = sprite.x - extrude
+            for y in xrange(sprite.height + border):
+                offset = ((sprite.y - extrude + y) * pageWidth + left) * 4
+                data[offset:offset + width] = sprite.data[y * width:(y + 1) * width]
+        data = BgraToRgba(data)
+        if premultiply:
+            data = Premultiply(data)
+
+        f = File.Create(pages[page])
+        try:
+            writer = ContentWriter(f, compress is not None, "MEB", 6 if compress is None else compress, blobAlignment = align, tableOfContents = True, stringPool = True)
+            writer.typeList.append(Serializer('20f75bf7-b777-4c52-8b26-abac8b1e01a1'))
+            writer.BeginObject(1)  # first type
+            WriteTexture(writer, data, pageWidth, pageHeight, mipmaps, linear, format, threads)
+            writer.WriteInt(len(pageSprites))
+            for sprite in pageSprites:
+                writer.WriteString(sprite.name)
+                writer.WriteStruct('4i', sprite.x, sprite.y, sprite.width, sprite.height)
+            writer.Flush()
+        finally:
+            f.Close()
+    return pages
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Pack image files into MEB texture atlas pages.')
+    parser.add_argument('input', nargs='+', help='the image files, or directories of image files, to pack.')
+    parser.add_argument('-o', metavar='OUTPUT', required=True, help='file to output the first MEB atlas page to, further pages are numbered from 1.')
+    parser.add_argument('--packer', default='maxrects', choices=sorted(Packers), help='packing algorithm, maxrects or skyline (default maxrects).')
+    parser.add_argument('--padding', metavar='PIXELS', type=int, default=2, help='empty pixels between images (default 2).')
+    parser.add_argument('--extrude', metavar='PIXELS', type=int, default=1, help='pixels to repeat the edges of each image by (default 1).')
+    parser.add_argument('-s', '--size', metavar='SIZE', type=int, default=2048, help='maximum width and height of a page (default 2048).')
+    parser.add_argument('--pot', action='store_true', help='round page sizes up to powers of two.')
+    parser.add_argument('-p', '--premultiply', action='store_true', help='premultiply the colour channels by alpha.')
+    parser.add_argument('-m', '--mipmaps', metavar='FILTER', nargs='?', const='box', choices=sorted(Filters), help='generate the mipmap chain, with an optional FILTER of box, kaiser or lanczos (default box).')
+    parser.add_argument('--linear', action='store_true', help='filter mipmaps without sRGB gamma correction.')
+    parser.add_argument('-f', '--format', metavar='FORMAT', default='rgba', choices=ImageFormats, help='texture format, one of %s (default rgba).' % ", ".join(ImageFormats))
+    parser.add_argument('-j', '--threads', metavar='THREADS', type=int, default=Environment.ProcessorCount, help='number of threads to block compress with (default is the number of processors).')
+    parser.add_argument('-z', '--compress', metavar='LEVEL', nargs='?', type=int, const=6, help='compress the MEB output, with an optional compression LEVEL from 0 to 9 (default 6).')
+    parser.add_argument('-a', '--align', metavar='BYTES', type=int, default=DefaultBlobAlignment, help='align the pixel data to BYTES in an uncompressed MEB so it can be mapped, 0 to write it inline (default %d).' % DefaultBlobAlignment)
+
+    args = parser.parse_args()
+
+    pages = Convert(args.input, args.o, args.packer, args.padding, args.extrude, args.size, args.pot, args.premultiply, args.mipmaps, args.linear, args.format, args.threads, args.compress, args.align)
+    print "wrote %d atlas pages: %s" % (len(pages), ", ".join(pages))
@@ -0,0 +1,77 @@
+from math import sqrt
+from operator import add
+
+Infinity = 1e20
+
+def DistanceTransform1D(f):
+    # squared distance to the nearest sample of f, the lower envelope of parabolas rooted at each
+    # sample (Felzenszwalb and Huttenlocher, "Distance Transforms of Sampled Functions"), linear time
+    n = len(f)
+    d = [0.0] * n
+    v = [0] * n
+    z = [0.0] * (n + 1)
+    k = 0
+    z[0] = -Infinity
+    z[1] = Infinity
+    for q in xrange(1, n):
+        s = ((f[q] + q * q) - (f[v[k]] + v[k] * v[k])) / (2.0 * (q - v[k]))
+        while s <= z[k]:
+            k -= 1
+            s = ((f[q] + q * q) - (f[v[k]] + v[k] * v[k])) / (2.0 * (q - v[k]))
+        k += 1
+        v[k] = q
+        z[k] = s
+        z[k + 1] = Infinity
+    k = 0
+    for q in xrange(n):
+        while z[k + 1] < q:
+            k += 1
+        d[q] = (q - v[k]) * (q - v[k]) + f[v[k]]
+    return d
+
+def DistanceTransform(features, width, height):
+    # squared euclidean distance of every pixel to the nearest feature pixel, by columns then rows
+    grid = [0.0 if x else Infinity for x in features]
+    for x in xrange(width):
+        grid[x::width] = DistanceTransform1D(grid[x::width])
+    for y in xrange(height):
+        grid[y * width:(y + 1) * width] = DistanceTransform1D(grid[y * width:(y + 1) * width])
+    return grid
+
+def SignedDistanceField(coverage, width, height, spread, threshold = 128):
+    # single channel distance field of a coverage image, 128 on the edge, increasing inwards and
+    # reaching 0 or 255 at spread pixels outside or inside the glyphs
+    inside = [x >= threshold for x in coverage]
+    toInside = DistanceTransform(inside, width, height)
+    toOutside = DistanceTransform([not x for x in inside], width, height)
+    scale = 127.5 / spread
+    result = bytearray(width * height)
+    for i in xrange(width * height):
+        # pixel centres are half a pixel from the edge between an inside and an outside pixel
+        if inside[i]:
+            distance = sqrt(toOutside[i]) - 0.5
+        else:
+            distance = 0.5 - sqrt(toInside[i])
+        result[i] = min(max(int(127.5 + distance * scale + 0.5), 0), 255)
+    return result
+
+def Reduce(data, width, height, factor):
+    # average factor x factor blocks, repeating the last row and column when the size does not divide
+    newWidth = (width + factor - 1) // factor
+    newHeight = (height + factor - 1) // factor
+    paddedWidth = newWidth * factor
+    rows = []
+    for y in xrange(newHeight):
+        total = [0] * paddedWidth
+        for j in xrange(factor):
+            row = min(y * factor + j, height - 1) * width
+            source = list(data[row:row + width])
+            total = map(add, total, source + source[-1:] * (paddedWidth - width))
+        columns = [0] * newWidth
+        for i in xrange(factor):
+            columns = map(add, columns, total[i::factor])
+        rows.append(bytearray([(x + factor * factor // 2) // (factor * factor) for x in columns]))
+    result = bytearray()
+    for row in rows:
+        result.extend(row)
+    return result, newWidth, newHeight
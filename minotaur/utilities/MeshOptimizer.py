@@ -0,0 +1,226 @@
+from array import array
+from collections import deque
+from math import sqrt
+from struct import Struct
+
+# scoring constants from Tom Forsyth's linear-speed vertex cache optimisation
+CacheDecayPower = 1.5
+LastTriangleScore = 0.75
+ValenceBoostScale = 2.0
+ValenceBoostPower = 0.5
+
+def VertexScore(cachePosition, remainingValence, cacheSize):
+    if remainingValence == 0:
+        return -1.0
+    score = 0.0
+    if cachePosition >= 3:
+        score = (1.0 - float(cachePosition - 3) / (cacheSize - 3)) ** CacheDecayPower
+    elif cachePosition >= 0:
+        # the last triangle's vertices get a fixed score so its neighbours are not favoured too strongly
+        score = LastTriangleScore
+    return score + ValenceBoostScale * remainingValence ** -ValenceBoostPower
+
+def ACMR(indices, cacheSize = 32):
+    # average cache miss ratio: vertices transformed per triangle with a FIFO post-transform cache
+    triangleCount = len(indices) // 3
+    if triangleCount == 0:
+        return 0.0
+    cache = deque()
+    cached = set()
+    misses = 0
+    for i in indices:
+        if i not in cached:
+            misses += 1
+            cache.append(i)
+            cached.add(i)
+            if len(cache) > cacheSize:
+                cached.discard(cache.popleft())
+    return float(misses) / triangleCount
+
+def OptimizeVertexCache(indices, vertexCount, cacheSize = 32):
+    # reorder triangles for post-transform cache locality, returns the new index list
+    triangleCount = len(indices) // 3
+    if triangleCount == 0:
+        return array('I', indices)
+    vertexTriangles = [[] for i in xrange(vertexCount)]
+    for t in xrange(triangleCount):
+        for i in indices[t * 3:t * 3 + 3]:
+            vertexTriangles[i].append(t)
+    vertexScore = [VertexScore(-1, len(x), cacheSize) for x in vertexTriangles]
+
+    best = -1
+    bestScore = -1.0
+    for t in xrange(triangleCount):
+        a, b, c = indices[t * 3:t * 3 + 3]
+        score = vertexScore[a] + vertexScore[b] + vertexScore[c]
+        if score > bestScore:
+            best, bestScore = t, score
+
+    added = [False] * triangleCount
+    nextTriangle = 0
+    cache = []
+    result = array('I')
+    for n in xrange(triangleCount):
+        if best < 0:
+            # nothing left next to the cache, continue from the first unused triangle
+            while added[nextTriangle]:
+                nextTriangle += 1
+            best = nextTriangle
+        triangle = indices[best * 3:best * 3 + 3]
+        added[best] = True
+        result.extend(triangle)
+        for v in triangle:
+            vertexTriangles[v].remove(best)
+
+        # move the triangle's vertices to the front of the LRU cache
+        newCache = []
+        for v in triangle:
+            if v not in newCache:
+                newCache.append(v)
+        front = set(newCache)
+        newCache.extend(v for v in cache if v not in front)
+        for v in newCache[cacheSize:]:
+            vertexScore[v] = VertexScore(-1, len(vertexTriangles[v]), cacheSize)
+        cache = newCache[:cacheSize]
+        for position, v in enumerate(cache):
+            vertexScore[v] = VertexScore(position, len(vertexTriangles[v]), cacheSize)
+
+        # only triangles touching the cache have changed score
+        best = -1
+        bestScore = -1.0
+        for v in cache:
+            for t in vertexTriangles[v]:
+                a, b, c = indices[t * 3:t * 3 + 3]
+                score = vertexScore[a] + vertexScore[b] + vertexScore[c]
+                if score > bestScore:
+                    best, bestScore = t, score
+    return result
+
+def OptimizeOverdraw(indices, positions, cacheSize = 32, threshold = 0.75):
+    # split a cache optimised triangle list into clusters and draw the outward facing ones first
+    # so they occlude the rest (Sander, Nehab and Barczak, "Fast Triangle Reordering for Vertex
+    # Locality and Reduced Overdraw"). Each cluster is simulated from a cold cache, as it will be
+    # once the clusters are reordered, and ends where the cache runs cold anyway or at a cache
+    # miss once its own ACMR has fallen below threshold, so the cost of the split stays small.
+    triangleCount = len(indices) // 3
+    if triangleCount < 2:
+        return array('I', indices)
+    clusters = []
+    start = 0
+    clusterMisses = 0
+    cache = deque()
+    cached = set()
+    for t in xrange(triangleCount):
+        triangle = indices[t * 3:t * 3 + 3]
+        misses = len([i for i in triangle if i not in cached])
+        if t > start and (misses == 3 or (misses and float(clusterMisses) / (t - start) < threshold)):
+            clusters.append((start, t))
+            start = t
+            clusterMisses = 0
+            cache.clear()
+            cached.clear()
+            misses = 3
+        for i in triangle:
+            if i not in cached:
+                cache.append(i)
+                cached.add(i)
+                if len(cache) > cacheSize:
+                    cached.discard(cache.popleft())
+        clusterMisses += misses
+    clusters.append((start, triangleCount))
+    if len(clusters) == 1:
+        return array('I', indices)
+
+    # area weighted centroid and normal of each cluster
+    clusterData = []
+    meshCentroid = [0.0, 0.0, 0.0]
+    meshArea = 0.0
+    for start, end in clusters:
+        centroid = [0.0, 0.0, 0.0]
+        normal = [0.0, 0.0, 0.0]
+        area = 0.0
+        for t in xrange(start, end):
+            a, b, c = [i * 3 for i in indices[t * 3:t * 3 + 3]]
+            ax, ay, az = positions[a:a + 3]
+            bx, by, bz = positions[b:b + 3]
+            cx, cy, cz = positions[c:c + 3]
+            ux, uy, uz = bx - ax, by - ay, bz - az
+            vx, vy, vz = cx - ax, cy - ay, cz - az
+            nx, ny, nz = uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx
+            triangleArea = sqrt(nx * nx + ny * ny + nz * nz)
+            normal[0] += nx
+            normal[1] += ny
+            normal[2] += nz
+            centroid[0] += (ax + bx + cx) * triangleArea
+            centroid[1] += (ay + by + cy) * triangleArea
+            centroid[2] += (az + bz + cz) * triangleArea
+            area += triangleArea
+        if area > 0:
+            centroid = [x / (3 * area) for x in centroid]
+        for k in xrange(3):
+            meshCentroid[k] += centroid[k] * area
+        meshArea += area
+        clusterData.append((centroid, normal))
+    if meshArea > 0:
+        meshCentroid = [x / meshArea for x in meshCentroid]
+
+    def Facing(n):
+        centroid, normal = clusterData[n]
+        length = sqrt(sum(x * x for x in normal))
+        if length == 0:
+            return 0.0
+        return sum((centroid[k] - meshCentroid[k]) * normal[k] for k in xrange(3)) / length
+
+    result = array('I')
+    for n in sorted(xrange(len(clusters)), key = Facing, reverse = True):
+        start, end = clusters[n]
+        result.extend(indices[start * 3:end * 3])
+    return result
+
+def OptimizeVertexFetch(indices, vertexCount):
+    # number vertices in order of first use, returns the old to new vertex remap
+    remap = [-1] * vertexCount
+    nextVertex = 0
+    for i in indices:
+        if remap[i] < 0:
+            remap[i] = nextVertex
+            nextVertex += 1
+    # unreferenced vertices go last
+    for v in xrange(vertexCount):
+        if remap[v] < 0:
+            remap[v] = nextVertex
+            nextVertex += 1
+    return remap
+
+def RemapVertices(data, stride, remap):
+    # reorder a packed vertex block so old vertex v ends up at remap[v]
+    order = [0] * len(remap)
+    for old, new in enumerate(remap):
+        order[new] = old
+    result = array('B')
+    for old in order:
+        result.extend(data[old * stride:(old + 1) * stride])
+    return result
+
+def WeldVertices(data, stride, vertexCount, format = None, epsilon = None):
+    # merge vertices with identical packed bytes, or with an epsilon the vertices whose float
+    # components match once quantised to that step, format being the struct layout of a vertex.
+    # returns the old to new vertex remap and the packed unique vertices.
+    if epsilon:
+        vertexStruct = Struct("<" + format)
+        if vertexStruct.size != stride:
+            raise ValueError("vertex format %s does not match the stride %d" % (format, stride))
+    remap = [0] * vertexCount
+    index = {}
+    unique = array('B')
+    for v in xrange(vertexCount):
+        vertex = data[v * stride:(v + 1) * stride]
+        key = vertex.tostring()
+        if epsilon:
+            key = tuple([int(round(x / epsilon)) if isinstance(x, float) else x for x in vertexStruct.unpack(key)])
+        n = index.get(key)
+        if n is None:
+            n = index[key] = len(index)
+            unique.extend(vertex)
+        remap[v] = n
+    return remap, unique
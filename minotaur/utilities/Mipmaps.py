@@ -0,0 +1,140 @@
+from math import sin, pi, sqrt, floor, ceil
+from operator import add
+
+def BoxFilter(x):
+    # half open so a sample on the boundary is only counted once
+    if -0.5 <= x < 0.5:
+        return 1.0
+    return 0.0
+
+def Sinc(x):
+    if abs(x) < 1e-6:
+        return 1.0
+    return sin(pi * x) / (pi * x)
+
+def BesselI0(x):
+    # zeroth order modified bessel function of the first kind, by its power series
+    total = 1.0
+    term = 1.0
+    n = 1
+    while term > total * 1e-8:
+        term *= (x / (2.0 * n)) ** 2
+        total += term
+        n += 1
+    return total
+
+KaiserAlpha = 4.0
+KaiserWidth = 3.0
+
+def KaiserFilter(x):
+    t = x / KaiserWidth
+    if abs(t) >= 1.0:
+        return 0.0
+    return Sinc(x) * BesselI0(KaiserAlpha * sqrt(1.0 - t * t)) / BesselI0(KaiserAlpha)
+
+def LanczosFilter(x):
+    if abs(x) >= 3.0:
+        return 0.0
+    return Sinc(x) * Sinc(x / 3.0)
+
+# name -> (filter, support radius in destination pixels)
+Filters = {
+    'box': (BoxFilter, 0.5),
+    'kaiser': (KaiserFilter, KaiserWidth),
+    'lanczos': (LanczosFilter, 3.0),
+}
+
+def SrgbToLinear(c):
+    if c <= 0.04045:
+        return c / 12.92
+    return ((c + 0.055) / 1.055) ** 2.4
+
+def LinearToSrgb(c):
+    if c <= 0.0031308:
+        return c * 12.92
+    return 1.055 * c ** (1 / 2.4) - 0.055
+
+SrgbTable = [SrgbToLinear(i / 255.0) for i in xrange(256)]
+UnitTable = [i / 255.0 for i in xrange(256)]
+
+def MipmapCount(width, height):
+    count = 1
+    while width > 1 or height > 1:
+        width = max(1, width // 2)
+        height = max(1, height // 2)
+        count += 1
+    return count
+
+def FilterWeights(filter, support, sourceSize, size):
+    # for each destination pixel the first source pixel and the normalised weights of the source
+    # pixels it covers, clamped at the edges. scale is not always 2 for non power of two sizes.
+    scale = float(sourceSize) / size
+    result = []
+    for i in xrange(size):
+        centre = (i + 0.5) * scale
+        first = int(floor(centre - support * scale))
+        last = int(ceil(centre + support * scale))
+        weights = {}
+        for j in xrange(first, last + 1):
+            w = filter((j + 0.5 - centre) / scale)
+            if w != 0.0:
+                k = min(max(j, 0), sourceSize - 1)
+                weights[k] = weights.get(k, 0.0) + w
+        total = sum(weights.values())
+        start = min(weights)
+        taps = [weights.get(k, 0.0) / total for k in xrange(start, max(weights) + 1)]
+        result.append((start, taps))
+    return result
+
+def Combine(vectors, start, taps, channels, channel):
+    # weighted sum of whole source columns (or rows) at once rather than pixel by pixel
+    result = None
+    for n, w in enumerate(taps):
+        if w == 0.0:
+            continue
+        term = map(w.__mul__, vectors[(start + n) * channels + channel])
+        result = term if result is None else map(add, result, term)
+    return result
+
+def Downsample(rows, width, height, channels, filter, support):
+    # separable resample of interleaved float rows to half size
+    newWidth = max(1, width // 2)
+    newHeight = max(1, height // 2)
+    columns = zip(*rows)
+    columns = [Combine(columns, start, taps, channels, c) for start, taps in FilterWeights(filter, support, width, newWidth) for c in xrange(channels)]
+    rows = zip(*columns)
+    rows = [Combine(rows, start, taps, 1, 0) for start, taps in FilterWeights(filter, support, height, newHeight)]
+    return rows, newWidth, newHeight
+
+def Quantize(rows, channels, gamma):
+    # back to bytes, re-encoding the colour channels to sRGB when they were linearised
+    data = bytearray()
+    for row in rows:
+        values = [min(max(x, 0.0), 1.0) for x in row]
+        if gamma:
+            for c in xrange(min(channels, 3)):
+                values[c::channels] = [LinearToSrgb(x) for x in values[c::channels]]
+        data.extend(int(x * 255.0 + 0.5) for x in values)
+    return data
+
+def MipmapChain(pixels, width, height, channels, filter = 'box', gamma = True):
+    # returns [(width, height, pixels)] for every level down to 1x1, level 0 being the source.
+    # each level is filtered from the unquantised previous level, with the colour channels
+    # in linear space when gamma is set, so sRGB images do not darken as they shrink.
+    filter, support = Filters[filter]
+    gamma = gamma and channels >= 3
+    rowSize = width * channels
+    rows = []
+    for y in xrange(height):
+        row = [UnitTable[x] for x in pixels[y * rowSize:(y + 1) * rowSize]]
+        if gamma:
+            source = pixels[y * rowSize:(y + 1) * rowSize]
+            for c in xrange(3):
+                row[c::channels] = [SrgbTable[x] for x in source[c::channels]]
+        rows.append(row)
+
+    levels = [(width, height, pixels)]
+    while width > 1 or height > 1:
+        rows, width, height = Downsample(rows, width, height, channels, filter, support)
+        levels.append((width, height, Quantize(rows, channels, gamma)))
+    return levels
@@ -0,0 +1,61 @@
+import clr
+
+clr.AddReferenceByPartialName("System.Drawing")
+
+from System import Array, Byte, IntPtr
+from System.Drawing import Bitmap, Rectangle
+from System.Drawing.Imaging import ImageLockMode
+import System.Drawing.Imaging.PixelFormat as PF
+from System.Runtime.InteropServices import Marshal
+
+# PremultiplyTable[a][c] is channel c scaled by alpha a, rounded to nearest
+PremultiplyTable = [bytearray([(c * a + 127) // 255 for c in xrange(256)]) for a in xrange(256)]
+
+def LoadPixels(path):
+    # returns the width, height and tightly packed BGRA pixels of an image file
+    bmp = Bitmap(path)
+    try:
+        width = bmp.Width
+        height = bmp.Height
+        rowSize = width * 4
+        data = Array.CreateInstance(Byte, rowSize * height)
+        bmpData = bmp.LockBits(Rectangle(0, 0, width, height), ImageLockMode.ReadOnly, PF.Format32bppArgb)
+        try:
+            if bmpData.Stride == rowSize:
+                Marshal.Copy(bmpData.Scan0, data, 0, data.Length)
+            else:
+                for y in xrange(height):
+                    Marshal.Copy(IntPtr(bmpData.Scan0.ToInt64() + y * bmpData.Stride), data, y * rowSize, rowSize)
+        finally:
+            bmp.UnlockBits(bmpData)
+    finally:
+        bmp.Dispose()
+    return width, height, bytearray(data)
+
+def BgraToRgba(pixels):
+    # swap the red and blue channels, green and alpha stay where they are
+    rgba = bytearray(pixels)
+    rgba[0::4] = pixels[2::4]
+    rgba[2::4] = pixels[0::4]
+    return rgba
+
+def RgbaToR8(pixels):
+    return pixels[0::4]
+
+def BgraToR8(pixels):
+    return pixels[2::4]
+
+def Premultiply(pixels):
+    # multiply the colour channels of RGBA or BGRA pixels by their alpha
+    result = bytearray(pixels)
+    alpha = pixels[3::4]
+    if alpha.count('\xff') == len(alpha):
+        return result
+    for i in xrange(0, len(pixels), 4):
+        a = pixels[i + 3]
+        if a != 255:
+            table = PremultiplyTable[a]
+            result[i] = table[pixels[i]]
+            result[i + 1] = table[pixels[i + 1]]
+            result[i + 2] = table[pixels[i + 2]]
+    return result
@@ -0,0 +1,322 @@
+import os.path
+import re
+
+includeRegex = re.compile(r'^\s*#\s*include\s*([<"])([^>"]+)[>"]')
+directiveRegex = re.compile(r'^\s*#\s*(\w*)\s*(.*)$')
+defineRegex = re.compile(r'^(\w+)(\()?\s*(.*)$')
+commentRegex = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+tokenRegex = re.compile(r'\s*(0[xX][0-9a-fA-F]+[uU]?|\d+[uU]?|\w+|&&|\|\||==|!=|<=|>=|<<|>>|\S)')
+whitespaceRegex = re.compile(r'\s+')
+
+# C precedence of the binary operators allowed in #if expressions
+BinaryOperators = {
+    '||': (1, lambda a, b: int(bool(a or b))),
+    '&&': (2, lambda a, b: int(bool(a and b))),
+    '|': (3, lambda a, b: a | b),
+    '^': (4, lambda a, b: a ^ b),
+    '&': (5, lambda a, b: a & b),
+    '==': (6, lambda a, b: int(a == b)),
+    '!=': (6, lambda a, b: int(a != b)),
+    '<': (7, lambda a, b: int(a < b)),
+    '>': (7, lambda a, b: int(a > b)),
+    '<=': (7, lambda a, b: int(a <= b)),
+    '>=': (7, lambda a, b: int(a >= b)),
+    '<<': (8, lambda a, b: a << b),
+    '>>': (8, lambda a, b: a >> b),
+    '+': (9, lambda a, b: a + b),
+    '-': (9, lambda a, b: a - b),
+    '*': (10, lambda a, b: a * b),
+    '/': (10, lambda a, b: int(float(a) / b)),
+    '%': (10, lambda a, b: a - b * int(float(a) / b)),
+}
+
+class PreprocessorError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __str__(self):
+        return self.msg
+
+class Unknown(Exception):
+    # an expression depends on something only the driver knows
+    pass
+
+def IsDriverMacro(name):
+    # GL_ES, GL_ARB_* and the like, and __VERSION__, are defined by the driver not the source
+    return name.startswith('GL_') or name.startswith('__')
+
+def ReadLines(path):
+    # source lines with comments removed, keeping the line count so #line directives stay right
+    f = open(path, 'r')
+    try:
+        text = f.read()
+    finally:
+        f.close()
+    if text.startswith('\xef\xbb\xbf'):
+        text = text[3:]
+    text = commentRegex.sub(lambda m: '\n' * m.group(0).count('\n') or ' ', text)
+    return text.replace('\r\n', '\n').split('\n')
+
+def ResolveInclude(name, local, directory, includePaths):
+    # quoted includes are looked for beside the including file first, then in the include paths
+    candidates = [os.path.join(directory, name)] if local else []
+    candidates += [os.path.join(x, name) for x in includePaths]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.abspath(candidate)
+    return None
+
+def Includes(path, includePaths = None):
+    # path and every file it includes, whatever the conditions around the #include
+    includePaths = includePaths or []
+    found = [os.path.abspath(path)]
+    for source in found:
+        for line in ReadLines(source):
+            match = includeRegex.match(line)
+            if match:
+                include = ResolveInclude(match.group(2), match.group(1) == '"', os.path.dirname(source), includePaths)
+                if include and include not in found:
+                    found.append(include)
+    return found
+
+class Preprocessor(object):
+    # expands #includes and folds #if blocks whose conditions only use macros known at build time:
+    # the given defines, macros #defined by the source and anything else as undefined, except the
+    # driver's macros. blocks depending on those are left for the driver.
+    def __init__(self, defines = None, includePaths = None, strip = True, files = None):
+        self.defines = {}
+        for name, value in (defines or {}).items():
+            if value is not None and value is not False:
+                self.defines[name] = '1' if value is True else str(value)
+        self.includePaths = includePaths or []
+        self.strip = strip
+        # absolute paths, the index of each is its source string number in #line directives, can be
+        # shared between preprocessors so their sources number files the same way
+        self.files = files if files is not None else []
+
+    def Process(self, path):
+        # the preprocessed source of one stage, each stage starts from the given defines
+        self.macros = dict(self.defines)
+        self.unknown = set()
+        self.groups = []
+        self.includeStack = []
+        self.lines = []
+        self.version = 110
+        self.Include(os.path.abspath(path))
+        if self.groups:
+            raise PreprocessorError("%s: #if without #endif" % path)
+        position = 1 if self.lines and self.lines[0][0].startswith('#version') else 0
+        self.lines[position:position] = [("#define %s %s" % (name, self.defines[name]), None, 0) for name in sorted(self.defines)]
+        return self.Output()
+
+    def Include(self, path):
+        if path in self.includeStack:
+            raise PreprocessorError("%s is included recursively" % path)
+        if path not in self.files:
+            self.files.append(path)
+        fileNumber = self.files.index(path)
+        self.includeStack.append(path)
+        lines = ReadLines(path)
+        n = 0
+        while n < len(lines):
+            lineNumber = n + 1
+            line = lines[n]
+            n += 1
+            while line.endswith('\\') and n < len(lines):
+                line = line[:-1] + lines[n]
+                n += 1
+            location = "%s line %d" % (path, lineNumber)
+            match = directiveRegex.match(line)
+            if match:
+                self.Directive(match.group(1), match.group(2).strip(), line, path, location, fileNumber, lineNumber)
+            elif self.Active():
+                self.Emit(line, fileNumber, lineNumber)
+        self.includeStack.pop()
+
+    def Directive(self, name, argument, line, path, location, fileNumber, lineNumber):
+        if name in ('if', 'ifdef', 'ifndef'):
+            self.If(name, argument, location, fileNumber, lineNumber)
+        elif name in ('elif', 'else'):
+            self.Else(name, argument, location, fileNumber, lineNumber)
+        elif name == 'endif':
+            if not self.groups:
+                raise PreprocessorError("%s: #endif without #if" % location)
+            if self.groups.pop()['keep']:
+                self.Emit("#endif", fileNumber, lineNumber)
+        elif not self.Active():
+            return
+        elif name == 'include':
+            match = includeRegex.match(line)
+            if not match:
+                raise PreprocessorError("%s: bad #include" % location)
+            include = ResolveInclude(match.group(2), match.group(1) == '"', os.path.dirname(path), self.includePaths)
+            if include is None:
+                raise PreprocessorError("%s: cannot find include file %s" % (location, match.group(2)))
+            self.Include(include)
+        else:
+            if name in ('define', 'undef'):
+                self.Define(name, argument, location)
+            elif name == 'version':
+                self.version = int(argument.split()[0])
+            self.Emit(line, fileNumber, lineNumber)
+
+    def Define(self, name, argument, location):
+        match = defineRegex.match(argument)
+        if not match:
+            raise PreprocessorError("%s: bad #%s" % (location, name))
+        macro = match.group(1)
+        if any(x['keep'] for x in self.groups):
+            # inside a block left for the driver, whether it is defined is not known
+            self.unknown.add(macro)
+            self.macros.pop(macro, None)
+            return
+        self.unknown.discard(macro)
+        if name == 'undef':
+            self.macros.pop(macro, None)
+        else:
+            # function like macros are defined but have no value to fold
+            self.macros[macro] = None if match.group(2) else match.group(3)
+
+    def Active(self):
+        return not self.groups or self.groups[-1]['active']
+
+    def If(self, name, argument, location, fileNumber, lineNumber):
+        group = {'parent': self.Active(), 'keep': False, 'taken': False, 'active': False}
+        self.groups.append(group)
+        if not group['parent']:
+            group['taken'] = True
+            return
+        if name == 'if':
+            value = self.Evaluate(argument, location)
+        else:
+            value = self.Defined(argument.split()[0] if argument else '')
+            if value is not None and name == 'ifndef':
+                value = not value
+        if value is None:
+            self.Emit("#%s %s" % (name, argument), fileNumber, lineNumber)
+            group['keep'] = True
+            group['active'] = True
+        else:
+            group['taken'] = group['active'] = bool(value)
+
+    def Else(self, name, argument, location, fileNumber, lineNumber):
+        if not self.groups:
+            raise PreprocessorError("%s: #%s without #if" % (location, name))
+        group = self.groups[-1]
+        if not group['parent'] or group['taken']:
+            group['active'] = False
+            return
+        value = self.Evaluate(argument, location) if name == 'elif' else 1
+        if value is None:
+            # the first condition left for the driver opens the block it sees
+            self.Emit("#%s %s" % ('elif' if group['keep'] else 'if', argument), fileNumber, lineNumber)
+            group['keep'] = True
+            group['active'] = True
+        elif value:
+            if group['keep']:
+                self.Emit("#else", fileNumber, lineNumber)
+            group['taken'] = group['active'] = True
+        else:
+            group['active'] = False
+
+    def Defined(self, name):
+        # True or False when known at build time, None when the driver or a kept block decides
+        if not name or name in self.unknown or IsDriverMacro(name):
+            return None
+        return name in self.macros
+
+    def Evaluate(self, expression, location, depth = 0):
+        # value of an #if expression, or None when it cannot be folded
+        tokens = tokenRegex.findall(expression)
+        try:
+            value, position = self.ParseExpression(tokens, 0, 0, location, depth)
+            if position != len(tokens):
+                raise Unknown()
+            return value
+        except Unknown:
+            return None
+        except ZeroDivisionError:
+            raise PreprocessorError("%s: division by zero in #if" % location)
+
+    def ParseExpression(self, tokens, position, precedence, location, depth):
+        # precedence climbing over the binary operators
+        value, position = self.ParseUnary(tokens, position, location, depth)
+        while position < len(tokens) and tokens[position] in BinaryOperators:
+            operatorPrecedence, function = BinaryOperators[tokens[position]]
+            if operatorPrecedence <= precedence:
+                break
+            right, position = self.ParseExpression(tokens, position + 1, operatorPrecedence, location, depth)
+            value = function(value, right)
+        return value, position
+
+    def ParseUnary(self, tokens, position, location, depth):
+        if position >= len(tokens):
+            raise Unknown()
+        token = tokens[position]
+        if token in ('!', '-', '+', '~'):
+            value, position = self.ParseUnary(tokens, position + 1, location, depth)
+            return {'!': int(not value), '-': -value, '+': value, '~': ~value}[token], position
+        if token == '(':
+            value, position = self.ParseExpression(tokens, position + 1, 0, location, depth)
+            if position >= len(tokens) or tokens[position] != ')':
+                raise Unknown()
+            return value, position + 1
+        if token[0].isdigit():
+            return int(token.rstrip('uU'), 0), position + 1
+        if token == 'defined':
+            if position + 1 < len(tokens) and tokens[position + 1] == '(':
+                if position + 3 >= len(tokens) or tokens[position + 3] != ')':
+                    raise Unknown()
+                name, position = tokens[position + 2], position + 4
+            elif position + 1 < len(tokens):
+                name, position = tokens[position + 1], position + 2
+            else:
+                raise Unknown()
+            defined = self.Defined(name)
+            if defined is None:
+                raise Unknown()
+            return int(defined), position
+        if re.match(r'^[A-Za-z_]\w*$', token):
+            defined = self.Defined(token)
+            if defined is None:
+                raise Unknown()
+            if not defined:
+                return 0, position + 1
+            value = self.macros[token]
+            if value is None or depth > 16:
+                raise Unknown()
+            value = self.Evaluate(value, location, depth + 1)
+            if value is None:
+                raise Unknown()
+            return value, position + 1
+        raise Unknown()
+
+    def Emit(self, text, fileNumber, lineNumber):
+        if self.strip:
+            text = whitespaceRegex.sub(' ', text).strip()
+            if not text:
+                return
+        self.lines.append((text, fileNumber, lineNumber))
+
+    def LineDirective(self, lineNumber, fileNumber):
+        # before GLSL 3.30 #line gives the number of the line before the next one
+        if self.version < 330:
+            lineNumber -= 1
+        return "#line %d %d" % (lineNumber, fileNumber)
+
+    def Output(self):
+        # the kept lines, with blank lines or #line directives where lines were dropped so the
+        # driver's error messages give the original file and line
+        output = []
+        current = (0, 1)
+        for text, fileNumber, lineNumber in self.lines:
+            if fileNumber is not None and (fileNumber, lineNumber) != current and not text.startswith('#version'):
+                gap = lineNumber - current[1]
+                if current[0] == fileNumber and 0 < gap <= 4:
+                    output.extend([''] * gap)
+                else:
+                    output.append(self.LineDirective(lineNumber, fileNumber))
+                current = (fileNumber, lineNumber)
+            output.append(text)
+            current = (current[0], current[1] + 1)
+        return "\n".join(output) + "\n"